@@ -1,7 +1,8 @@
 from PyQt5.QtWidgets import QStatusBar, QFormLayout, QHeaderView, QTabWidget, QCheckBox, QGridLayout, QComboBox, QLineEdit, QLabel, QApplication, QWidget, QPushButton, QVBoxLayout, QTableWidget, QTableWidgetItem
-from PyQt5.QtCore import QFile, QTextStream, QTimer
+from PyQt5.QtCore import QFile, QObject, QTextStream, QTimer, Qt, pyqtSignal
 import pyqtgraph as pg
 import traceback
+import argparse
 from datetime import datetime
 import webbrowser
 from decimal import Decimal
@@ -14,22 +15,35 @@ from errors import log_crash
 try:
     from helpers import resource_path
     from utils.tables import *
-    from modules.combat import CombatModule
+    from modules.combat import CombatModule, RUNS_VIEW, is_others_row
     from views.configuration import ConfigTab
-    from chat import ChatReader
+    from chat import ChatReader, ChatSources
     from config import Config
     from version import VERSION
     from windows.streamer import StreamerWindow
     from views.twitch import TwitchTab
     from modules.combat import MarkupSingleton
     from views.crafting import CraftingTab
+    from views.debug import ParserTab
+    from views.characters import CharactersTab
+    from modules.aggregator import AggregationWorker
+    from views.performance import PerformanceTab
+    from utils.profiling import PROFILER
 except Exception as e:
     log_crash(e)
 
-MAIN_EVENT_LOOP_TICK = 0.1
+# Seconds between ticks when no snapshots are published, starts chat readers and updates the status bar
+HEARTBEAT_INTERVAL = 1.0
 TICK_COUNTER = 0
 
 
+class Wakeup(QObject):
+    """
+    Carries snapshot notifications from the aggregation worker thread to the Qt thread as a queued signal
+    """
+    published = pyqtSignal()
+
+
 class LootNanny(QWidget):
 
     def __init__(self):
@@ -49,10 +63,17 @@ class LootNanny(QWidget):
 
         # Modules
         self.combat_module = CombatModule(self)
+        MarkupSingleton.add_listener(self.combat_module.on_markup_changed)
 
         self.config_tab = ConfigTab(self)
 
         self.chat_reader = ChatReader(self)
+        self.chat_sources = ChatSources(self, self.chat_reader)
+        self.aggregator = AggregationWorker(self.combat_module, self.chat_sources, self.config)
+        # Render as soon as the worker publishes, instead of polling for snapshots
+        self.wakeup = Wakeup()
+        self.wakeup.published.connect(self.on_tick, Qt.QueuedConnection)
+        self.aggregator.add_listener(self.wakeup.published.emit)
 
         # Create the tab widget with two tabs
         tabs = QTabWidget()
@@ -66,6 +87,12 @@ class LootNanny(QWidget):
         tabs.addTab(self.twitch, "Twitch")
 
         tabs.addTab(self.config_tab, "Config")
+        self.performance_tab = PerformanceTab(self)
+        tabs.addTab(self.performance_tab, "Performance")
+        self.characters_tab = CharactersTab(self)
+        tabs.addTab(self.characters_tab, "Characters")
+        self.parser_tab = ParserTab(self)
+        tabs.addTab(self.parser_tab, "Parser")
         layout.addWidget(tabs)
 
         statusBar = QStatusBar()
@@ -85,6 +112,9 @@ class LootNanny(QWidget):
 
         statusBar.addWidget(self.streamer_window_btn)
 
+        self.backlog_label = QLabel("Up to date")
+        statusBar.addWidget(self.backlog_label)
+
         self.theme = "dark"
         self.theme_btn = QPushButton("Toggle Theme")
         self.theme_btn.clicked.connect(lambda: self.toggle_stylesheet())
@@ -100,8 +130,22 @@ class LootNanny(QWidget):
         self.combat_module.load_runs()
         layout.addWidget(statusBar)
 
+        self.resume_active_run()
+        self.combat_module.publish()
+        self.aggregator.start()
+
         self.initialize_from_config()
 
+    def resume_active_run(self):
+        """
+        If LootNanny was closed mid run, carry on logging it from the last chat.log line it processed
+        """
+        run = self.combat_module.active_run
+        if not run or run.log_offset is None:
+            return
+        self.chat_reader.resume(run.log_offset, run.log_time, run.log_fingerprint)
+        self.on_toggle_logging()
+
     def open_donation_window(self):
         url = "https://www.paypal.com/donate?hosted_button_id=QN5CN9A52Q59E"
         webbrowser.open(url, new=0)
@@ -130,25 +174,21 @@ class LootNanny(QWidget):
 
     def on_toggle_logging(self):
         if self.combat_module.is_logging:
-            self.combat_module.is_logging = False
-            self.combat_module.is_paused = False
-            self.combat_module.active_run.time_end = datetime.now()
-            self.combat_module.active_run = None
+            self.combat_module.end_run()
             self.logging_toggle_btn.setStyleSheet("background-color: green")
             self.logging_toggle_btn.setText("Start Run")
             self.logging_pause_btn.setEnabled(False)
             self.logging_pause_btn.setText("Pause Logging")
             self.logging_pause_btn.setStyleSheet("background-color: grey: color; white;")
-            self.combat_module.save_active_run(force=True)
             self.combat_module.update_tables()
         else:
-            self.combat_module.is_logging = True
-            self.combat_module.is_paused = False
+            self.combat_module.start_run()
             self.logging_toggle_btn.setStyleSheet("background-color: red")
             self.logging_toggle_btn.setText("End Run")
             self.logging_pause_btn.setEnabled(True)
             self.logging_pause_btn.setText("Pause Logging")
             self.logging_pause_btn.setStyleSheet("background-color: green")
+            self.combat_module.update_tables()
 
     def on_pause_logging(self):
         if self.combat_module.is_paused:
@@ -163,31 +203,42 @@ class LootNanny(QWidget):
             self.combat_module.save_active_run(force=True)
 
     def on_tick(self):
+        with PROFILER.stage("ui.tick"):
+            PROFILER.profiled(self.tick, tick=True)
+
+    def tick(self):
         global TICK_COUNTER
         try:
             TICK_COUNTER += 1
             if not TICK_COUNTER % 5:
                 TICK_COUNTER %= 5
 
-            self.chat_reader.delay_start_reader()
+            with PROFILER.stage("ui.start readers"):
+                self.chat_sources.delay_start_reader()
 
-            # Grab all recent lines in the chat and process them incrementally
-            all_lines_this_tick = []
-            while True:
-                line = self.chat_reader.getline()
-                if not line or len(all_lines_this_tick) > 5:
-                    break
-                all_lines_this_tick.append(line)
+            rendered = self.combat_module.refresh()
+            self.update_backlog_status()
 
-            self.combat_module.tick(all_lines_this_tick)
-
-            if self.streamer_window:
-                self.streamer_window.resize_to_contents()
+            if rendered and self.streamer_window:
+                with PROFILER.stage("ui.streamer resize"):
+                    self.streamer_window.resize_to_contents()
 
         except Exception as e:
             traceback.print_exc()
             print(e)
 
+    def update_backlog_status(self):
+        backlog = self.chat_sources.backlog()
+        if self.chat_reader.reader and not self.chat_reader.running:
+            text = f"Chat reader restarting ({self.chat_reader.restarts} restarts)"
+        elif backlog and self.combat_module.last_event_time:
+            behind = max(0, int((datetime.now() - self.combat_module.last_event_time).total_seconds()))
+            text = f"Behind: {backlog} events ({behind}s)"
+        else:
+            text = "Up to date"
+        if self.backlog_label.text() != text:
+            self.backlog_label.setText(text)
+
     def lootTabUI(self):
         """Create the General page UI."""
         generalTab = QWidget()
@@ -218,7 +269,7 @@ class LootNanny(QWidget):
 
         self.item_table = LootTableView({"Item": [], "Value": [], "Count": [], "Markup": [], "Total Value": []}, 100, 5)
         self.runs = RunsView({"Notes": [], "Start": [], "End": [], "Spend": [], "Enhancers": [],
-                         "Extra Spend": [], "Return": [], "%": [], "mu%": []}, 40, 9)
+                         "Extra Spend": [], "Return": [], "%": [], "mu%": [], "Character": []}, 40, 10)
         self.runs.itemClicked.connect(self.onLootTableClicked)
         self.runs.model().dataChanged.connect(self.onRunsChanged)
 
@@ -263,9 +314,10 @@ class LootNanny(QWidget):
         except:
             extra_spend = 0.0
             spend_cell.setText("0.0")
-        self.combat_module.runs[changed[1]].extra_spend = extra_spend
-        self.combat_module.runs[changed[1]].notes = notes_cell.text()
-        self.combat_module.should_redraw_runs = True
+        with self.combat_module.lock:
+            self.combat_module.runs[changed[1]].extra_spend = extra_spend
+            self.combat_module.runs[changed[1]].notes = notes_cell.text()
+            self.combat_module.mark_dirty(RUNS_VIEW)
         self.clear_run_selection()
 
     def on_markup_changed(self):
@@ -275,8 +327,10 @@ class LootNanny(QWidget):
         selected_row = selected_rows[0].row()
         name_cell = self.item_table.item(selected_row, 0)
         markup_cell = self.item_table.item(selected_row, 3)
+        if is_others_row(name_cell.text()):
+            return
         MarkupSingleton.add_markup_for_item(name_cell.text(), markup_cell.text())
-        self.combat_module.update_loot_table()
+        self.combat_module.update_tables()
         self.clear_loot_item_table_selection()
 
     def on_loot_item_selected(self):
@@ -308,21 +362,22 @@ class LootNanny(QWidget):
         self.runs_rows_to_delete = [len(self.combat_module.runs) - 1 - i.row() for i in indexes]
 
     def delete_runs(self):
-        copy_runs = []
-        for i, run in enumerate(self.combat_module.runs):
-            if i in self.runs_rows_to_delete:
-                continue
-            copy_runs.append(run)
-        self.runs_rows_to_delete = []
-        self.delete_run_button.setEnabled(False)
-        self.delete_run_button.hide()
-        self.runs.clearSelection()
-        self.combat_module.runs = copy_runs
-        if self.combat_module.active_run not in copy_runs:
-            self.combat_module.active_run = None
-        self.runs.clear()
-        self.combat_module.update_runs_table()
-        self.combat_module.save_runs(force=True)
+        with self.combat_module.lock:
+            copy_runs = []
+            for i, run in enumerate(self.combat_module.runs):
+                if i in self.runs_rows_to_delete:
+                    continue
+                copy_runs.append(run)
+            self.runs_rows_to_delete = []
+            self.delete_run_button.setEnabled(False)
+            self.delete_run_button.hide()
+            self.runs.clearSelection()
+            self.combat_module.runs = copy_runs
+            if self.combat_module.active_run not in copy_runs:
+                self.combat_module.active_run = None
+            self.runs.clear()
+            self.combat_module.update_runs_table()
+            self.combat_module.save_runs(force=True)
         self.clear_run_selection()
 
     def analysisTabUI(self):
@@ -333,6 +388,7 @@ class LootNanny(QWidget):
         return_graph.plot([])
         return_graph.setTitle("Run TT Return (%)")
         return_graph.setLabel('left', 'Return (%)')
+        return_graph.sigXRangeChanged.connect(self.combat_module.on_return_range_changed)
 
         multi_graph = pg.PlotWidget()
         multi_graph.plot([])
@@ -455,6 +511,14 @@ class LootNanny(QWidget):
 
 
 def create_ui():
+    parser = argparse.ArgumentParser(description="Loot Nanny")
+    parser.add_argument("--profile-ticks", type=int, default=0,
+                        help="Write a cProfile of this many UI ticks, and the aggregation meanwhile")
+    parser.add_argument("--profile-out", default="lootnanny.prof", help="File the profile is written to")
+    args = parser.parse_args()
+    if args.profile_ticks:
+        PROFILER.start_cprofile(args.profile_ticks, args.profile_out)
+
     app = QApplication([])
     app.setStyle('Fusion')
 
@@ -462,9 +526,9 @@ def create_ui():
     window.set_stylesheet(window, "dark.qss")
     window.show()
 
-    timer = QTimer()
-    timer.timeout.connect(window.on_tick)
-    timer.start(int(MAIN_EVENT_LOOP_TICK * 1000))
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(window.on_tick)
+    heartbeat.start(int(HEARTBEAT_INTERVAL * 1000))
 
     app.exec()
 
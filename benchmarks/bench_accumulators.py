@@ -0,0 +1,189 @@
+"""
+Cost of the money accumulators in the HuntingTrip add_* path, before ( Decimal additions on every shot and loot,
+Decimal parsing in LootInstance ) and after ( integer shot counts and integer 0.0001 PED units, priced as
+Decimals only when read ).
+
+Both versions run the same generated rows. build_rows times creating the loot rows, add_rows times folding every
+combat and loot row into a run.
+
+    python benchmarks/bench_accumulators.py --lines 500000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import SYSTEM_DISPATCHER, BaseChatRow, CombatRow, LootInstance, is_tracked_channel, parse_log_line, \
+    LogTimeCache
+from chatgen import generate_lines
+from modules.combat import HuntingTrip, MarkupSingleton, LOOT_VIEW, RUNS_VIEW, GRAPHS_VIEW, COMBAT_VIEW
+
+
+class DecimalLootInstance(BaseChatRow):
+    """LootInstance as it was, the value parsed into a Decimal"""
+    __slots__ = ("name", "amount", "value")
+    CUSTOM_VALUES = {
+        "Shrapnel": Decimal("0.0001")
+    }
+
+    def __init__(self, name, amount, value):
+        super().__init__()
+        self.name = sys.intern(name)
+        self.amount = int(amount)
+
+        if name in self.CUSTOM_VALUES:
+            self.value = Decimal(amount) * self.CUSTOM_VALUES[name]
+        else:
+            self.value = Decimal(value)
+
+
+class DecimalHuntingTrip(HuntingTrip):
+    """HuntingTrip with the add_* money accumulators as they were, plain Decimal attributes"""
+    cost_per_shot = None
+    total_cost = None
+    tt_return = None
+    loot_instance_cost = None
+    total_return_mu = None
+
+    def __init__(self, time_start, cost_per_shot):
+        super().__init__(time_start, cost_per_shot)
+        self.cost_per_shot = cost_per_shot
+        self.total_cost = 0
+        self.tt_return = 0
+        self.loot_instance_cost = Decimal(0)
+        self.loot_instance_value = Decimal(0)
+        self.total_return_mu = Decimal("0.0")
+        self.looted_items.default_factory = lambda: {"c": 0, "v": Decimal()}
+        self.multipliers = ([], [])
+        self.return_over_time = []
+        self.last_loot_instance = None
+
+    def add_chat_row(self, row):
+        if isinstance(row, CombatRow):
+            self.add_combat_chat_row(row)
+            return True
+        elif isinstance(row, DecimalLootInstance):
+            self.add_loot_instance_chat_row(row)
+            return True
+        return False
+
+    def add_combat_chat_row(self, row):
+        self.total_attacks += 1
+        self.total_damage += row.amount
+        if row.critical:
+            self.total_crits += 1
+        if row.miss:
+            self.total_misses += 1
+        self.loot_instance_cost += self.cost_per_shot
+        self.total_cost += self.cost_per_shot
+        self.dirty.update((COMBAT_VIEW, LOOT_VIEW, RUNS_VIEW))
+
+    def add_loot_instance_chat_row(self, row):
+        ts = row.ts // 2
+        if row.name == "Universal Ammo":
+            return
+
+        if self.last_loot_instance != ts:
+            if row.name == "Vibrant Sweat":
+                pass
+            elif row.name == "Shrapnel" and row.amount in {8000, 4000, 6000}:
+                pass
+            else:
+                self.last_loot_instance = ts
+                self.loot_instances += 1
+
+                if self.loot_instance_value and self.loot_instance_cost:
+                    self.multipliers[0].append(float(self.loot_instance_cost))
+                    self.multipliers[1].append(float(self.loot_instance_value))
+
+                    self.loot_instance_cost = Decimal(0)
+                    self.loot_instance_value = Decimal(0)
+
+                    self.return_over_time.append(float(self.tt_return / self.total_cost))
+                    self.dirty.add(GRAPHS_VIEW)
+
+        self.tt_return += row.value
+        self.dirty.update((LOOT_VIEW, RUNS_VIEW))
+
+        item = self.looted_items[row.name]
+        item["v"] += row.value
+        item["c"] += row.amount
+        self.loot_instance_value += row.value
+        self.total_return_mu += MarkupSingleton.apply_markup_to_item(row.name, row.amount, row.value)
+
+
+def matched_rows(n_lines):
+    """(rule, groups, ts) of every combat and loot line"""
+    times = LogTimeCache()
+    matched = []
+    for line in generate_lines(n_lines, start=datetime(2021, 9, 21, 9, 0, 0)):
+        if not is_tracked_channel(line):
+            continue
+        log_line = parse_log_line(line)
+        if log_line.channel != "System":
+            continue
+        match = SYSTEM_DISPATCHER.match(log_line.msg)
+        if match and match[0].cls in (CombatRow, LootInstance):
+            matched.append((match[0], match[1], times.parse(log_line.time)[1]))
+    return matched
+
+
+def build_rows(matched, loot_cls):
+    rows = []
+    for rule, groups, ts in matched:
+        cls = loot_cls if rule.cls is LootInstance else rule.cls
+        row = cls(*groups, **rule.kwargs)
+        row.ts = ts
+        rows.append(row)
+    return rows
+
+
+def add_rows(rows, trip_cls):
+    trip = trip_cls(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.0812"))
+    for row in rows:
+        trip.add_chat_row(row)
+    return trip
+
+
+def timed(repeat, func, *args):
+    """:return: The result and the best time of repeat calls"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    matched = matched_rows(args.lines)
+    loots = [m for m in matched if m[0].cls is LootInstance]
+    print(f"{len(matched):,} combat and loot rows, {len(loots):,} of them loot")
+
+    _, old_build = timed(args.repeat, build_rows, loots, DecimalLootInstance)
+    _, new_build = timed(args.repeat, build_rows, loots, LootInstance)
+    old_rows, new_rows = build_rows(matched, DecimalLootInstance), build_rows(matched, LootInstance)
+    old_trip, old_add = timed(args.repeat, add_rows, old_rows, DecimalHuntingTrip)
+    new_trip, new_add = timed(args.repeat, add_rows, new_rows, HuntingTrip)
+    assert (str(old_trip.total_cost), str(old_trip.tt_return)) == (str(new_trip.total_cost), str(new_trip.tt_return))
+
+    per_row = lambda seconds, rows: seconds / len(rows) * 1e6
+    print(f"  build_rows  Decimal: {per_row(old_build, loots):6.3f} us/loot row   "
+          f"integer: {per_row(new_build, loots):6.3f} us/loot row  ({old_build / new_build:.2f}x)")
+    print(f"  add_rows    Decimal: {per_row(old_add, matched):6.3f} us/row        "
+          f"integer: {per_row(new_add, matched):6.3f} us/row       ({old_add / new_add:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
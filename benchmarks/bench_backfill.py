@@ -0,0 +1,45 @@
+"""
+Throughput of the offline backfill, single process against the process pool.
+
+    python benchmarks/bench_backfill.py --lines 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chatgen import write_chat_log
+from modules.backfill import backfill_runs
+
+
+def run(path, workers):
+    start = time.perf_counter()
+    trip, = backfill_runs(path, [(None, None)], Decimal("0.05"), workers=workers)
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"workers={workers or os.cpu_count():<3} {elapsed:7.2f}s  {size_mb / elapsed:7.1f} MB/s  "
+          f"~{1024 / (size_mb / elapsed):6.1f}s per GB  ({trip.total_attacks} attacks, {trip.loot_instances} loots)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=5000000)
+    parser.add_argument("--log", help="Use an existing chat.log instead of a generated one")
+    args = parser.parse_args()
+
+    path = args.log
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        write_chat_log(path, args.lines)
+
+    run(path, 1)
+    run(path, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Lines/sec of the System/Globals rule matching, before ( one rx.search per rule ) and after ( RuleDispatcher ).
+
+    python benchmarks/bench_dispatch.py --lines 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import REGEXES, GLOBAL_REGEXES, SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, parse_log_line
+from chatgen import write_chat_log
+
+
+def legacy_parse(log_line):
+    """The rule loop as it was before the compiled dispatcher"""
+    if log_line.channel == "System":
+        table = REGEXES
+    elif log_line.channel == "Globals":
+        table = GLOBAL_REGEXES
+    else:
+        return None
+    for rx in table:
+        match = rx.search(log_line.msg)
+        if match:
+            chat_type, chat_cls, kwargs = table[rx]
+            chat_instance = chat_cls(*match.groups(), **kwargs)
+            chat_instance.time = datetime.strptime(log_line.time, "%Y-%m-%d %H:%M:%S")
+            return chat_instance
+    return None
+
+
+def dispatcher_parse(log_line):
+    if log_line.channel == "System":
+        return SYSTEM_DISPATCHER.build(log_line)
+    elif log_line.channel == "Globals":
+        return GLOBAL_DISPATCHER.build(log_line)
+    return None
+
+
+def legacy_match(log_line):
+    table = REGEXES if log_line.channel == "System" else GLOBAL_REGEXES
+    for rx in table:
+        match = rx.search(log_line.msg)
+        if match:
+            return table[rx], match.groups()
+    return None
+
+
+def dispatcher_match(log_line):
+    dispatcher = SYSTEM_DISPATCHER if log_line.channel == "System" else GLOBAL_DISPATCHER
+    return dispatcher.match(log_line.msg)
+
+
+def run_matching(path, match):
+    with open(path, "r", encoding="utf_8_sig") as f:
+        log_lines = [ll for ll in map(parse_log_line, f) if ll.channel in ("System", "Globals")]
+    start = time.perf_counter()
+    for log_line in log_lines:
+        match(log_line)
+    return len(log_lines) / (time.perf_counter() - start)
+
+
+def run(path, parse):
+    start = time.perf_counter()
+    n = 0
+    with open(path, "r", encoding="utf_8_sig") as f:
+        for line in f:
+            parse(parse_log_line(line))
+            n += 1
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000000)
+    parser.add_argument("--log", help="Use an existing chat.log instead of a generated one")
+    args = parser.parse_args()
+
+    path = args.log
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        write_chat_log(path, args.lines)
+
+    before = run_matching(path, legacy_match)
+    after = run_matching(path, dispatcher_match)
+    print("Rule matching only ( System/Globals messages )")
+    print(f"  rule loop:       {before:12,.0f} lines/sec")
+    print(f"  rule dispatcher: {after:12,.0f} lines/sec  ({after / before:.2f}x)")
+
+    before = run(path, legacy_parse)
+    after = run(path, dispatcher_parse)
+    print("Full line to chat row ( every line in the log )")
+    print(f"  rule loop:       {before:12,.0f} lines/sec")
+    print(f"  rule dispatcher: {after:12,.0f} lines/sec  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Lines/sec from raw line to chat row on a log dominated by trade and society chat, before ( every line through
+LOG_LINE_REGEX ) and after ( is_tracked_channel on the raw line first ).
+
+    python benchmarks/bench_prefilter.py --lines 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, is_tracked_channel, parse_log_line
+from chatgen import generate_lines
+
+
+def build(log_line):
+    if log_line.channel == "System":
+        return SYSTEM_DISPATCHER.build(log_line)
+    elif log_line.channel == "Globals":
+        return GLOBAL_DISPATCHER.build(log_line)
+    return None
+
+
+def unfiltered(lines):
+    for line in lines:
+        build(parse_log_line(line))
+
+
+def prefiltered(lines):
+    for line in lines:
+        if is_tracked_channel(line):
+            build(parse_log_line(line))
+
+
+def run(lines, parse):
+    start = time.perf_counter()
+    parse(lines)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--other-weight", type=int, default=85, help="Percent of lines from untracked channels")
+    args = parser.parse_args()
+
+    lines = list(generate_lines(args.lines, system_weight=100 - args.other_weight - 1, global_weight=1,
+                                other_weight=args.other_weight))
+    tracked = sum(map(is_tracked_channel, lines))
+    print(f"{len(lines):,} lines, {tracked / len(lines) * 100:.0f}% System/Globals")
+
+    before = run(lines, unfiltered)
+    after = run(lines, prefiltered)
+    print(f"  every line parsed: {before:12,.0f} lines/sec")
+    print(f"  channel prefilter: {after:12,.0f} lines/sec  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
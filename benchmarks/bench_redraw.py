@@ -0,0 +1,90 @@
+"""
+Cost per UI tick of copying run state out for redrawing over a simulated 8 hour hunt, before ( every view on
+every tick ) and after ( only the views the new rows touched ).
+
+Qt isn't needed, what is timed is CombatModule.publish(), which builds every table the UI then renders. The number
+of views per tick is what the Qt side redraws, it skips parts of the snapshot that didn't change.
+
+    python benchmarks/bench_redraw.py --hours 8
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, is_tracked_channel, parse_log_line
+from chatgen import generate_lines
+from modules.combat import CombatModule, HuntingTrip, ALL_VIEWS
+
+
+def rows_per_second(hours):
+    """Rows of a generated hunt grouped by the second they were logged in"""
+    # generate_lines moves the clock on by a second every ~3.3 lines
+    lines = generate_lines(int(hours * 3600 * 3.3), start=datetime(2021, 9, 21, 9, 0, 0))
+    second, rows = None, []
+    for line in lines:
+        if not is_tracked_channel(line):
+            continue
+        log_line = parse_log_line(line)
+        dispatcher = SYSTEM_DISPATCHER if log_line.channel == "System" else GLOBAL_DISPATCHER
+        row = dispatcher.build(log_line)
+        if row is None:
+            continue
+        if row.ts != second and rows:
+            yield rows
+            rows = []
+        second = row.ts
+        rows.append(row)
+    if rows:
+        yield rows
+
+
+def simulate(hours, every_view, old_runs):
+    config = SimpleNamespace(name=SimpleNamespace(value="Hunter"), screenshot_enabled=SimpleNamespace(value=False))
+    module = CombatModule(SimpleNamespace(config=config, streamer_window=None))
+    for i in range(old_runs):
+        run = HuntingTrip(datetime(2021, 1, 1, 9, 0, 0), Decimal("0.05"))
+        run.time_end = run.time_start
+        module.runs.append(run)
+    module.is_logging = True
+
+    timings, views = [], 0
+    for rows in rows_per_second(hours):
+        module.ingest(rows)
+        if every_view:
+            module.mark_dirty()
+        views += len(module.dirty)
+        start = time.perf_counter()
+        module.publish()
+        timings.append(time.perf_counter() - start)
+    return timings, views / len(timings)
+
+
+def report(name, timings, views):
+    last_hour = timings[-3600:]
+    print(f"  {name}: {sum(timings) / len(timings) * 1000:6.3f} ms/tick mean, "
+          f"{sum(last_hour) / len(last_hour) * 1000:6.3f} ms/tick in the last hour, "
+          f"{max(timings) * 1000:6.3f} ms worst, {views:.1f} views redrawn/tick")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--runs", type=int, default=200, help="Finished runs already in the runs table")
+    args = parser.parse_args()
+
+    print(f"{args.hours:g} hour hunt, one tick per logged second, {args.runs} older runs")
+    before, before_views = simulate(args.hours, True, args.runs)
+    report("every view", before, before_views)
+    after, after_views = simulate(args.hours, False, args.runs)
+    report("dirty views", after, after_views)
+
+
+if __name__ == "__main__":
+    main()
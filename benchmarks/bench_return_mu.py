@@ -0,0 +1,69 @@
+"""
+Cost of reading a run's markup adjusted return as the number of distinct items looted grows, before ( every
+looted item through the markup store on each read ) and after ( the running total HuntingTrip keeps ).
+
+Each redraw reads it for the streamer window and the runs table, so the read cost is paid every tick.
+
+    python benchmarks/bench_return_mu.py --reads 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from chat import LootInstance
+from modules.combat import HuntingTrip, MarkupSingleton
+from utils.money import units_to_ped
+
+
+def recomputed_return_mu(run):
+    """total_return_mu as it was worked out before it was kept as a running total"""
+    total_return_mu = Decimal("0.0")
+    for k, v in run.looted_items.items():
+        value = units_to_ped(v["v"])
+        mu = MarkupSingleton.get_markup_for_item(k)
+        if mu.is_absolute:
+            total_return_mu += (value + (v["c"] * mu.value))
+        else:
+            total_return_mu += (value * mu.value)
+    return total_return_mu
+
+
+def build_run(items):
+    run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.1"))
+    run.total_cost = Decimal("100")
+    for i in range(items):
+        row = LootInstance(f"Item {i}", "3", "0.0300")
+        row.ts = i * 2
+        run.add_loot_instance_chat_row(row)
+    return run
+
+
+def time_reads(read, run, reads):
+    start = time.perf_counter()
+    for _ in range(reads):
+        read(run)
+    return (time.perf_counter() - start) / reads * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("distinct items    recomputed     running total")
+    for items in (10, 100, 1000, 10000):
+        run = build_run(items)
+        assert recomputed_return_mu(run) == run.total_return_mu
+        reads = max(10, args.reads * 10 // items)
+        before = time_reads(recomputed_return_mu, run, reads)
+        after = time_reads(lambda r: r.total_return_mu, run, args.reads)
+        print(f"  {items:>12,}  {before:10.2f} us  {after:12.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Bytes per parsed chat row, with __dict__ instances as the rows were before and with the slotted rows.
+
+Both representations are built from the same parsed rows and share their attribute values, so the difference
+is the per object overhead alone. The total is what a backlog of slotted rows costs including the values.
+
+    python benchmarks/bench_row_memory.py --lines 200000
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, parse_log_line
+from chatgen import generate_lines
+
+
+class DictRow(object):
+    """Stand in for the rows before __slots__, every instance carries its own __dict__"""
+    pass
+
+
+def slot_names(row):
+    return [name for cls in type(row).__mro__ for name in getattr(cls, "__slots__", ())]
+
+
+def as_dict_row(row):
+    copy = DictRow()
+    for name in slot_names(row):
+        setattr(copy, name, getattr(row, name))
+    return copy
+
+
+def as_slotted_row(row):
+    copy = type(row).__new__(type(row))
+    for name in slot_names(row):
+        setattr(copy, name, getattr(row, name))
+    return copy
+
+
+def parse(lines):
+    rows = []
+    for log_line in map(parse_log_line, lines):
+        if log_line.channel == "System":
+            row = SYSTEM_DISPATCHER.build(log_line)
+        elif log_line.channel == "Globals":
+            row = GLOBAL_DISPATCHER.build(log_line)
+        else:
+            continue
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def measure(build):
+    tracemalloc.start()
+    built = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=200000)
+    args = parser.parse_args()
+
+    lines = list(generate_lines(args.lines))
+    rows, total = measure(lambda: parse(lines))
+    n = len(rows)
+    _, dict_size = measure(lambda: [as_dict_row(row) for row in rows])
+    _, slotted_size = measure(lambda: [as_slotted_row(row) for row in rows])
+
+    print(f"{n:,} rows")
+    print(f"  __dict__ rows: {dict_size / n:8.1f} bytes/event object overhead")
+    print(f"  slotted rows:  {slotted_size / n:8.1f} bytes/event object overhead  "
+          f"({dict_size / slotted_size:.2f}x smaller)")
+    print(f"  slotted rows:  {total / n:8.1f} bytes/event including values")
+
+
+if __name__ == "__main__":
+    main()
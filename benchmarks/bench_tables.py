@@ -0,0 +1,101 @@
+"""
+Cost of building the loot and skill tables after each new row as the number of distinct items and skills grows,
+before ( every row sorted and formatted again ) and after ( ranked indexes kept in order as rows arrive, loot rows
+formatted only once they changed ).
+
+    python benchmarks/bench_tables.py --ticks 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from chat import LootInstance, SkillRow
+from modules.combat import HuntingTrip, MarkupSingleton
+from utils.money import units_to_ped
+
+
+def sorted_tables(run):
+    """get_item_loot_table_data and get_skill_table_data as they were"""
+    r = {"Item": [], "Value": [], "Count": [], "Markup": [], "Total Value": []}
+    for k, v in sorted(run.looted_items.items(), key=lambda t: t[1]["v"], reverse=True):
+        r["Item"].append(k)
+        value = units_to_ped(v["v"])
+        r["Value"].append(str(value))
+        r["Count"].append(str(v["c"]))
+        mu = MarkupSingleton.get_markup_for_item(k)
+        if mu.is_absolute:
+            r["Markup"].append("+{:.3f}".format(mu.value))
+            r["Total Value"].append("{:.4f}".format(value + (v["c"] * mu.value)))
+        else:
+            r["Markup"].append("{:.3f}%".format(mu.value * 100))
+            r["Total Value"].append("{:.4f}".format(value * mu.value))
+
+    d = {"Skill": [], "Value": [], "Procs": [], "Proc %": []}
+    for k, v in sorted(run.skillgains.items(), key=lambda t: t[1], reverse=True):
+        d["Skill"].append(k)
+        d["Value"].append("%.4f" % v)
+    tp = sum(i[1] for i in sorted(run.skillprocs.items(), key=lambda t: t[1], reverse=True))
+    for k, v in sorted(run.skillprocs.items(), key=lambda t: t[1], reverse=True):
+        d["Procs"].append(v)
+        d["Proc %"].append("{:.00%}".format(v / tp)) if tp != 0 else d["Proc %"].append("{:.00%}".format(0))
+    return r, d
+
+
+def ranked_tables(run, top=0):
+    return run.get_item_loot_table_data(top), run.get_skill_table_data(top)
+
+
+def top_tables(run):
+    # As many rows as the loot table has
+    return ranked_tables(run, 100)
+
+
+def new_rows(distinct, ticks):
+    rand = random.Random(1)
+    rows = []
+    for i in range(distinct + ticks):
+        # Every item and skill once, then the common ones again
+        n = i if i < distinct else int(rand.paretovariate(1.2)) % distinct
+        loot = LootInstance(f"Item {n}", "3", "0.0300")
+        loot.ts = i * 10
+        rows.append((loot, SkillRow(f"Skill {n}", "0.0100")))
+    return rows
+
+
+def time_ticks(tables, distinct, ticks):
+    run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.1"))
+    rows = new_rows(distinct, ticks)
+    for loot, skill in rows[:distinct]:
+        run.add_loot_instance_chat_row(loot)
+        run.add_skillgain_row(skill)
+    tables(run)
+
+    start = time.perf_counter()
+    for loot, skill in rows[distinct:]:
+        run.add_loot_instance_chat_row(loot)
+        run.add_skillgain_row(skill)
+        tables(run)
+    return (time.perf_counter() - start) / ticks * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("distinct items and skills    sorted        ranked       top 100")
+    for distinct in (10, 100, 500, 1000):
+        before = time_ticks(sorted_tables, distinct, args.ticks)
+        after = time_ticks(ranked_tables, distinct, args.ticks)
+        top = time_ticks(top_tables, distinct, args.ticks)
+        print(f"  {distinct:>23,}  {before:7.3f} ms  {after:9.3f} ms  {top:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
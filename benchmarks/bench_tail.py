@@ -0,0 +1,87 @@
+"""
+Latency and idle CPU of the chat.log tail backends.
+
+A writer thread appends timestamped lines to a file in bursts, a reader follows it with each backend and records
+how long every line took from being written to being yielded. The file is then left idle to measure the CPU the
+reader burns while nothing happens.
+
+    python benchmarks/bench_tail.py --lines 2000 --idle 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.tail import PollingTail, InotifyTail, inotify_available
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def writer(path, n_lines, burst):
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(n_lines):
+            f.write(f"{time.perf_counter()!r} [System] [] You inflicted 12.3 points of damage\n")
+            f.flush()
+            if not i % burst:
+                time.sleep(0.02)
+
+
+def measure(name, make_tail, n_lines, idle, burst):
+    path = os.path.join(tempfile.mkdtemp(), "chat.log")
+    open(path, "w").close()
+
+    tail = make_tail(path)
+    latencies = []
+    done = threading.Event()
+
+    def reader():
+        for line in tail.follow():
+            latencies.append(time.perf_counter() - float(line.split(" ", 1)[0]))
+            if len(latencies) == n_lines:
+                done.set()
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+
+    writer(path, n_lines, burst)
+    done.wait(10)
+
+    # Nothing is written from here on, all CPU used belongs to the reader
+    cpu_start = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu_start
+    tail.stop()
+
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{name:<26} p50 {percentile(ms, 50):7.2f} ms  p99 {percentile(ms, 99):7.2f} ms  "
+          f"max {max(ms):7.2f} ms  idle cpu {idle_cpu / idle * 100:6.3f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=20, help="Lines written back to back before a short pause")
+    parser.add_argument("--idle", type=float, default=5.0, help="Seconds of idle time measured")
+    args = parser.parse_args()
+
+    backends = [
+        ("fixed 10 ms polling", lambda path: PollingTail(path, min_delay=0.01, max_delay=0.01)),
+        ("adaptive polling", lambda path: PollingTail(path)),
+    ]
+    if inotify_available():
+        backends.append(("inotify", lambda path: InotifyTail(path)))
+
+    for name, make_tail in backends:
+        measure(name, make_tail, args.lines, args.idle, args.burst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Timestamps/sec for the time of every System/Globals line, before ( strptime + mktime per row ) and after
+( parse_log_time behind a LogTimeCache ).
+
+    python benchmarks/bench_timestamps.py --lines 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(__file__))
+
+from chat import LogTimeCache, parse_log_line, parse_log_time
+from chatgen import generate_lines
+
+
+def legacy_times(log_times):
+    for log_time in log_times:
+        dt = datetime.strptime(log_time, "%Y-%m-%d %H:%M:%S")
+        time.mktime(dt.timetuple())
+
+
+def uncached_times(log_times):
+    for log_time in log_times:
+        dt = parse_log_time(log_time)
+        time.mktime(dt.timetuple())
+
+
+def cached_times(log_times):
+    cache = LogTimeCache()
+    for log_time in log_times:
+        cache.parse(log_time)
+
+
+def run(log_times, parse):
+    start = time.perf_counter()
+    parse(log_times)
+    return len(log_times) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1000000)
+    args = parser.parse_args()
+
+    log_times = [ll.time for ll in map(parse_log_line, generate_lines(args.lines))
+                 if ll.channel in ("System", "Globals")]
+    print(f"{len(log_times):,} timestamps, {len(set(log_times)):,} distinct seconds")
+
+    before = run(log_times, legacy_times)
+    print(f"  strptime + mktime:  {before:12,.0f} timestamps/sec")
+    for name, parse in (("fixed width parser", uncached_times), ("last second cache", cached_times)):
+        after = run(log_times, parse)
+        print(f"  {name}: {after:12,.0f} timestamps/sec  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
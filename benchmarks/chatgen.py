@@ -0,0 +1,93 @@
+"""
+Synthetic chat.log generator shared by the benchmarks.
+
+The default mix approximates a hunt with heavy damage spam, the lines are written in the same format
+Entropia Universe writes to chat.log.
+"""
+import random
+from datetime import datetime, timedelta
+
+
+SYSTEM_MESSAGES = [
+    (40, "You inflicted {dmg} points of damage"),
+    (4, "Critical hit - Additional damage! You inflicted {dmg} points of damage"),
+    (8, "You missed"),
+    (3, "The target Dodged your attack"),
+    (2, "The target Evaded your attack"),
+    (1, "The target Jammed your attack"),
+    (10, "You took {dmg} points of damage"),
+    (3, "Damage deflected!"),
+    (3, "You Evaded the attack"),
+    (2, "You healed yourself {dmg} points"),
+    (4, "You received Shrapnel x ({count}) Value: {ped} PED"),
+    (2, "You received Animal Oil Residue x ({count}) Value: {ped} PED"),
+    (2, "You have gained {skill} experience in your Laser Weaponry Technology skill"),
+    (1, "You have gained {skill} Agility"),
+    (1, "Your Rifle has improved by {skill}"),
+    (1, "Your enhancer Weapon Damage Enhancer 1 on your Sollomate Opalo broke."),
+    (2, "Your hit points have been restored"),
+]
+
+GLOBAL_MESSAGES = [
+    (5, "Nanashana Nana Itsanai killed a creature (Atrox Young) with a value of {glob} PED!"),
+    (1, "Nanashana Nana Itsanai killed a creature (Atrox Young) with a value of {glob} PED! "
+        "A record has been added to the Hall of Fame!"),
+    (1, "Someone Else constructed an item (Explosive Projectiles) worth {glob} PED!"),
+    (1, "Someone Else found a deposit (Lysterium Stone) with a value of {glob} PED!"),
+]
+
+OTHER_CHANNELS = [
+    (6, "#calypso", "Trader Tom", "WTB Shrapnel 101%, pm me"),
+    (3, "Trade", "Seller Sam", "WTS Opalo (L) 30/30 tier 3, best offer"),
+    (1, "Rookie", "New Player", "how do i get to port atlantis?"),
+]
+
+
+def _weighted(choices):
+    weights = [c[0] for c in choices]
+    return lambda rng: rng.choices(choices, weights)[0]
+
+
+def generate_lines(n_lines, seed=1, system_weight=90, global_weight=2, other_weight=8, start=None):
+    """
+    Yields n_lines raw chat.log lines ( without line terminators )
+    :param n_lines: Number of lines to generate
+    :param seed: Seed for the random number generator so runs are comparable
+    :param system_weight: Relative weight of [System] lines
+    :param global_weight: Relative weight of [Globals] lines
+    :param other_weight: Relative weight of other channels ( trade, society, etc )
+    :param start: datetime of the first line
+    """
+    rng = random.Random(seed)
+    t = start or datetime(2021, 9, 21, 9, 0, 0)
+    pick_system = _weighted(SYSTEM_MESSAGES)
+    pick_global = _weighted(GLOBAL_MESSAGES)
+    pick_other = _weighted(OTHER_CHANNELS)
+    pick_channel = _weighted([(system_weight, "System"), (global_weight, "Globals"), (other_weight, "")])
+
+    for i in range(n_lines):
+        if rng.random() < 0.3:
+            t += timedelta(seconds=1)
+        ts = t.strftime("%Y-%m-%d %H:%M:%S")
+        channel = pick_channel(rng)[1]
+        values = {
+            "dmg": "%.1f" % rng.uniform(10, 120),
+            "count": rng.randint(1, 9000),
+            "ped": "%.4f" % rng.uniform(0.01, 2),
+            "skill": "%.4f" % rng.uniform(0.0001, 0.5),
+            "glob": rng.randint(50, 500),
+        }
+        if channel == "System":
+            yield f"{ts} [System] [] {pick_system(rng)[1].format(**values)}"
+        elif channel == "Globals":
+            yield f"{ts} [Globals] [] {pick_global(rng)[1].format(**values)}"
+        else:
+            _, chan, speaker, msg = pick_other(rng)
+            yield f"{ts} [{chan}] [{speaker}] {msg}"
+
+
+def write_chat_log(path, n_lines, **kwargs):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in generate_lines(n_lines, **kwargs):
+            f.write(line + "\n")
+    return path
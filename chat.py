@@ -1,12 +1,21 @@
-import tailer
 import enum
 from datetime import datetime
 from collections import namedtuple
+from typing import List
+import os
 import re
+import sys
 import time
 import win_unicode_console
 import threading
 
+from utils.event_queue import EventQueue, DEFAULT_MAXSIZE
+from utils.tail import open_tail, fingerprint_matches
+from utils.log_index import ChatLogIndex
+from utils.unmatched import UnmatchedLines
+from utils.profiling import PROFILER
+from utils.money import PED_DECIMALS, ped_places, ped_to_units, units_to_ped
+
 from decimal import Decimal
 win_unicode_console.enable()
 
@@ -26,12 +35,25 @@ class ChatType(str, enum.Enum):
 
 
 class BaseChatRow(object):
+    # Rows are created for every matched line, slots keep them to a fraction of the size of a __dict__ instance
+    __slots__ = ("time", "ts", "read_time", "offset", "fingerprint", "source")
 
     def __init__(self, *args, **kwargs):
         self.time = None
+        # self.time as whole seconds since the epoch
+        self.ts = None
+        # time.time() when the chat reader queued the row, for measuring how long rows take to reach the UI
+        self.read_time = None
+        # Character of the additional chat.log the row came from, None for the main chat.log
+        self.source = None
+
+        # Where the line this row came from ends in chat.log, and which chat.log that was
+        self.offset = None
+        self.fingerprint = None
 
 
 class HealRow(BaseChatRow):
+    __slots__ = ("amount",)
 
     def __init__(self, amount):
         super().__init__()
@@ -39,6 +61,7 @@ class HealRow(BaseChatRow):
 
 
 class CombatRow(BaseChatRow):
+    __slots__ = ("amount", "critical", "miss")
 
     def __init__(self, amount=0.0, critical=False, miss=False):
         super().__init__()
@@ -48,19 +71,21 @@ class CombatRow(BaseChatRow):
 
 
 class SkillRow(BaseChatRow):
+    __slots__ = ("amount", "skill")
 
     def __init__(self, amount, skill):
         super().__init__()
         try:
             self.amount = float(amount)
-            self.skill = skill
+            self.skill = sys.intern(skill)
         except ValueError:
             # Attributes have their values swapped around in the chat message
             self.amount = float(skill)
-            self.skill = amount
+            self.skill = sys.intern(amount)
 
 
 class EnhancerBreakages(BaseChatRow):
+    __slots__ = ("type",)
 
     def __init__(self, type):
         super().__init__()
@@ -68,22 +93,33 @@ class EnhancerBreakages(BaseChatRow):
 
 
 class LootInstance(BaseChatRow):
+    __slots__ = ("name", "amount", "units", "places")
+    # Value of one item in units of 1 / PED_UNITS PED
     CUSTOM_VALUES = {
-        "Shrapnel": Decimal("0.0001")
+        "Shrapnel": 1
     }
 
     def __init__(self, name, amount, value):
         super().__init__()
-        self.name = name
+        # The same few item names repeat for the whole session
+        self.name = sys.intern(name)
         self.amount = int(amount)
 
+        # Value in units of 1 / PED_UNITS PED, runs add it up as an integer
         if name in self.CUSTOM_VALUES:
-            self.value = Decimal(amount) * self.CUSTOM_VALUES[name]
+            self.units = self.amount * self.CUSTOM_VALUES[name]
+            self.places = PED_DECIMALS
         else:
-            self.value = Decimal(value)
+            self.units = ped_to_units(value)
+            self.places = ped_places(value)
+
+    @property
+    def value(self) -> Decimal:
+        return units_to_ped(self.units, self.places)
 
 
 class GlobalInstance(BaseChatRow):
+    __slots__ = ("name", "creature", "value", "hof", "location")
 
     def __init__(self, name, creature, value, location=None, hof=False):
         super().__init__()
@@ -112,86 +148,535 @@ def parse_log_line(line: str) -> LogLine:
     return LogLine(*matched.groups())
 
 
-REGEXES = {
-    re.compile("Critical hit - Additional damage! You inflicted (\d+\.\d+) points of damage"): (ChatType.DAMAGE, CombatRow, {"critical": True}),
-    re.compile("You inflicted (\d+\.\d+) points of damage"): (ChatType.DAMAGE, CombatRow, {}),
-    re.compile("You healed yourself (\d+\.\d+) points"): (ChatType.HEAL, HealRow, {}),
-    re.compile("Damage deflected!"): (ChatType.DEFLECT, BaseChatRow, {}),
-    re.compile("You Evaded the attack"): (ChatType.EVADE, BaseChatRow, {}),
-    re.compile("You missed"): (ChatType.DODGE, CombatRow, {"miss": True}),
-    re.compile("The target Dodged your attack"): (ChatType.DODGE, CombatRow, {"miss": True}),
-    re.compile("The target Evaded your attack"): (ChatType.DODGE, CombatRow, {"miss": True}),
-    re.compile("The target Jammed your attack"): (ChatType.DODGE, CombatRow, {"miss": True}),
-    re.compile("You took (\d+\.\d+) points of damage"): (ChatType.DAMAGE, BaseChatRow, {}),
-    re.compile("You have gained (\d+\.\d+) experience in your ([a-zA-Z ]+) skill"): (ChatType.SKILL, SkillRow, {}),
-    re.compile("You have gained (\d+\.\d+) ([a-zA-Z ]+)"): (ChatType.SKILL, SkillRow, {}),
-    re.compile("Your ([a-zA-Z ]+) has improved by (\d+\.\d+)"): (ChatType.SKILL, SkillRow, {}),
-    re.compile("Your enhancer ([a-zA-Z0-9 ]+) on your .* broke."): (ChatType.ENHANCER, EnhancerBreakages, {}),
-    re.compile(r"You received (.*) x \((\d+)\) Value: (\d+\.\d+) PED"): (ChatType.LOOT, LootInstance, {})
-}
-
-GLOBAL_REGEXES = {
-    re.compile(r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED! A record has been added to the Hall of Fame!"): (ChatType.GLOBAL, GlobalInstance, {"hof": True}),
-    re.compile(r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED!"): (ChatType.GLOBAL, GlobalInstance, {}),
-    re.compile(r"([\w\s\'\(\)]+) constructed an item \(([\w\s\(\),]+)\) worth (\d+) PED! A record has been added to the Hall of Fame!"): (ChatType.GLOBAL, GlobalInstance, {"hof": True}),
-    re.compile(r"([\w\s\'\(\)]+) constructed an item \(([\w\s\(\),]+)\) worth (\d+) PED!"): (ChatType.GLOBAL, GlobalInstance, {}),
-    re.compile(r"([\w\s\'\(\)]+) found a deposit \(([\w\s\(\)]+)\) with a value of (\d+) PED! A record has been added to the Hall of Fame!"): (ChatType.GLOBAL, GlobalInstance, {"hof": True}),
-    re.compile(r"([\w\s\'\(\)]+) found a deposit \(([\w\s\(\)]+)\) with a value of (\d+) PED!"): (ChatType.GLOBAL, GlobalInstance, {}),
-    re.compile(r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED at ([\s\w\W]+)!"): (ChatType.GLOBAL, GlobalInstance, {}),
-}
+# Lines are "YYYY-MM-DD HH:MM:SS [Channel] ...", the channel token always starts right after the timestamp
+CHANNEL_OFFSET = 20
+
+
+def is_tracked_channel(line: str) -> bool:
+    """
+    Checks the channel of a raw log line without parsing it, chat from every other channel is thrown away
+    :param line: The raw line
+    :return: True for [System] and [Globals] lines
+    """
+    return line.startswith("[System]", CHANNEL_OFFSET) or line.startswith("[Globals]", CHANNEL_OFFSET)
+
+
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_log_time(log_time: str) -> datetime:
+    """
+    Parses a "YYYY-MM-DD HH:MM:SS" log timestamp by slicing, several times faster than strptime
+    :param log_time: The time field of a LogLine
+    :return: datetime
+    """
+    if len(log_time) != 19:
+        return datetime.strptime(log_time, LOG_TIME_FORMAT)
+    return datetime(int(log_time[0:4]), int(log_time[5:7]), int(log_time[8:10]),
+                    int(log_time[11:13]), int(log_time[14:16]), int(log_time[17:19]))
+
+
+class LogTimeCache(object):
+    """
+    Remembers the last timestamp parsed, most lines were logged in the same second as the line before them
+    """
+
+    def __init__(self):
+        # (log_time, datetime, epoch seconds), replaced as a whole so readers on other threads never see a mix
+        self._last = (None, None, None)
+
+    def parse(self, log_time: str):
+        """
+        :return: (datetime, epoch seconds) of the log timestamp
+        """
+        last = self._last
+        if last[0] == log_time:
+            return last[1], last[2]
+        dt = parse_log_time(log_time)
+        ts = int(time.mktime(dt.timetuple()))
+        self._last = (log_time, dt, ts)
+        return dt, ts
+
+
+# shadows lists the rules that also match this rule's messages, this rule must always be tried before them
+ChatRule = namedtuple("ChatRule", ["name", "pattern", "chat_type", "cls", "kwargs", "shadows"], defaults=((),))
+
+RuleStats = namedtuple("RuleStats", ["name", "hits", "position"])
+
+# Rules are listed in precedence order, the first rule that matches anywhere in a message wins
+SYSTEM_RULES = [
+    ChatRule("critical_damage", r"Critical hit - Additional damage! You inflicted (\d+\.\d+) points of damage", ChatType.DAMAGE, CombatRow, {"critical": True}, ("damage",)),
+    ChatRule("damage", r"You inflicted (\d+\.\d+) points of damage", ChatType.DAMAGE, CombatRow, {}),
+    ChatRule("heal", r"You healed yourself (\d+\.\d+) points", ChatType.HEAL, HealRow, {}),
+    ChatRule("deflect", r"Damage deflected!", ChatType.DEFLECT, BaseChatRow, {}),
+    ChatRule("evade", r"You Evaded the attack", ChatType.EVADE, BaseChatRow, {}),
+    ChatRule("miss", r"You missed", ChatType.DODGE, CombatRow, {"miss": True}),
+    ChatRule("target_dodge", r"The target Dodged your attack", ChatType.DODGE, CombatRow, {"miss": True}),
+    ChatRule("target_evade", r"The target Evaded your attack", ChatType.DODGE, CombatRow, {"miss": True}),
+    ChatRule("target_jam", r"The target Jammed your attack", ChatType.DODGE, CombatRow, {"miss": True}),
+    ChatRule("damage_taken", r"You took (\d+\.\d+) points of damage", ChatType.DAMAGE, BaseChatRow, {}),
+    ChatRule("skill_experience", r"You have gained (\d+\.\d+) experience in your ([a-zA-Z ]+) skill", ChatType.SKILL, SkillRow, {}, ("skill_gained",)),
+    ChatRule("skill_gained", r"You have gained (\d+\.\d+) ([a-zA-Z ]+)", ChatType.SKILL, SkillRow, {}),
+    ChatRule("skill_improved", r"Your ([a-zA-Z ]+) has improved by (\d+\.\d+)", ChatType.SKILL, SkillRow, {}),
+    ChatRule("enhancer_break", r"Your enhancer ([a-zA-Z0-9 ]+) on your .* broke.", ChatType.ENHANCER, EnhancerBreakages, {}),
+    ChatRule("loot", r"You received (.*) x \((\d+)\) Value: (\d+\.\d+) PED", ChatType.LOOT, LootInstance, {}),
+]
+
+GLOBAL_RULES = [
+    ChatRule("kill_hof", r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED! A record has been added to the Hall of Fame!", ChatType.GLOBAL, GlobalInstance, {"hof": True}, ("kill", "kill_location")),
+    ChatRule("kill", r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED!", ChatType.GLOBAL, GlobalInstance, {}, ("kill_location",)),
+    ChatRule("craft_hof", r"([\w\s\'\(\)]+) constructed an item \(([\w\s\(\),]+)\) worth (\d+) PED! A record has been added to the Hall of Fame!", ChatType.GLOBAL, GlobalInstance, {"hof": True}, ("craft",)),
+    ChatRule("craft", r"([\w\s\'\(\)]+) constructed an item \(([\w\s\(\),]+)\) worth (\d+) PED!", ChatType.GLOBAL, GlobalInstance, {}),
+    ChatRule("deposit_hof", r"([\w\s\'\(\)]+) found a deposit \(([\w\s\(\)]+)\) with a value of (\d+) PED! A record has been added to the Hall of Fame!", ChatType.GLOBAL, GlobalInstance, {"hof": True}, ("deposit",)),
+    ChatRule("deposit", r"([\w\s\'\(\)]+) found a deposit \(([\w\s\(\)]+)\) with a value of (\d+) PED!", ChatType.GLOBAL, GlobalInstance, {}),
+    ChatRule("kill_location", r"([\w\s\'\(\)]+) killed a creature \(([\w\s\(\),]+)\) with a value of (\d+) PED at ([\s\w\W]+)!", ChatType.GLOBAL, GlobalInstance, {}),
+]
+
+REGEXES = {re.compile(rule.pattern): (rule.chat_type, rule.cls, rule.kwargs) for rule in SYSTEM_RULES}
+
+GLOBAL_REGEXES = {re.compile(rule.pattern): (rule.chat_type, rule.cls, rule.kwargs) for rule in GLOBAL_RULES}
+
+
+# How many lines the dispatcher sees between re-ranking its rules by hit count
+REORDER_INTERVAL = 5000
+
+
+class RuleDispatcher(object):
+    """
+    Matches a message against an ordered rule table in a single regex call.
+
+    All rules are compiled into one alternation of named groups which is matched at the start of the message.
+    Chat messages start with the text a rule describes so this decides nearly every line, anything it can't place
+    falls back to searching each rule in table order.
+
+    Every rule keeps a hit counter and every REORDER_INTERVAL lines the alternation is recompiled with the busiest
+    rules first, so damage and miss lines stop paying for the rare rules ahead of them. Rules which overlap are
+    declared through ChatRule.shadows and always keep their relative order ( critical hits before plain damage ).
+    """
+
+    def __init__(self, rules: List[ChatRule], reorder_interval: int = REORDER_INTERVAL):
+        self.rules = list(rules)
+        self.reorder_interval = reorder_interval
+
+        self.hits = [0] * len(self.rules)
+        self.unmatched = 0
+        self.order = list(range(len(self.rules)))
+
+        # Indexes of the rules which have to be tried before each rule
+        self._shadowed_by = [set() for _ in self.rules]
+        indexes = {rule.name: i for i, rule in enumerate(self.rules)}
+        for i, rule in enumerate(self.rules):
+            for name in rule.shadows:
+                if indexes.get(name, -1) <= i:
+                    raise ValueError(f"Rule {rule.name} can only shadow rules listed after it, not {name}")
+                self._shadowed_by[indexes[name]].add(i)
+
+        # (alternation regex, named group -> (rule index, slice of its groups)), replaced as a whole so a match
+        # never pairs one ordering's regex with another's groups
+        self._compiled = (None, {})
+        self._searchers = [(re.compile(rule.pattern), i) for i, rule in enumerate(self.rules)]
+        self._until_reorder = reorder_interval
+        self.times = LogTimeCache()
+        self.compile()
+
+    def compile(self):
+        alternatives = []
+        targets = {}
+        group = 0
+        for i in self.order:
+            rule = self.rules[i]
+            name = f"r{i}"
+            n_groups = re.compile(rule.pattern).groups
+            alternatives.append(f"(?P<{name}>{rule.pattern})")
+            # The rule's own groups directly follow its named wrapper group
+            targets[name] = (i, slice(group + 1, group + 1 + n_groups))
+            group += 1 + n_groups
+        self._compiled = (re.compile("|".join(alternatives)), targets)
+
+    def frequency_order(self) -> List[int]:
+        """
+        Orders the rules by hit count while keeping every rule ahead of the rules it shadows
+        :return: List of rule indexes
+        """
+        # A rule is as urgent as the busiest rule it has to be tried before, rules only shadow later
+        # rules so walking the table backwards sees every shadowed rule first
+        weight = list(self.hits)
+        for i in reversed(range(len(self.rules))):
+            for j in self._shadowed_by[i]:
+                weight[j] = max(weight[j], weight[i])
+
+        order = []
+        remaining = set(range(len(self.rules)))
+        while remaining:
+            ready = [i for i in remaining if not self._shadowed_by[i] & remaining]
+            best = min(ready, key=lambda i: (-weight[i], i))
+            order.append(best)
+            remaining.remove(best)
+        return order
+
+    def reorder(self):
+        self._until_reorder = self.reorder_interval
+        order = self.frequency_order()
+        if order != self.order:
+            self.order = order
+            self.compile()
+
+    def stats(self) -> List[RuleStats]:
+        """
+        :return: Hit counts of every rule in the order they are currently tried
+        """
+        return [RuleStats(self.rules[i].name, self.hits[i], position) for position, i in enumerate(self.order)]
+
+    def match(self, msg: str):
+        """
+        Finds the rule matching a message
+        :param msg: The message part of a log line
+        :return: (ChatRule, groups) or None if no rule matched
+        """
+        self._until_reorder -= 1
+        if not self._until_reorder:
+            self.reorder()
+
+        rx, targets = self._compiled
+        matched = rx.match(msg)
+        if matched is not None:
+            i, groups = targets[matched.lastgroup]
+            self.hits[i] += 1
+            return self.rules[i], matched.groups()[groups]
+
+        for rx, i in self._searchers:
+            matched = rx.search(msg)
+            if matched:
+                self.hits[i] += 1
+                return self.rules[i], matched.groups()
+        self.unmatched += 1
+        return None
+
+    def build(self, log_line: LogLine):
+        """
+        Creates the chat row for a log line
+        :param log_line: The exploded log line
+        :return: BaseChatRow or None if no rule matched
+        """
+        matched = self.match(log_line.msg)
+        if matched is None:
+            return None
+        rule, groups = matched
+        chat_instance: BaseChatRow = rule.cls(*groups, **rule.kwargs)
+        chat_instance.time, chat_instance.ts = self.times.parse(log_line.time)
+        return chat_instance
+
+
+SYSTEM_DISPATCHER = RuleDispatcher(SYSTEM_RULES)
+GLOBAL_DISPATCHER = RuleDispatcher(GLOBAL_RULES)
+
+
+# Seconds before a failed reader is restarted, doubling for every failure in a row up to READER_MAX_BACKOFF
+READER_RESTART_DELAY = 1.0
+READER_MAX_BACKOFF = 30.0
+
+# One line in this many is timed for the Performance tab, timing them all would slow parsing down noticeably
+PARSE_SAMPLE_EVERY = 64
+
+ReaderHealth = namedtuple("ReaderHealth", ["running", "uptime", "restarts", "lines", "lines_per_sec",
+                                           "decode_errors", "line_errors", "last_error"])
 
 
 class ChatReader(object):
 
-    def __init__(self, app):
+    def __init__(self, app, location: str = None, source: str = None, maxsize: int = DEFAULT_MAXSIZE,
+                 index_filename: str = None):
+        """
+        :param location: chat.log to read, defaults to the one in the config
+        :param source: Character name the rows are tagged with, None for the main chat.log
+        :param maxsize: Rows held in memory before the reader waits, caps what one chat.log can queue up
+        :param index_filename: Where to keep the time index of chat.log, in the LootNanny app data by default
+        """
         self.app = app
-        self.lines = []
-
+        self.location = location
+        self.index_filename = index_filename
+        self.source = source
+        self.queue = EventQueue(maxsize)
+        # Set after every queued row when given, ChatSources shares one with the aggregation worker
+        self.arrived: threading.Event = None
+
+        # (offset, time, fingerprint) of the last row processed before LootNanny was closed
+        self.checkpoint = None
+        # Rows logged at or before this time have already been counted and are skipped
+        self.skip_until: datetime = None
+
+        self.path = None
+        self.tail = None
         self.reader = None
+        self.index: ChatLogIndex = None
+
+        # Lines thrown away by the channel prefilter, and lines that made it through to the regexes
+        self.lines_skipped = 0
+        self.lines_parsed = 0
+        # System lines no rule matched, counted by shape to help find missing rules
+        self.unmatched = UnmatchedLines()
+        # Every reader thread has its own dispatchers, their hit counters and rule order are only touched by it
+        self.system_dispatcher = RuleDispatcher(SYSTEM_RULES)
+        self.global_dispatcher = RuleDispatcher(GLOBAL_RULES)
+
+        # Supervision, the reader restarts from last_offset, just past the last line it finished with
+        self.last_offset = None
+        self.started = None
+        self.running = False
+        self.restarts = 0
+        self.line_errors = 0
+        self.last_error = ""
+        self.decode_errors = 0
+        self._rate_sample = (0, 0.0)
+
+    def resume(self, offset: int, log_time: datetime, fingerprint: str):
+        """
+        Makes the reader pick up right after a checkpointed row instead of at the end of chat.log
+        """
+        self.checkpoint = (offset, log_time, fingerprint)
+
+    def start_offset(self, path):
+        """
+        :return: Byte offset to start reading chat.log from, None for its current end
+        """
+        if not self.checkpoint:
+            return None
+        offset, log_time, fingerprint = self.checkpoint
+        try:
+            if os.path.getsize(path) >= offset and fingerprint_matches(path, fingerprint):
+                return offset
+        except OSError:
+            return None
+
+        # chat.log was truncated or replaced while we were closed, replay it without recounting anything
+        self.skip_until = log_time
+        return 0
 
     def delay_start_reader(self):
         if self.reader:
             return
 
-        if not self.app.config.location.value:
+        path = self.location or self.app.config.location.value
+        if not path:
             return
 
-        self.fd = tailer.follow(open(self.app.config.location.value, "r", encoding="utf_8_sig"), delay=0.01)
-        self.reader = threading.Thread(target=self.readlines, daemon=True)
+        self.path = path
+        self.open_tail(self.start_offset(self.path))
+        if self.index is None:
+            self.index = ChatLogIndex(self.path, filename=self.index_filename)
+        self.reader = threading.Thread(target=self.supervise, daemon=True)
         self.reader.start()
 
-    def readlines(self):
+    def open_tail(self, offset):
+        if self.tail:
+            self.decode_errors += self.tail.decode_errors
+        self.tail = open_tail(self.path, offset=offset)
+        self.tail.open()
+        self.last_offset = self.tail.offset
+        self.fd = self.tail.follow_entries()
+
+    def update_index(self):
+        """
+        Catches the time index up with chat.log before tailing extends it line by line
+        """
         try:
-            for line in self.fd:
-                log_line = parse_log_line(line)
-                if log_line.channel == "System":
-                    matched = False
-                    for rx in REGEXES:
-                        match = rx.search(log_line.msg)
-                        if match:
-                            chat_type, chat_cls, kwargs = REGEXES[rx]
-                            chat_instance: BaseChatRow = chat_cls(*match.groups(), **kwargs)
-                            chat_instance.time = datetime.strptime(log_line.time, "%Y-%m-%d %H:%M:%S")
-                            self.lines.append(chat_instance)
-                            matched = True
-                            break
-                    if not matched:
-                        print([log_line.msg])
-                elif log_line.channel == "Globals":
-                    matched = False
-                    for rx in GLOBAL_REGEXES:
-                        match = rx.search(log_line.msg)
-                        if match:
-                            chat_type, chat_cls, kwargs = GLOBAL_REGEXES[rx]
-                            chat_instance: GlobalInstance = chat_cls(*match.groups(), **kwargs)
-                            chat_instance.time = datetime.strptime(log_line.time, "%Y-%m-%d %H:%M:%S")
-                            self.lines.append(chat_instance)
-                            matched = True
-                            break
-        except UnicodeDecodeError:
+            self.index.load()
+            self.index.build()
+        except OSError:
             pass
 
-    def getline(self):
-        if len(self.lines):
-            return self.lines.pop(0)
-        return None
+    def supervise(self):
+        """
+        Runs the reader, restarting it from the last line it finished with whenever it fails
+        """
+        self.started = time.time()
+        self.update_index()
+        delay = READER_RESTART_DELAY
+        while True:
+            self.running = True
+            try:
+                self.readlines()
+                return
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                self.running = False
+
+            self.restarts += 1
+            time.sleep(delay)
+            delay = min(delay * 2, READER_MAX_BACKOFF)
+            try:
+                self.open_tail(self.last_offset)
+                delay = READER_RESTART_DELAY
+            except OSError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def readlines(self):
+        line_start = None
+        reopens = self.tail.reopens
+        for offset, line in self.fd:
+            if self.tail.reopens != reopens:
+                # chat.log was replaced, the index of the old file is no use
+                reopens = self.tail.reopens
+                self.index.reset(self.tail.fingerprint)
+                line_start = 0
+            if line_start is not None:
+                self.index.observe(line_start, line)
+            line_start = offset
+
+            try:
+                lines = self.lines_parsed + self.lines_skipped
+                if lines % PARSE_SAMPLE_EVERY:
+                    self.read_line(offset, line)
+                else:
+                    start = time.perf_counter()
+                    self.read_line(offset, line)
+                    PROFILER.record("reader.parse line", time.perf_counter() - start)
+            except Exception as e:
+                # A line we can't handle is skipped, it must not take the reader down with it
+                self.line_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.last_offset = offset
+
+    def read_line(self, offset: int, line: str):
+        if not is_tracked_channel(line):
+            self.lines_skipped += 1
+            return
+        self.lines_parsed += 1
+
+        log_line = parse_log_line(line)
+        if log_line.channel == "System":
+            chat_instance = self.system_dispatcher.build(log_line)
+            if chat_instance is None:
+                self.unmatched.add(log_line.time, log_line.msg)
+                return
+        elif log_line.channel == "Globals":
+            chat_instance = self.global_dispatcher.build(log_line)
+            if chat_instance is None:
+                return
+        else:
+            return
+
+        if self.skip_until:
+            if chat_instance.time <= self.skip_until:
+                return
+            self.skip_until = None
+
+        chat_instance.offset = offset
+        chat_instance.fingerprint = self.tail.fingerprint
+        chat_instance.source = self.source
+        chat_instance.read_time = time.time()
+        # Waits for as long as the queue is full, the reader stops reading and the backlog stays in chat.log.
+        # Rows are never dropped, so the checkpoint never moves past a row that didn't reach the run
+        self.queue.put(chat_instance)
+        if self.arrived:
+            self.arrived.set()
+
+    def health(self) -> ReaderHealth:
+        """
+        :return: State of the reader thread, lines_per_sec is measured since the previous call
+        """
+        now = time.time()
+        lines = self.lines_parsed + self.lines_skipped
+        last_lines, last_time = self._rate_sample
+        lines_per_sec = (lines - last_lines) / (now - last_time) if last_time and now > last_time else 0.0
+        self._rate_sample = (lines, now)
+        return ReaderHealth(
+            running=self.running,
+            uptime=now - self.started if self.started else 0.0,
+            restarts=self.restarts,
+            lines=lines,
+            lines_per_sec=lines_per_sec,
+            decode_errors=self.decode_errors + (self.tail.decode_errors if self.tail else 0),
+            line_errors=self.line_errors,
+            last_error=self.last_error,
+        )
+
+    def getlines(self, max_lines=None):
+        return self.queue.drain(max_lines)
+
+    def stop(self):
+        """
+        Stops the reader for good, its thread exits even while it waits for room in a full queue
+        """
+        if self.tail:
+            self.tail.stop()
+        self.queue.close()
+
+
+# Rows each additional chat.log may have queued, they share the UI thread with the main chat.log
+SOURCE_MAXSIZE = 20000
+
+
+class ChatSources(object):
+    """
+    The main chat reader plus one reader per additional chat.log in the config, merged into one stream of rows.
+    Every batch takes an equal share from each reader, starting with a different one each time, so a busy
+    client can't starve the others.
+    """
+
+    def __init__(self, app, primary: ChatReader):
+        self.app = app
+        self.primary = primary
+        # (character, location) -> reader
+        self.extra = {}
+        self.readers = [primary]
+        self._next = 0
+        # Set when any reader queues a row, so the aggregation worker can sleep until there is work
+        self.arrived = threading.Event()
+        primary.arrived = self.arrived
+
+    def sync(self):
+        """
+        Starts readers for additional chat.logs added to the config and stops those that were removed
+        """
+        wanted = {(log["name"], log["location"]) for log in self.app.config.extra_chat_logs.value}
+        for key in list(self.extra):
+            if key not in wanted:
+                self.extra.pop(key).stop()
+        for character, location in wanted:
+            if (character, location) not in self.extra:
+                reader = ChatReader(self.app, location=location, source=character, maxsize=SOURCE_MAXSIZE)
+                reader.arrived = self.arrived
+                run = self.app.combat_module.character_runs.get(character)
+                if run and run.log_offset is not None:
+                    reader.resume(run.log_offset, run.log_time, run.log_fingerprint)
+                self.extra[(character, location)] = reader
+        self.readers = [self.primary] + list(self.extra.values())
+
+    def delay_start_reader(self):
+        self.sync()
+        for reader in self.readers:
+            reader.delay_start_reader()
+
+    def getlines(self, max_lines=None):
+        readers = self.readers
+        if len(readers) == 1:
+            return self.primary.getlines(max_lines)
+
+        share = max(1, max_lines // len(readers)) if max_lines else None
+        start = self._next
+        self._next = (start + 1) % len(readers)
+        lines = []
+        for i in range(len(readers)):
+            lines.extend(readers[(start + i) % len(readers)].getlines(share))
+        return lines
+
+    def backlog(self) -> int:
+        return sum(len(reader.queue) for reader in self.readers)
+
+    def wait(self, timeout: float):
+        """
+        Waits up to timeout seconds for a reader to queue a row
+        """
+        self.arrived.wait(timeout)
+        self.arrived.clear()
+
+    def wake(self):
+        self.arrived.set()
+
+    def depths(self) -> dict:
+        """
+        :return: Rows queued in each reader, by the character it reads for
+        """
+        return {reader.source or "chat.log": len(reader.queue) for reader in self.readers}
@@ -29,6 +29,8 @@ class Config(object):
     location = CU.ConfigSecret("")
     name = CU.ConfigValue("")
     theme = CU.ConfigValue("dark")
+    # Chat logs of other clients, each {"name": character name, "location": path to its chat.log}
+    extra_chat_logs = CU.ConfigValue([])
 
     # Screenshot Configuration
     screenshot_directory = CU.ConfigValue("~/Documents/Globals/")
@@ -40,6 +42,13 @@ class Config(object):
     loadouts: List[Loadout] = CU.ConfigValue([], type=Loadout)
     selected_loadout: Loadout = CU.ConfigValue(None, type=Loadout)
     custom_weapons: List[CustomWeapon] = CU.ConfigValue(None)
+    # Seconds allowed between the loot lines of one kill
+    kill_gap = CU.ConfigValue(1)
+
+    # Performance
+    tick_budget_ms = CU.ConfigValue(30)
+    # Rows of the loot, skill and enhancer tables shown before the rest are summed into an others row, 0 for all
+    table_top_rows = CU.ConfigValue(0)
 
     # Streaming and Twitch
     streamer_layout = CU.JsonConfigValue(STREAMER_LAYOUT_DEFAULT)
@@ -55,6 +64,7 @@ class Config(object):
         self.initialized = False
         self.loadouts = []
         self.custom_weapons = []
+        self.extra_chat_logs = []
         self.twitch_commands_enabled = ["commands", "allreturns", "toploots", "info"]
 
         self.load_config()
@@ -0,0 +1,115 @@
+"""
+Folds parsed chat rows into the runs on a worker thread and publishes snapshots of them for the UI to render.
+"""
+import threading
+import time
+import traceback
+from typing import Callable
+
+from modules.combat import CombatModule
+from utils.profiling import PROFILER
+
+
+# Chat rows pulled from the readers per batch
+BATCH_SIZE = 256
+
+# Seconds between snapshots while rows keep arriving
+PUBLISH_INTERVAL = 0.25
+
+# Most seconds to sleep when every reader is empty, a reader queueing a row wakes the worker sooner
+IDLE_WAIT = 1.0
+
+
+class AggregationWorker(object):
+
+    def __init__(self, combat_module: CombatModule, sources, config):
+        """
+        :param sources: ChatSources, or anything else with getlines(max_lines), depths(), wait(timeout) and wake()
+        :param config: Config, tick_budget_ms bounds how long the worker holds the run lock at a time
+        """
+        self.combat_module = combat_module
+        self.sources = sources
+        self.config = config
+
+        self.thread = None
+        self.last_publish = 0.0
+        # Called from the worker thread after every publish
+        self.listeners = []
+        # Steps that raised, rows the step had already taken from the readers may not have reached the runs
+        self.errors = 0
+        self._stopped = False
+
+    def add_listener(self, callback: Callable[[], None]):
+        self.listeners.append(callback)
+
+    def start(self):
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self.sources.wake()
+
+    def run(self):
+        while not self._stopped:
+            try:
+                busy = PROFILER.profiled(self.step)
+            except Exception:
+                # Rows that raise are handled one at a time by CombatModule.ingest, this is anything else
+                self.errors += 1
+                print("Aggregation step failed, rows taken from the readers in it may be missing from the run:")
+                traceback.print_exc()
+                busy = False
+            if not busy:
+                self.sources.wait(self.idle_wait())
+
+    def idle_wait(self) -> float:
+        """
+        :return: Seconds the worker can sleep when out of rows, until the next snapshot is due if one is needed
+        """
+        if not self.combat_module.dirty:
+            return IDLE_WAIT
+        return max(0.0, min(IDLE_WAIT, self.last_publish + PUBLISH_INTERVAL - time.perf_counter()))
+
+    def step(self) -> bool:
+        """
+        Ingests queued rows for up to the tick budget, then publishes a snapshot if one is due
+        :return: True if any rows were ingested
+        """
+        module = self.combat_module
+        deadline = time.perf_counter() + self.config.tick_budget_ms.value / 1000.0
+        busy = False
+        for name, depth in self.sources.depths().items():
+            PROFILER.record_depth(name, depth)
+
+        with PROFILER.stage("worker.lock wait"):
+            module.lock.acquire()
+        try:
+            if module.is_logging and not module.is_paused and module.active_run is None:
+                # Logging was started without start_run, the run shows before its first row all the same
+                module.create_new_run()
+            while True:
+                with PROFILER.stage("worker.read"):
+                    lines = self.sources.getlines(BATCH_SIZE)
+                if not lines:
+                    break
+                with PROFILER.stage("worker.ingest"):
+                    module.ingest(lines)
+                busy = True
+                if time.perf_counter() >= deadline:
+                    break
+            with PROFILER.stage("worker.autosave"):
+                module.autosave()
+        finally:
+            module.lock.release()
+
+        now = time.perf_counter()
+        if module.dirty and now - self.last_publish >= PUBLISH_INTERVAL:
+            self.last_publish = now
+            with PROFILER.stage("worker.publish"):
+                module.publish()
+            for callback in self.listeners:
+                callback()
+        return busy
@@ -0,0 +1,201 @@
+"""
+Rebuilds hunting runs from an existing chat.log after the fact.
+
+    python -m modules.backfill chat.log --start "2021-09-21 14:00:00" --end "2021-09-21 15:30:00" --cps 0.123
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
+
+from chat import CHANNEL_OFFSET, BaseChatRow, GlobalInstance, LogTimeCache, SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, \
+    parse_log_line, parse_log_time
+from modules.combat import HuntingTrip
+from utils.log_index import ChatLogIndex
+from utils.tail import UTF8_BOM
+
+
+# Bytes of chat.log handed to a worker at a time
+CHUNK_SIZE = 16 * 1024 * 1024
+
+TimeRange = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def split_chunks(path: str, start: int = 0, end: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """
+    Splits a byte range of a file into chunks that start and end on line boundaries
+    :return: List of (start, end) byte offsets
+    """
+    if end is None:
+        end = os.path.getsize(path)
+
+    chunks = []
+    with open(path, "rb") as f:
+        while start < end:
+            split = min(start + chunk_size, end)
+            if split < end:
+                # Move the split just past the next newline
+                f.seek(split)
+                f.readline()
+                split = min(f.tell(), end)
+            chunks.append((start, split))
+            start = split
+    return chunks
+
+
+DISPATCHERS = (SYSTEM_DISPATCHER, GLOBAL_DISPATCHER)
+CHANNELS = {"System": 0, "Globals": 1}
+
+
+def parse_chunk(path: str, start: int, end: int, time_range: TimeRange = (None, None)) -> List[tuple]:
+    """
+    Parses the chat rows in a byte range of chat.log, runs inside a worker process.
+
+    Rows are returned as plain (dispatcher, rule, groups, time, ts, offset) records rather than chat row objects,
+    they pickle back to the parent process an order of magnitude faster
+    :param time_range: Only rows logged within (start, end) inclusive are returned, None leaves that side open
+    """
+    range_start, range_end = time_range
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    rule_indexes = [{rule.name: i for i, rule in enumerate(dispatcher.rules)} for dispatcher in DISPATCHERS]
+
+    records = []
+    offset = start
+    times = LogTimeCache()
+    for raw in data.split(b"\n"):
+        if offset == 0 and raw.startswith(UTF8_BOM):
+            raw = raw[len(UTF8_BOM):]
+            offset += len(UTF8_BOM)
+        offset += len(raw) + 1
+
+        if not (raw.startswith(b"[System]", CHANNEL_OFFSET) or raw.startswith(b"[Globals]", CHANNEL_OFFSET)):
+            continue
+        log_line = parse_log_line(raw.rstrip(b"\r").decode("utf-8", errors="replace"))
+        channel = CHANNELS.get(log_line.channel)
+        if channel is None:
+            continue
+        matched = DISPATCHERS[channel].match(log_line.msg)
+        if matched is None:
+            continue
+
+        log_time, ts = times.parse(log_line.time)
+        if range_start and log_time < range_start:
+            continue
+        if range_end and log_time > range_end:
+            continue
+
+        rule, groups = matched
+        records.append((channel, rule_indexes[channel][rule.name], groups, log_time, ts, offset))
+    return records
+
+
+def rows_from_records(records: List[tuple]) -> Iterator[BaseChatRow]:
+    for channel, rule_index, groups, log_time, ts, offset in records:
+        rule = DISPATCHERS[channel].rules[rule_index]
+        chat_instance: BaseChatRow = rule.cls(*groups, **rule.kwargs)
+        chat_instance.time = log_time
+        chat_instance.ts = ts
+        chat_instance.offset = offset
+        yield chat_instance
+
+
+def parse_log(path: str, time_range: TimeRange = (None, None), start: int = 0, end: Optional[int] = None,
+              workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[BaseChatRow]:
+    """
+    Parses a byte range of chat.log in parallel
+    :param workers: Number of worker processes, defaults to one per CPU
+    :return: The chat rows in file order
+    """
+    chunks = split_chunks(path, start, end, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        for chunk_start, chunk_end in chunks:
+            yield from rows_from_records(parse_chunk(path, chunk_start, chunk_end, time_range))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a couple of chunks per worker in flight so parsed rows don't pile up in memory
+        pending = deque()
+        for chunk_start, chunk_end in chunks:
+            pending.append(pool.submit(parse_chunk, path, chunk_start, chunk_end, time_range))
+            if len(pending) >= workers * 2:
+                yield from rows_from_records(pending.popleft().result())
+        while pending:
+            yield from rows_from_records(pending.popleft().result())
+
+
+def backfill_runs(path: str, time_ranges: List[TimeRange], cost_per_shot: Decimal, character_name: str = "",
+                  workers: Optional[int] = None, index: Optional[ChatLogIndex] = None) -> List[HuntingTrip]:
+    """
+    Rebuilds one run per time range, as if a run had been started and ended at those times
+    :param time_ranges: List of (start, end), ranges must not overlap
+    :param character_name: Globals by this character count towards the run
+    :param index: Time index of the log, limits parsing to the bytes that cover the time ranges
+    """
+    time_ranges = sorted(time_ranges, key=lambda r: r[0] or datetime.min)
+    runs = [HuntingTrip(range_start, cost_per_shot) for range_start, _ in time_ranges]
+    for run, (_, range_end) in zip(runs, time_ranges):
+        run.time_end = range_end
+
+    whole_range = (time_ranges[0][0], time_ranges[-1][1])
+    start, end = index.byte_range(*whole_range) if index else (0, None)
+    i = 0
+    for row in parse_log(path, whole_range, start, end, workers=workers):
+        while time_ranges[i][1] and row.time > time_ranges[i][1]:
+            i += 1
+            if i == len(time_ranges):
+                return _finish(runs)
+        if time_ranges[i][0] and row.time < time_ranges[i][0]:
+            continue
+
+        run = runs[i]
+        if run.time_start is None:
+            run.time_start = row.time
+        if isinstance(row, GlobalInstance):
+            if row.name.strip() == character_name.strip():
+                run.add_global_row(row)
+        else:
+            run.add_chat_row(row)
+        run.set_checkpoint(row)
+    return _finish(runs)
+
+
+def _finish(runs: List[HuntingTrip]) -> List[HuntingTrip]:
+    for run in runs:
+        if run.time_start is None:
+            run.time_start = run.time_end or datetime.now()
+        if run.time_end is None:
+            run.time_end = run.log_time or run.time_start
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild LootNanny runs from a chat.log")
+    parser.add_argument("log", help="Path to chat.log")
+    parser.add_argument("--start", help="Start of the run, YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--end", help="End of the run, YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--cps", default="0", help="Cost per shot in PED")
+    parser.add_argument("--name", default="", help="Character name, for counting globals")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--save", action="store_true", help="Save the run so LootNanny lists it")
+    args = parser.parse_args()
+
+    to_dt = lambda s: parse_log_time(s) if s else None
+    run, = backfill_runs(args.log, [(to_dt(args.start), to_dt(args.end))], Decimal(args.cps), args.name,
+                         workers=args.workers, index=ChatLogIndex.for_log(args.log))
+    print(f"{run.time_start} - {run.time_end}: {run.loot_instances} loots, {run.total_attacks} attacks, "
+          f"spend {run.total_cost:.2f} PED, return {run.tt_return:.2f} PED")
+    if args.save:
+        run.save_to_disk()
+        print(f"Saved to {run.filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,39 @@
 from collections import defaultdict, namedtuple
 from datetime import datetime
 import time
-from typing import List
+from typing import Dict, List
 from decimal import Decimal
 import threading
+import traceback
 import os
 import json
+import re
 
 
 from modules.base import BaseModule
 from chat import BaseChatRow, CombatRow, LootInstance, SkillRow, EnhancerBreakages, HealRow, GlobalInstance
 from helpers import dt_to_ts, ts_to_dt, format_filename
-from ocr import screenshot_window
-from modules.markup import MarkupStore
+from modules.markup import MarkupStore, Markup, apply_markup
+from utils.profiling import PROFILER
+from utils.money import PED_UNITS, ped_places, ped_to_units, units_to_ped
+from utils.series import DownsampledSeries
+from utils.ranking import RankedIndex
+from modules.segmentation import KillSegmenter, KILL_GAP, IGNORE, NEW_KILL
 
 
 RUNS_FILE = format_filename("runs.json")
+# Seconds between saves of the active run, bounds what a crash can lose
+AUTOSAVE_INTERVAL = 30
 RUNS_DIRECTORY = format_filename("")
+
+# Parts of the UI that show run state, runs mark the ones a change affects so only those are redrawn
+LOOT_VIEW = "loot"
+COMBAT_VIEW = "combat"
+SKILLS_VIEW = "skills"
+ENHANCERS_VIEW = "enhancers"
+RUNS_VIEW = "runs"
+GRAPHS_VIEW = "graphs"
+ALL_VIEWS = frozenset((LOOT_VIEW, COMBAT_VIEW, SKILLS_VIEW, ENHANCERS_VIEW, RUNS_VIEW, GRAPHS_VIEW))
 MarkupSingleton = MarkupStore()
 
 
@@ -25,6 +42,9 @@ def take_screenshot(delay_ms, directory, glob: GlobalInstance):
     :param glob:
     :return:
     """
+    # Late import, the screen capture stack isn't needed to track or rebuild runs
+    from ocr import screenshot_window
+
     time.sleep(delay_ms / 1000.0)
     im, _, _ = screenshot_window()
 
@@ -74,40 +94,64 @@ CustomWeapon = namedtuple("CustomWeapon", ["weapon", "decay", "ammo_burn"])
 
 class HuntingTrip(object):
 
-    def __init__(self, time_start: datetime, cost_per_shot: Decimal):
+    def __init__(self, time_start: datetime, cost_per_shot: Decimal, kill_gap: int = KILL_GAP):
+        """
+        :param kill_gap: Seconds allowed between the loot rows of one kill
+        """
         self.time_start = time_start
         self.time_end = None
 
         self.notes = ""
-
-        self.cost_per_shot: Decimal = cost_per_shot
-
-        self.tt_return = 0
+        # Character of an additional chat.log this run tracks, None for the main one
+        self.character: str = None
+
+        self._cost_per_shot: Decimal = cost_per_shot
+
+        # Shots and loot are counted as integers and only priced as Decimals when read, see the properties below.
+        # Spend is the cost settled at the last cost per shot change plus the shots taken since, and return is
+        # the saved return plus the loot since in units of 1 / PED_UNITS PED, None until the first loot, shown with
+        # the most decimal places any of that loot was written with
+        self.settled_cost = 0
+        self.shots = 0
+        self.tt_return_base = 0
+        self.tt_return_units: int = None
+        self.tt_return_places = 0
         self.globals = 0
         self.hofs = 0
-        self.total_cost = 0
-        self.cached_total_return_mu = Decimal("0.0")
+        # Return with markup, kept up to date as markups change. Loot is priced in batches when it is read,
+        # unpriced_loot holds item name -> [count, units] looted since
+        self._total_return_mu = Decimal("0.0")
+        self.unpriced_loot = {}
 
-        self.last_loot_instance = None
+        self.segmenter = KillSegmenter(kill_gap)
         self.loot_instances = 0
         self.extra_spend = Decimal(0.0)
 
-        # Tracking multipliers
-        self.loot_instance_cost = Decimal(0)
-        self.loot_instance_value = Decimal(0)
-        self.multipliers = ([], [])
-        self.return_over_time = []
-
-        self.looted_items = defaultdict(lambda: {"c": 0, "v": Decimal()})
+        # Tracking multipliers, the cost of the shots since the last kill is attached to the next kill
+        self.settled_loot_instance_cost = Decimal(0)
+        self.loot_instance_shots = 0
+        self.kill_cost = Decimal(0)
+        self.loot_instance_units = 0
+        # Cost (x) and return (y) of each loot instance, and tt return / spend after each
+        self.multipliers = DownsampledSeries(paired=True)
+        self.return_over_time = DownsampledSeries()
+
+        # Item name -> {"c": count, "v": value in units of 1 / PED_UNITS PED, "p": decimal places to show "v" with}
+        self.looted_items = defaultdict(lambda: {"c": 0, "v": 0, "p": 0})
+        # Item names by value, and item name -> ((units, count, markup), formatted row) of the rows shown last
+        self.loot_index = RankedIndex()
+        self.loot_rows = {}
 
         self.adjusted_cost = Decimal(0)
 
         # Enhancers
         self.enhancer_breaks = defaultdict(int)
+        self.enhancer_index = RankedIndex()
 
         # Skillgains
         self.skillgains = defaultdict(int)
         self.skillprocs = defaultdict(int)
+        self.skill_index = RankedIndex()
 
         # Combat Stats
         self.total_attacks = 0
@@ -115,11 +159,68 @@ class HuntingTrip(object):
         self.total_crits = 0
         self.total_misses = 0
 
+        # Views affected by rows added since the UI last took them
+        self.dirty = set()
+
+        # Position in chat.log of the last row added, where the chat reader resumes from
+        self.log_offset: int = None
+        self.log_time: datetime = None
+        self.log_fingerprint: str = None
+
+    @property
+    def cost_per_shot(self) -> Decimal:
+        return self._cost_per_shot
+
+    @cost_per_shot.setter
+    def cost_per_shot(self, cost_per_shot: Decimal):
+        # Shots taken so far are charged at the old cost
+        self.settled_cost = self.total_cost
+        self.settled_loot_instance_cost = self.loot_instance_cost
+        self.shots = self.loot_instance_shots = 0
+        self._cost_per_shot = cost_per_shot
+
+    @property
+    def total_cost(self):
+        if not self.shots:
+            return self.settled_cost
+        return self.settled_cost + self._cost_per_shot * self.shots
+
+    @total_cost.setter
+    def total_cost(self, total_cost: Decimal):
+        self.settled_cost = total_cost
+        self.shots = 0
+
+    @property
+    def loot_instance_cost(self) -> Decimal:
+        if not self.loot_instance_shots:
+            return self.settled_loot_instance_cost
+        return self.settled_loot_instance_cost + self._cost_per_shot * self.loot_instance_shots
+
+    @property
+    def tt_return(self):
+        if self.tt_return_units is None:
+            return self.tt_return_base
+        return self.tt_return_base + units_to_ped(self.tt_return_units, self.tt_return_places)
+
+    @tt_return.setter
+    def tt_return(self, tt_return: Decimal):
+        self.tt_return_base = tt_return
+        self.tt_return_units = None
+        self.tt_return_places = 0
+
+    def set_checkpoint(self, row: BaseChatRow):
+        if row.offset is None:
+            return
+        self.log_offset = row.offset
+        self.log_time = row.time
+        self.log_fingerprint = row.fingerprint
+
     def serialize_run(self):
         return {
             "start": dt_to_ts(self.time_start),
             "end": dt_to_ts(self.time_end) if self.time_end else None,
             "notes": self.notes,
+            "character": self.character,
             "config": {
                 "cps": str(self.cost_per_shot)
             },
@@ -133,7 +234,7 @@ class HuntingTrip(object):
                 "adj_cost": str(self.adjusted_cost),
                 "cached_mu_return": str(self.total_return_mu)
             },
-            "loot": {k: {"c": str(v["c"]), "v": str(v["v"])} for k, v in self.looted_items.items()},
+            "loot": {k: {"c": str(v["c"]), "v": str(units_to_ped(v["v"], v["p"]))} for k, v in self.looted_items.items()},
             "skills": dict(self.skillgains),
             "skillprocs": dict(self.skillprocs),
             "enhancers": dict(self.enhancer_breaks),
@@ -144,15 +245,24 @@ class HuntingTrip(object):
                 "misses": self.total_misses
             },
             "graphs": {
-                "returns": self.return_over_time,
-                "multis": list(self.multipliers)
+                "returns": self.return_over_time.serialize(),
+                "multis": self.multipliers.serialize()
+            },
+            "reader": {
+                "offset": self.log_offset,
+                "time": dt_to_ts(self.log_time) if self.log_time else None,
+                "fingerprint": self.log_fingerprint
             }
         }
 
     @classmethod
-    def from_seralized(cls, seralized, include_loot=False):
-        inst = cls(ts_to_dt(seralized["start"]), Decimal(seralized["config"]["cps"]))
+    def from_seralized(cls, seralized, include_loot=False, kill_gap: int = KILL_GAP):
+        """
+        :param kill_gap: Seconds allowed between the loot rows of one kill, for loot added after loading
+        """
+        inst = cls(ts_to_dt(seralized["start"]), Decimal(seralized["config"]["cps"]), kill_gap)
         inst.notes = seralized.get("notes", "")
+        inst.character = seralized.get("character")
 
         if seralized["end"]:
             inst.time_end = ts_to_dt(seralized["end"])
@@ -160,7 +270,7 @@ class HuntingTrip(object):
         # loot
         inst.tt_return = Decimal(seralized["summary"]["tt_return"])
         inst.extra_spend = Decimal(seralized["summary"].get("extra_spend", "0.0"))
-        inst.cached_total_return_mu = Decimal(seralized["summary"].get("cached_mu_return", "0.0"))
+        inst.total_return_mu = Decimal(seralized["summary"].get("cached_mu_return", "0.0"))
         inst.globals = seralized["summary"]["globals"]
         inst.hofs = seralized["summary"]["hofs"]
         inst.loot_instances = seralized["summary"]["loots"]
@@ -180,18 +290,38 @@ class HuntingTrip(object):
 
         # graphs
         if include_loot:
-            inst.return_over_time = seralized["graphs"]["returns"]
-            inst.multipliers = seralized["graphs"]["multis"]
+            returns, multis = seralized["graphs"]["returns"], seralized["graphs"]["multis"]
+            if isinstance(returns, list):
+                # Saved before the graphs were downsampled, every point in full
+                inst.return_over_time = DownsampledSeries.from_values(returns)
+                inst.multipliers = DownsampledSeries.from_values(multis[1], multis[0])
+            else:
+                inst.return_over_time = DownsampledSeries.from_serialized(returns)
+                inst.multipliers = DownsampledSeries.from_serialized(multis, paired=True)
 
         for k, v in seralized["enhancers"].items():
             inst.enhancer_breaks[k] = v
+        inst.enhancer_index = RankedIndex.from_dict(inst.enhancer_breaks)
 
         for k, v in seralized["skills"].items():
             inst.skillgains[k] = v
+        inst.skill_index = RankedIndex.from_dict(inst.skillgains)
+        for k, v in seralized.get("skillprocs", {}).items():
+            inst.skillprocs[k] = v
 
-        if include_loot:
+        if include_loot and seralized["loot"]:
             for k, v in seralized["loot"].items():
-                inst.looted_items[k] = {"c": int(v["c"]), "v": Decimal(v["v"])}
+                inst.looted_items[k] = {"c": int(v["c"]), "v": ped_to_units(v["v"]), "p": ped_places(v["v"])}
+            inst.loot_index = RankedIndex.from_dict(inst.looted_items, lambda item: item["v"])
+            # Markups may have changed since the run was saved
+            inst.total_return_mu = sum((MarkupSingleton.apply_markup_to_item(k, v["c"], units_to_ped(v["v"], v["p"]))
+                                        for k, v in inst.looted_items.items()), Decimal("0.0"))
+
+        reader = seralized.get("reader", {})
+        if reader.get("offset") is not None:
+            inst.log_offset = reader["offset"]
+            inst.log_time = ts_to_dt(reader["time"])
+            inst.log_fingerprint = reader["fingerprint"]
 
         return inst
 
@@ -203,29 +333,59 @@ class HuntingTrip(object):
 
     @property
     def filename(self):
+        if self.character:
+            # Runs for several characters are usually started in the same second
+            character = re.sub(r"[^\w\-]", "_", self.character)
+            return format_filename(f"LootNannyLog_{dt_to_ts(self.time_start)}_{character}.json")
         return format_filename(f"LootNannyLog_{dt_to_ts(self.time_start)}.json")
 
     def save_to_disk(self):
-        with open(self.filename, 'w') as f:
+        # Write to a temporary file first so a crash mid save never leaves a half written run behind
+        directory, fn = os.path.split(self.filename)
+        temp_filename = os.path.join(directory, f".{fn}.tmp")
+        with open(temp_filename, 'w') as f:
             f.write(json.dumps(self.serialize_run()))
+        os.replace(temp_filename, self.filename)
 
     @property
     def duration(self):
         d = self.time_end - self.time_start if self.time_end else datetime.now() - self.time_start
         return "{}:{}:{}".format(d.hours, d.seconds // 60, d.seconds % 60)
 
+    def add_chat_row(self, row: BaseChatRow) -> bool:
+        """
+        Adds a combat, loot, skill or enhancer row to the run, globals are handled by the caller
+        :return: True if the row changed the combat or loot totals
+        """
+        if isinstance(row, CombatRow):
+            self.add_combat_chat_row(row)
+            return True
+        elif isinstance(row, LootInstance):
+            self.add_loot_instance_chat_row(row)
+            return True
+        elif isinstance(row, EnhancerBreakages):
+            self.add_enhancer_break_row(row)
+        elif isinstance(row, SkillRow):
+            self.add_skillgain_row(row)
+        return False
+
     def add_skillgain_row(self, row: SkillRow):
         self.skillgains[row.skill] += row.amount
         self.skillprocs[row.skill] += 1
+        self.skill_index.update(row.skill, self.skillgains[row.skill])
+        self.dirty.add(SKILLS_VIEW)
 
     def add_enhancer_break_row(self, row: EnhancerBreakages):
         self.enhancer_breaks[row.type] += 1
+        self.enhancer_index.update(row.type, self.enhancer_breaks[row.type])
+        self.dirty.update((ENHANCERS_VIEW, RUNS_VIEW))
 
     @property
     def total_enhancer_breaks(self):
         return sum(self.enhancer_breaks.values())
 
     def add_global_row(self, row: GlobalInstance):
+        self.dirty.add(LOOT_VIEW)
         if row.hof:
             self.hofs += 1
             return
@@ -238,41 +398,75 @@ class HuntingTrip(object):
             self.total_crits += 1
         if row.miss:
             self.total_misses += 1
-        self.loot_instance_cost += self.cost_per_shot
-        self.total_cost += self.cost_per_shot
+        self.shots += 1
+        self.loot_instance_shots += 1
+        self.dirty.update((COMBAT_VIEW, LOOT_VIEW, RUNS_VIEW))
 
     def add_loot_instance_chat_row(self, row: LootInstance):
-        ts = time.mktime(row.time.timetuple()) // 2
-
-        # We dont want to consider sharp conversion as a loot event
-        if row.name == "Universal Ammo":
+        verdict = self.segmenter.classify(row)
+        if verdict == IGNORE:
             return
 
-        if self.last_loot_instance != ts:
-            # If looks like an enhancer break
-            if row.name == "Vibrant Sweat":
-                # Dont count sweat as a loot instance either
-                pass
-            elif row.name == "Shrapnel" and row.amount in {8000, 4000, 6000}:
-                pass  # But we still add the shrapnel back to the total items looted
-            else:
-                self.last_loot_instance = ts
-                self.loot_instances += 1
-
-                if self.loot_instance_value and self.loot_instance_cost:
-                    self.multipliers[0].append(float(self.loot_instance_cost))
-                    self.multipliers[1].append(float(self.loot_instance_value))
-
-                    self.loot_instance_cost = Decimal(0)
-                    self.loot_instance_value = Decimal(0)
-
-                    self.return_over_time.append(float(self.tt_return / self.total_cost))
-
-        self.tt_return += row.value
+        if verdict == NEW_KILL:
+            self.loot_instances += 1
+
+            # The previous kill is complete
+            if self.loot_instance_units and self.kill_cost:
+                self.multipliers.append(self.loot_instance_units / PED_UNITS, float(self.kill_cost))
+                self.return_over_time.append(float(self.tt_return / self.total_cost))
+                self.dirty.add(GRAPHS_VIEW)
+
+            self.kill_cost = self.loot_instance_cost
+            self.settled_loot_instance_cost = Decimal(0)
+            self.loot_instance_shots = 0
+            self.loot_instance_units = 0
+
+        units = row.units
+        self.tt_return_units = (self.tt_return_units or 0) + units
+        if row.places > self.tt_return_places:
+            self.tt_return_places = row.places
+        self.dirty.update((LOOT_VIEW, RUNS_VIEW))
+
+        item = self.looted_items[row.name]
+        item["v"] += units
+        item["c"] += row.amount
+        if row.places > item["p"]:
+            item["p"] = row.places
+        self.loot_index.update(row.name, item["v"])
+        self.loot_instance_units += units
+
+        unpriced = self.unpriced_loot.get(row.name)
+        if unpriced is None:
+            self.unpriced_loot[row.name] = [row.amount, units]
+        else:
+            unpriced[0] += row.amount
+            unpriced[1] += units
 
-        self.looted_items[row.name]["v"] += row.value
-        self.looted_items[row.name]["c"] += row.amount
-        self.loot_instance_value += row.value
+    @property
+    def total_return_mu(self) -> Decimal:
+        if self.unpriced_loot:
+            for name, (count, units) in self.unpriced_loot.items():
+                self._total_return_mu += MarkupSingleton.apply_markup_to_item(name, count, units_to_ped(units))
+            self.unpriced_loot = {}
+        return self._total_return_mu
+
+    @total_return_mu.setter
+    def total_return_mu(self, total_return_mu: Decimal):
+        self._total_return_mu = total_return_mu
+        self.unpriced_loot = {}
+
+    def apply_markup_change(self, name: str, old: Markup, new: Markup):
+        """
+        Moves total_return_mu by the difference a new markup makes to the loot of one item
+        """
+        item = self.looted_items.get(name)
+        if item is None:
+            return
+        # Loot not priced yet gets the new markup when it is
+        unpriced_count, unpriced_units = self.unpriced_loot.get(name, (0, 0))
+        count = item["c"] - unpriced_count
+        value = units_to_ped(item["v"] - unpriced_units)
+        self._total_return_mu += apply_markup(new, count, value) - apply_markup(old, count, value)
 
     @property
     def miss_chance(self):
@@ -292,56 +486,82 @@ class HuntingTrip(object):
             return Decimal(self.total_damage) / (Decimal(self.total_cost + self.extra_spend) * 100)
         return Decimal(0.0)
 
-    def get_skill_table_data(self):
-        d = {"Skill": [], "Value": [], "Procs":[], "Proc %":[]}
-        for k, v in sorted(self.skillgains.items(), key=lambda t: t[1], reverse=True):
-            d["Skill"].append(k)
-            d["Value"].append("%.4f" % v)
-        
+    def get_skill_table_data(self, top: int = 0):
+        """
+        :param top: Rows to show, the rest are summed into an others row, 0 shows every skill
+        """
+        d = {"Skill": [], "Value": [], "Procs": [], "Proc %": []}
         # Get total procs during hunt
-        tp = sum(i[1] for i in sorted(self.skillprocs.items(), key=lambda t: t[1], reverse=True))
-        for k, v in sorted(self.skillprocs.items(), key=lambda t: t[1], reverse=True):
-            d["Procs"].append(v)
-            d["Proc %"].append("{:.00%}".format(v/tp)) if tp != 0 else d["Proc %"].append("{:.00%}".format(0))
+        tp = sum(self.skillprocs.values())
+        proc_perc = lambda procs: "{:.00%}".format(procs / tp if tp else 0)
+
+        skills = self.skill_index.top(top)
+        for k in skills:
+            d["Skill"].append(k)
+            d["Value"].append("%.4f" % self.skillgains[k])
+            d["Procs"].append(self.skillprocs[k])
+            d["Proc %"].append(proc_perc(self.skillprocs[k]))
+        if len(self.skill_index) > len(skills):
+            procs = tp - sum(self.skillprocs[k] for k in skills)
+            d["Skill"].append(OTHERS_ROW.format(len(self.skill_index) - len(skills)))
+            d["Value"].append("%.4f" % (self.get_total_skill_gain() - sum(self.skillgains[k] for k in skills)))
+            d["Procs"].append(procs)
+            d["Proc %"].append(proc_perc(procs))
         return d
 
     def get_total_skill_gain(self):
         return sum(self.skillgains.values())
 
-    def get_enhancer_table_data(self):
+    def get_enhancer_table_data(self, top: int = 0):
+        """
+        :param top: Rows to show, the rest are summed into an others row, 0 shows every enhancer
+        """
         d = {"Enhancer": [], "Breaks": []}
-        for k, v in sorted(self.enhancer_breaks.items(), key=lambda t: t[1], reverse=True):
+        enhancers = self.enhancer_index.top(top)
+        for k in enhancers:
             d["Enhancer"].append(k)
-            d["Breaks"].append(str(v))
+            d["Breaks"].append(str(self.enhancer_breaks[k]))
+        if len(self.enhancer_index) > len(enhancers):
+            d["Enhancer"].append(OTHERS_ROW.format(len(self.enhancer_index) - len(enhancers)))
+            d["Breaks"].append(str(self.enhancer_index.total - sum(self.enhancer_breaks[k] for k in enhancers)))
         return d
 
-    def get_item_loot_table_data(self):
-        r = {"Item": [], "Value": [], "Count": [], "Markup": [], "Total Value": []}
-        for k, v in sorted(self.looted_items.items(), key=lambda t: t[1]["v"], reverse=True):
-            r["Item"].append(k)
-            r["Value"].append(str(v["v"]))
-            r["Count"].append(str(v["c"]))
-            mu = MarkupSingleton.get_markup_for_item(k)
-            if mu.is_absolute:
-                r["Markup"].append("+{:.3f}".format(mu.value))
-                r["Total Value"].append("{:.4f}".format(v["v"] + (v["c"] * mu.value)))
-            else:
-                r["Markup"].append("{:.3f}%".format(mu.value * 100))
-                r["Total Value"].append("{:.4f}".format(v["v"] * mu.value))
-        return r
+    def get_item_loot_table_row(self, name: str) -> tuple:
+        """
+        :return: (Item, Value, Count, Markup, Total Value) of a looted item, formatted again only once it changed
+        """
+        item = self.looted_items[name]
+        mu = MarkupSingleton.get_markup_for_item(name)
+        key = (item["v"], item["c"], item["p"], mu)
+        cached = self.loot_rows.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        value = units_to_ped(item["v"], item["p"])
+        if mu.is_absolute:
+            row = (name, str(value), str(item["c"]), "+{:.3f}".format(mu.value),
+                   "{:.4f}".format(value + (item["c"] * mu.value)))
+        else:
+            row = (name, str(value), str(item["c"]), "{:.3f}%".format(mu.value * 100),
+                   "{:.4f}".format(value * mu.value))
+        self.loot_rows[name] = (key, row)
+        return row
 
-    @property
-    def total_return_mu(self):
-        total_return_mu = Decimal("0.0")
-        if len(self.looted_items) == 0:
-            total_return_mu = self.cached_total_return_mu
-        for k, v in self.looted_items.items():
-            mu = MarkupSingleton.get_markup_for_item(k)
-            if mu.is_absolute:
-                total_return_mu += (v["v"] + (v["c"] * mu.value))
-            else:
-                total_return_mu += (v["v"] * mu.value)
-        return total_return_mu
+    LOOT_COLUMNS = ("Item", "Value", "Count", "Markup", "Total Value")
+
+    def get_item_loot_table_data(self, top: int = 0):
+        """
+        :param top: Rows to show, the rest are summed into an others row, 0 shows every item
+        """
+        items = self.loot_index.top(top)
+        rows = [self.get_item_loot_table_row(k) for k in items]
+        if len(self.loot_index) > len(items):
+            value = units_to_ped(self.loot_index.total - sum(self.looted_items[k]["v"] for k in items))
+            count = sum(self.looted_items[k]["c"] for k in self.loot_index.order[len(items):])
+            total_value = self.total_return_mu - sum((Decimal(row[4]) for row in rows), Decimal(0))
+            rows.append((OTHERS_ROW.format(len(self.loot_index) - len(items)), str(value), str(count), "",
+                         "{:.4f}".format(total_value)))
+        return {column: [row[i] for row in rows] for i, column in enumerate(self.LOOT_COLUMNS)}
 
     @property
     def total_return_mu_perc(self):
@@ -351,6 +571,22 @@ class HuntingTrip(object):
             return Decimal("0.0")
 
 
+# Name of the row that sums up the rows after the top ones of a table
+OTHERS_ROW = "Others ({})"
+
+
+def is_others_row(name: str) -> bool:
+    return name.startswith(OTHERS_ROW.split("{")[0])
+
+
+# Everything the UI shows of the runs, never modified once published. Parts of views that didn't change are
+# shared with the previous snapshot, so the UI redraws a part only when it is a different object. Run dependent
+# fields are None without an active run. rows are the chat rows added to runs since the previous snapshot
+RunSnapshot = namedtuple("RunSnapshot", ["loot_fields", "loot_table", "runs", "combat_fields", "skills",
+                                         "total_skills", "enhancers", "returns", "multipliers", "streamer", "rows"],
+                         defaults=((),))
+
+
 class CombatModule(BaseModule):
 
     def __init__(self, app):
@@ -360,7 +596,14 @@ class CombatModule(BaseModule):
         # Core
         self.is_logging = False
         self.is_paused = False
-        self.should_redraw_runs = True
+        # Views that need redrawing, see ALL_VIEWS
+        self.dirty = set(ALL_VIEWS)
+
+        # Rows that raised while being added to a run, each is reported with its traceback
+        self.failed_rows = 0
+        # Log time of the newest chat row seen, used to tell how far behind the tracker is
+        self.last_event_time: datetime = None
+        self.last_save = time.time()
 
         # Both of these are set by the parent app
         self.loot_table = None
@@ -373,164 +616,390 @@ class CombatModule(BaseModule):
         # Calculated Configuration
         self.ammo_burn = 0
         self.decay = 0
+        self.kill_gap = KILL_GAP
+        # Rows shown in the loot, skill and enhancer tables before the rest are summed into an others row, 0 for all
+        self.top_rows = 0
+
+        # Held by the aggregation worker while it changes runs, and by the UI for its own changes to them
+        self.lock = threading.RLock()
+        # Immutable copy of what the UI shows, published by the aggregation worker
+        self.snapshot: RunSnapshot = None
+        self.rendered_snapshot: RunSnapshot = None
+        # Held while a snapshot is published or taken for rendering, never while waiting for the run lock
+        self.snapshot_lock = threading.Lock()
+        # Chat rows added to runs since the last snapshot, their latency is measured once it is rendered
+        self.ingested_rows: List[BaseChatRow] = []
 
         # Runs
         self.active_run: HuntingTrip = None
         self.runs: List[HuntingTrip] = []
+        # Runs table rows of finished runs, run -> ((time_end, notes, extra_spend), row)
+        self.runs_rows = {}
+        # Runs of the characters in additional chat.logs, by character name
+        self.character_runs: Dict[str, HuntingTrip] = {}
 
         # Graphs
         self.multiplier_graph = None
         self.return_graph = None
 
+    def update_kill_gap(self, kill_gap: int):
+        """
+        Segments the loot of runs still being tracked with a new kill gap from here on
+        """
+        with self.lock:
+            self.kill_gap = kill_gap
+            for run in [self.active_run, *self.character_runs.values()]:
+                if run:
+                    run.segmenter.gap = kill_gap
+
     def update_active_run_cost(self):
         if self.active_run:
             cost = Decimal(self.ammo_burn) / Decimal(10000) + self.decay
             self.active_run.cost_per_shot = cost
 
-    def tick(self, lines: List[BaseChatRow]):
+    def ingest(self, lines: List[BaseChatRow]):
+        """
+        Adds a batch of chat rows to the active run without touching the UI
+        """
+        if lines:
+            self.last_event_time = lines[-1].time
+
+        logging = self.is_logging and not self.is_paused
+        if logging and self.active_run is None:
+            self.create_new_run()
+
+        last_row = None
+        ingested_rows = self.ingested_rows
+        for chat_instance in lines:
+            if chat_instance.source is not None:
+                if logging:
+                    self.ingest_row(self.add_character_row, chat_instance)
+                    ingested_rows.append(chat_instance)
+                continue
+            last_row = chat_instance
+            if not logging:
+                continue
+
+            if isinstance(chat_instance, GlobalInstance):
+                if chat_instance.name.strip() == self.app.config.name.value.strip():
+                    if self.app.config.screenshot_enabled.value:
+                        t = threading.Thread(target=take_screenshot, args=(
+                            self.app.config.screenshot_delay.value,
+                            self.app.config.screenshot_directory.value,
+                            chat_instance, ))
+                        t.start()
+                    self.ingest_row(self.active_run.add_global_row, chat_instance)
+                    ingested_rows.append(chat_instance)
+            else:
+                self.ingest_row(self.active_run.add_chat_row, chat_instance)
+                ingested_rows.append(chat_instance)
+
+        if self.active_run:
+            if last_row:
+                # Rows that arrive while paused are skipped for good, so they move the checkpoint too
+                self.active_run.set_checkpoint(last_row)
+            if self.active_run.dirty:
+                self.dirty |= self.active_run.dirty
+                self.active_run.dirty.clear()
+
+    def ingest_row(self, add, chat_instance: BaseChatRow):
+        """
+        Adds one row with add, a row that can't be added is reported and counted instead of losing the rest of
+        its batch
+        """
+        try:
+            add(chat_instance)
+        except Exception:
+            self.failed_rows += 1
+            print(f"Failed to add {type(chat_instance).__name__} logged at {chat_instance.time} to the run:")
+            traceback.print_exc()
+
+    def mark_dirty(self, *views: str):
+        """
+        Flags views for redrawing, all of them if none are given
+        """
+        if not views:
+            # Anything may have changed, the mu% of finished runs included
+            self.runs_rows.clear()
+        self.dirty.update(views or ALL_VIEWS)
+
+    def on_markup_changed(self, name: str, old: Markup, new: Markup):
+        """
+        Markup store listener, registered by the app for the one module it shows
+        """
+        with self.lock:
+            for run in self.runs:
+                if name in run.looted_items:
+                    run.apply_markup_change(name, old, new)
+                    self.runs_rows.pop(run, None)
+            self.mark_dirty(LOOT_VIEW, RUNS_VIEW)
+
+    def add_character_row(self, chat_instance: BaseChatRow):
+        """
+        Adds a row from an additional chat.log to the run of the character it belongs to
+        """
+        character = chat_instance.source
+        run = self.character_runs.get(character)
+        if run is None:
+            run = HuntingTrip(datetime.now(), Decimal(self.ammo_burn) / Decimal(10000) + self.decay, self.kill_gap)
+            run.character = character
+            self.character_runs[character] = run
+            self.runs.append(run)
+            self.dirty.add(RUNS_VIEW)
+
+        if isinstance(chat_instance, GlobalInstance):
+            if chat_instance.name.strip() == character.strip():
+                run.add_global_row(chat_instance)
+        else:
+            run.add_chat_row(chat_instance)
+        run.set_checkpoint(chat_instance)
+        if run.dirty:
+            # Only the runs table shows the other characters
+            self.dirty.add(RUNS_VIEW)
+            run.dirty.clear()
+
+    def end_character_runs(self):
+        for run in self.character_runs.values():
+            run.time_end = datetime.now()
+            run.save_to_disk()
+        self.character_runs = {}
+
+    def autosave(self):
+        if self.active_run and time.time() - self.last_save > AUTOSAVE_INTERVAL:
+            self.save_active_run()
+
+    def take_snapshot(self, views=ALL_VIEWS) -> RunSnapshot:
+        """
+        Copies out what the UI shows, must be called holding self.lock
+        :param views: Views to copy out again, the rest are shared with the previous snapshot
+        """
+        previous = self.snapshot
+        run = self.active_run
+        runs = self.get_runs_data() if RUNS_VIEW in views or previous is None else previous.runs
+        if not run:
+            return RunSnapshot(None, None, runs, None, None, None, None, None, None, None)
+        if previous is None or previous.loot_fields is None:
+            # The active run just started, nothing can be shared
+            views = ALL_VIEWS
+
+        parts = previous._asdict() if previous else {}
+        parts["runs"] = runs
+        parts["rows"] = ()
+        if LOOT_VIEW in views:
+            loot_fields = {
+                "looted_text": str(run.loot_instances),
+                "total_cost_text": "%.2f" % run.total_cost,
+                "total_return_text": "%.2f" % run.tt_return,
+                "globals": str(run.globals),
+                "hofs": str(run.hofs),
+            }
+            if run.total_cost:
+                loot_fields["return_perc_text"] = "%.2f" % (run.tt_return / run.total_cost * 100)
+            parts["loot_fields"] = loot_fields
+            parts["loot_table"] = run.get_item_loot_table_data(self.top_rows)
+        if COMBAT_VIEW in views:
+            parts["combat_fields"] = {
+                "attacks": str(run.total_attacks),
+                "damage": "%.2f" % run.total_damage,
+                "crits": str(run.crit_chance),
+                "misses": str(run.miss_chance),
+                "dpp": "%.4f" % run.dpp,
+            }
+        if LOOT_VIEW in views or COMBAT_VIEW in views:
+            total_return_mu = run.total_return_mu
+            parts["streamer"] = (run.loot_instances, run.total_cost + run.extra_spend, run.tt_return, run.hofs,
+                                 run.globals, run.dpp, total_return_mu, run.total_return_mu_perc,
+                                 total_return_mu - (run.total_cost - run.extra_spend))
+        if SKILLS_VIEW in views:
+            parts["skills"] = run.get_skill_table_data(self.top_rows)
+            parts["total_skills"] = f"{run.get_total_skill_gain():.4f}"
+        if ENHANCERS_VIEW in views:
+            parts["enhancers"] = run.get_enhancer_table_data(self.top_rows)
+        if GRAPHS_VIEW in views:
+            parts["returns"] = run.return_over_time.copy()
+            parts["multipliers"] = run.multipliers.copy()
+        return RunSnapshot(**parts)
+
+    def publish(self):
+        """
+        Replaces the snapshot the UI renders from with one that has the dirty views copied out again, called by
+        the aggregation worker and after UI edits to runs
+        """
+        with self.lock:
+            views, self.dirty = self.dirty, set()
+            rows, self.ingested_rows = self.ingested_rows, []
+            snapshot = self.take_snapshot(views)
+            with self.snapshot_lock:
+                previous = self.snapshot
+                if previous is not None and previous is not self.rendered_snapshot:
+                    # The UI skipped it, its rows are measured with this one instead. Only the last window of
+                    # latencies is kept however many are recorded, so older rows can go
+                    rows = (previous.rows + rows)[-PROFILER.window:]
+                self.snapshot = snapshot._replace(rows=rows)
+
+    def refresh(self) -> bool:
+        """
+        Redraws the parts of the UI that changed since the last snapshot rendered
+        :return: True if there was a new snapshot to render
+        """
+        with self.snapshot_lock:
+            snapshot = self.snapshot
+            rendered = self.rendered_snapshot
+            if snapshot is None or snapshot is rendered:
+                return False
+            self.rendered_snapshot = snapshot
+        self.render(snapshot, rendered)
+        PROFILER.record_latency(snapshot.rows)
+        return True
+
+    def render(self, snapshot: RunSnapshot, rendered: RunSnapshot):
+        changed = lambda part: rendered is None or getattr(snapshot, part) is not getattr(rendered, part)
+
         if self.is_logging and not self.is_paused:
+            if self.app.streamer_window and snapshot.streamer and changed("streamer"):
+                with PROFILER.stage("ui.render streamer"):
+                    self.app.streamer_window.set_text_from_data(*snapshot.streamer)
+
+        if changed("runs"):
+            with PROFILER.stage("ui.render runs"):
+                self.runs_table.setData(snapshot.runs)
+        if snapshot.loot_fields is None:
+            return
 
-            if self.active_run is None:
-                self.create_new_run()
+        if changed("loot_fields"):
+            with PROFILER.stage("ui.render loot fields"):
+                for name, text in snapshot.loot_fields.items():
+                    self.loot_fields[name].setText(text)
+        if changed("loot_table"):
+            with PROFILER.stage("ui.render loot table"):
+                self.loot_table.updateData(snapshot.loot_table)
+                self.loot_table.resizeRowsToContents()
+
+        if changed("combat_fields"):
+            with PROFILER.stage("ui.render combat fields"):
+                for name, text in snapshot.combat_fields.items():
+                    self.combat_fields[name].setText(text)
+
+        if changed("skills"):
+            with PROFILER.stage("ui.render skills"):
+                self.skill_table.updateData(snapshot.skills)
+                self.app.total_skills_text.setText(snapshot.total_skills)
+
+        if changed("enhancers"):
+            with PROFILER.stage("ui.render enhancers"):
+                self.enhancer_table.updateData(snapshot.enhancers)
+
+        if changed("returns"):
+            with PROFILER.stage("ui.render graphs"):
+                self.plot_returns(snapshot.returns)
+                # The largest loot of each bucket, every loot until the run outgrows the buckets
+                multipliers = snapshot.multipliers.view()
+                self.multiplier_graph.clear()
+                self.multiplier_graph.plot([b.x for b in multipliers], [b.max for b in multipliers],
+                                           pen=None, symbol="o")
+
+    def plot_returns(self, returns: DownsampledSeries):
+        """
+        Draws the mean return of a bounded number of buckets of the loot instances in the zoomed range
+        """
+        start, end = 0, None
+        view_box = self.return_graph.getViewBox()
+        if not view_box.autoRangeEnabled()[0]:
+            x_min, x_max = view_box.viewRange()[0]
+            start, end = max(int(x_min), 0), int(x_max) + 2
+        buckets = returns.view(start, end)
+        self.return_graph.clear()
+        self.return_graph.plot([b.start + (b.count - 1) / 2 for b in buckets], [b.mean * 100 for b in buckets])
 
-            for chat_instance in lines:
-                if isinstance(chat_instance, CombatRow):
-                    self.active_run.add_combat_chat_row(chat_instance)
-                    self.should_redraw_runs = True
-                elif isinstance(chat_instance, LootInstance):
-                    self.active_run.add_loot_instance_chat_row(chat_instance)
-                    self.should_redraw_runs = True
-                elif isinstance(chat_instance, EnhancerBreakages):
-                    self.active_run.add_enhancer_break_row(chat_instance)
-                elif isinstance(chat_instance, SkillRow):
-                    self.active_run.add_skillgain_row(chat_instance)
-                elif isinstance(chat_instance, GlobalInstance):
-                    if chat_instance.name.strip() == self.app.config.name.value.strip():
-                        if self.app.config.screenshot_enabled.value:
-                            t = threading.Thread(target=take_screenshot, args=(
-                                self.app.config.screenshot_delay.value,
-                                self.app.config.screenshot_directory.value,
-                                chat_instance, ))
-                            t.start()
-                        self.active_run.add_global_row(chat_instance)
-
-            if self.app.streamer_window:
-                self.app.streamer_window.set_text_from_module(self)
-
-        if self.runs and self.should_redraw_runs:
-            self.update_tables()
-            self.should_redraw_runs = False
+    def on_return_range_changed(self, *args):
+        snapshot = self.rendered_snapshot
+        if snapshot is not None and snapshot.returns is not None:
+            self.plot_returns(snapshot.returns)
 
     def update_tables(self):
-        self.update_loot_table()
-        self.update_combat_table()
-        self.update_skill_table()
-        self.update_enhancer_table()
-        self.update_graphs()
-
-    def update_combat_table(self):
-        """
-        {
-            "attacks": shots_text,
-            "damage": damage_text,
-            "crits": critical_rate,
-            "misses": miss_rate,
-            "dpp": dpp,
-            "enhancer_table": table
-        }
-        :return:
         """
-        if not self.active_run:
-            return
-        self.combat_fields["attacks"].setText(str(self.active_run.total_attacks))
-        self.combat_fields["damage"].setText("%.2f" % self.active_run.total_damage)
-        self.combat_fields["crits"].setText(str(self.active_run.crit_chance))
-        self.combat_fields["misses"].setText(str(self.active_run.miss_chance))
-        self.combat_fields["dpp"].setText("%.4f" % self.active_run.dpp)
-
-    def update_loot_table(self):
-        """
-        {
-            "looted_text": looted_text,
-            "total_cost_text": total_cost_text,
-            "total_return_text": total_return_text,
-            "return_perc_text": return_perc_text,
-            "globals": globals,
-            "hofs": hofs
-        }
-        :return:
+        Redraws everything straight away, for changes made from the UI
         """
-        if not self.active_run:
-            return
-        self.loot_table.clear()
-        self.loot_fields["looted_text"].setText(str(self.active_run.loot_instances))
-        self.loot_fields["total_cost_text"].setText("%.2f" % self.active_run.total_cost)
-        self.loot_fields["total_return_text"].setText("%.2f" % self.active_run.tt_return)
-        if self.active_run.total_cost:
-            self.loot_fields["return_perc_text"].setText("%.2f" % (self.active_run.tt_return / self.active_run.total_cost * 100))
-        self.loot_fields["globals"].setText(str(self.active_run.globals))
-        self.loot_fields["hofs"].setText(str(self.active_run.hofs))
-
-        self.loot_table.setData(self.active_run.get_item_loot_table_data())
-        self.loot_table.resizeRowsToContents()
-        self.update_runs_table()
+        self.mark_dirty()
+        self.publish()
+        self.refresh()
 
     def update_runs_table(self):
         self.runs_table.setData(self.get_runs_data())
 
-    def update_skill_table(self):
-        if not self.active_run:
-            return
-        self.skill_table.clear()
-        self.skill_table.setData(self.active_run.get_skill_table_data())
-        self.app.total_skills_text.setText(f"{self.active_run.get_total_skill_gain():.4f}")
+    RUNS_COLUMNS = ("Notes", "Start", "End", "Spend", "Enhancers", "Extra Spend", "Return", "%", "mu%", "Character")
 
-    def update_enhancer_table(self):
-        if not self.active_run:
-            return
-        self.enhancer_table.clear()
-        self.enhancer_table.setData(self.active_run.get_enhancer_table_data())
-
-    def update_graphs(self):
-        if not self.active_run:
-            return
-        self.return_graph.clear()
-        self.return_graph.plot(list(map(lambda x: float(x * 100), self.active_run.return_over_time)))
-        self.multiplier_graph.clear()
-        self.multiplier_graph.plot(*self.active_run.multipliers, pen=None, symbol="o")
+    def get_runs_row(self, run: "HuntingTrip") -> tuple:
+        """
+        :return: The runs table row of a run, cached for finished runs, they only change when edited from the UI
+        """
+        key = (run.time_end, run.notes, run.extra_spend)
+        cached = self.runs_rows.get(run)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        if run.total_cost + run.extra_spend:
+            perc = "%.2f" % (run.tt_return / (run.total_cost + run.extra_spend) * 100) + "%"
+            mu_perc = "%.2f" % (run.total_return_mu_perc) + "%"
+        else:
+            perc = mu_perc = "%"
+        row = (run.notes,
+               run.time_start.strftime("%Y-%m-%d %H:%M:%S"),
+               run.time_end.strftime("%Y-%m-%d %H:%M:%S") if run.time_end else "",
+               "%.2f" % run.total_cost,
+               str(run.total_enhancer_breaks),
+               str(run.extra_spend),
+               run.tt_return,
+               perc,
+               mu_perc,
+               run.character or "")
+        if run.time_end:
+            self.runs_rows[run] = (key, row)
+        return row
 
     def get_runs_data(self):
-        d = {"Notes": [], "Start": [], "End": [], "Spend": [],
-             "Enhancers": [], "Extra Spend": [], "Return": [], "%": [], "mu%": []}
-        for run in self.runs[::-1]:
-            run: HuntingTrip
-            d["Notes"].append(run.notes)
-            d["Start"].append(run.time_start.strftime("%Y-%m-%d %H:%M:%S"))
-            d["End"].append(run.time_end.strftime("%Y-%m-%d %H:%M:%S") if run.time_end else "")
-            d["Spend"].append("%.2f" % run.total_cost)
-            d["Enhancers"].append(str(run.total_enhancer_breaks))
-            d["Extra Spend"].append(str(run.extra_spend))
-            d["Return"].append(run.tt_return)
-            if run.total_cost + run.extra_spend:
-                d["%"].append("%.2f" % (run.tt_return / (run.total_cost + run.extra_spend) * 100) + "%")
-                d["mu%"].append("%.2f" % (run.total_return_mu_perc) + "%")
-            else:
-                d["%"].append("%")
-                d["mu%"].append("%")
-        return d
+        rows = [self.get_runs_row(run) for run in self.runs[::-1]]
+        return {column: [row[i] for row in rows] for i, column in enumerate(self.RUNS_COLUMNS)}
 
     def create_new_run(self):
-        self.active_run = HuntingTrip(datetime.now(), Decimal(self.ammo_burn) / Decimal(10000) + self.decay)
+        self.active_run = HuntingTrip(datetime.now(), Decimal(self.ammo_burn) / Decimal(10000) + self.decay,
+                                      self.kill_gap)
         self.runs.append(self.active_run)
+        self.mark_dirty()
+
+    def start_run(self):
+        """
+        Starts logging, the active run is created straight away so it shows before its first chat row
+        """
+        with self.lock:
+            self.is_logging = True
+            self.is_paused = False
+            if self.active_run is None:
+                self.create_new_run()
+
+    def end_run(self):
+        with self.lock:
+            self.is_logging = False
+            self.is_paused = False
+            if self.active_run:
+                self.active_run.time_end = datetime.now()
+                self.active_run = None
+            self.end_character_runs()
+            self.save_active_run(force=True)
+            self.mark_dirty()
 
     def save_active_run(self, force=False):
-        if not self.active_run:
-            if not force:
-                return
-            if self.runs:
-                self.runs[-1].save_to_disk()
-        else:
-            self.active_run.save_to_disk()
+        with self.lock:
+            self.last_save = time.time()
+            for run in self.character_runs.values():
+                run.save_to_disk()
+            if not self.active_run:
+                if not force:
+                    return
+                if self.runs:
+                    self.runs[-1].save_to_disk()
+            else:
+                self.active_run.save_to_disk()
 
     def load_runs(self):
         if os.path.exists(RUNS_FILE):
@@ -544,24 +1013,31 @@ class CombatModule(BaseModule):
         if not os.path.exists(RUNS_DIRECTORY):
             return
 
-        run_files = []
+        saved_runs = []
 
         for fn in os.listdir(RUNS_DIRECTORY):
             if fn.startswith("LootNannyLog_"):
                 try:
                     with open(format_filename(fn), 'r') as f:
-                        json.loads(f.read())
-                    run_files.append(fn)
+                        saved_runs.append(json.loads(f.read()))
                 except:
                     os.remove(format_filename(fn))
 
-        for i, run_fn in enumerate(run_files, 1):
-            run = HuntingTrip.load_from_filename(run_fn, include_loot=(i == len(run_files)))
-            self.runs.append(run)
+        # Oldest first. Unfinished runs are resumed and saved again, so they need their loot as well as the newest
+        saved_runs.sort(key=lambda seralized: seralized["start"])
+        for i, seralized in enumerate(saved_runs, 1):
+            include_loot = seralized["end"] is None or i == len(saved_runs)
+            self.runs.append(HuntingTrip.from_seralized(seralized, include_loot=include_loot,
+                                                                kill_gap=self.kill_gap))
+
+        for run in self.runs:
+            if run.time_end is None and run.character:
+                self.character_runs[run.character] = run
 
         if self.runs:
-            if self.runs[-1].time_end is None:
-                self.active_run = self.runs[-1]
+            main_runs = [run for run in self.runs if not run.character]
+            if main_runs and main_runs[-1].time_end is None:
+                self.active_run = main_runs[-1]
             else:
                 self.update_runs_table()
 
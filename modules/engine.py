@@ -0,0 +1,175 @@
+"""
+Headless tracking engine, follows or replays chat.log without PyQt.
+
+    python -m modules.engine chat.log --cps 0.123 --name "Hunter" --out run.json
+    python -m modules.engine chat.log --replay --cps 0.123 --name "Hunter" --out run.json
+"""
+import argparse
+import json
+import os
+import time
+from decimal import Decimal
+from typing import Optional
+
+import utils.config_utils as CU
+from chat import ChatReader, ChatSources
+from modules.aggregator import AggregationWorker, BATCH_SIZE
+from modules.backfill import parse_log
+from modules.combat import CombatModule
+from modules.segmentation import KILL_GAP
+from utils.profiling import PROFILER
+
+
+# Seconds between stats lines and run file writes while following a log
+STATS_INTERVAL = 10.0
+
+
+class EngineConfig(object):
+    """
+    The settings of Config the engine uses, without reading or writing the LootNanny config file
+    """
+
+    def __init__(self, location: str, name: str = "", tick_budget_ms: int = 30):
+        self.location = CU.ConfigValue(location)
+        self.name = CU.ConfigValue(name)
+        self.tick_budget_ms = CU.ConfigValue(tick_budget_ms)
+        self.screenshot_enabled = CU.ConfigValue(False)
+        self.extra_chat_logs = CU.ConfigValue([])
+
+
+class TrackingEngine(object):
+
+    def __init__(self, config, cost_per_shot: Decimal = Decimal(0), index_filename: str = None):
+        """
+        :param config: Config, or an EngineConfig
+        :param cost_per_shot: Cost of every attack in PED
+        :param index_filename: Where to keep the time index of chat.log, in the LootNanny app data by default
+        """
+        self.config = config
+        self.streamer_window = None
+
+        self.combat_module = CombatModule(self)
+        self.combat_module.decay = cost_per_shot
+        self.chat_reader = ChatReader(self, index_filename=index_filename)
+        self.chat_sources = ChatSources(self, self.chat_reader)
+        self.aggregator = AggregationWorker(self.combat_module, self.chat_sources, config)
+
+    def start(self):
+        """
+        Starts a run and follows chat.log from its current end
+        """
+        self.combat_module.is_logging = True
+        self.chat_sources.delay_start_reader()
+        self.aggregator.start()
+
+    def stop(self):
+        self.aggregator.stop()
+        for reader in self.chat_sources.readers:
+            if reader.tail:
+                reader.tail.stop()
+        if self.aggregator.thread:
+            self.aggregator.thread.join()
+
+        module = self.combat_module
+        with module.lock:
+            # Whatever the reader queued before it stopped still belongs to the run
+            while True:
+                lines = self.chat_sources.getlines(BATCH_SIZE)
+                if not lines:
+                    break
+                module.ingest(lines)
+            if module.active_run:
+                module.active_run.time_end = module.last_event_time or module.active_run.time_start
+
+    def replay(self, path: str, workers: Optional[int] = None):
+        """
+        Runs a whole chat.log through a single run, as if it had been followed live from the first line
+        """
+        module = self.combat_module
+        module.is_logging = True
+        first_time = None
+        batch = []
+        for row in parse_log(path, workers=workers):
+            if first_time is None:
+                first_time = row.time
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                module.ingest(batch)
+                batch = []
+        module.ingest(batch)
+        if module.active_run:
+            module.active_run.time_start = first_time
+            module.active_run.time_end = module.last_event_time
+        return module.active_run
+
+    def stats(self) -> str:
+        run = self.combat_module.active_run
+        health = self.chat_reader.health()
+        backlog = self.chat_sources.backlog()
+        if not run:
+            return f"no events yet, {health.lines_per_sec:.0f} lines/s"
+        spend = run.total_cost + run.extra_spend
+        return_perc = "%.2f%%" % (run.tt_return / spend * 100) if spend else "-"
+        return (f"{run.total_attacks} attacks, {run.loot_instances} loots, spend {spend:.2f} PED, "
+                f"return {run.tt_return:.2f} PED ({return_perc}), {run.globals} globals, {run.hofs} hofs, "
+                f"backlog {backlog}, {health.lines_per_sec:.0f} lines/s")
+
+    def write_run(self, filename: Optional[str] = None):
+        """
+        Writes the active run as JSON, to the LootNanny runs directory unless a filename is given
+        """
+        with self.combat_module.lock:
+            run = self.combat_module.active_run
+            if not run:
+                return
+            if not filename:
+                run.save_to_disk()
+                return
+            data = json.dumps(run.serialize_run())
+        with open(filename, "w") as f:
+            f.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track a LootNanny run from a chat.log without the UI")
+    parser.add_argument("log", help="Path to chat.log")
+    parser.add_argument("--replay", action="store_true", help="Process the whole log once and exit")
+    parser.add_argument("--cps", default="0", help="Cost per shot in PED")
+    parser.add_argument("--name", default="", help="Character name, for counting globals")
+    parser.add_argument("--kill-gap", type=int, default=KILL_GAP,
+                        help="Seconds allowed between the loot lines of one kill")
+    parser.add_argument("--out", help="Write the run JSON here instead of the LootNanny runs directory")
+    parser.add_argument("--interval", type=float, default=STATS_INTERVAL, help="Seconds between stats lines")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --replay")
+    parser.add_argument("--metrics", help="Write stage timings and queue depths here as JSON with every stats line")
+    args = parser.parse_args()
+    if not os.path.exists(args.log):
+        parser.error(f"{args.log} does not exist")
+
+    engine = TrackingEngine(EngineConfig(args.log, args.name), Decimal(args.cps))
+    engine.combat_module.kill_gap = args.kill_gap
+    if args.replay:
+        engine.replay(args.log, workers=args.workers)
+        print(engine.stats())
+        engine.write_run(args.out)
+        return
+
+    engine.start()
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(engine.stats(), flush=True)
+            engine.write_run(args.out)
+            if args.metrics:
+                PROFILER.dump(args.metrics)
+    except KeyboardInterrupt:
+        pass
+    engine.stop()
+    print(engine.stats())
+    engine.write_run(args.out)
+    if args.metrics:
+        PROFILER.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
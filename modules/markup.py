@@ -17,12 +17,27 @@ DEFAULT_MARKUP = {
 }
 
 
+def apply_markup(mu: Markup, count: int, value: Decimal) -> Decimal:
+    if mu.is_absolute:
+        return value + (count * mu.value)
+    else:
+        return value * mu.value
+
+
 class MarkupStore(object):
 
     def __init__(self):
         self._data = DEFAULT_MARKUP
+        # Called with (name, old markup, new markup) whenever the markup of an item changes
+        self.listeners = []
         self.load_markup()
 
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+
     def load_markup(self):
         if not os.path.exists(MARKUP_FILENAME):
             return
@@ -63,8 +78,12 @@ class MarkupStore(object):
                 markup = Markup(Decimal(value[:-1]) / 100, False)
             else:
                 markup = Markup(Decimal(value), False)
+        old = self.get_markup_for_item(name)
         self._data[name] = markup
         self.save_markup()
+        if markup != old:
+            for callback in self.listeners:
+                callback(name, old, markup)
 
     def get_formatted_markup(self, name):
         mu = self.get_markup_for_item(name)
@@ -74,8 +93,4 @@ class MarkupStore(object):
             return "{:.3f}%".format(mu.value * 100)
 
     def apply_markup_to_item(self, name, count: int, value: Decimal):
-        mu = self.get_markup_for_item(name)
-        if mu.is_absolute:
-            return value + (count * mu.value)
-        else:
-            return value * mu.value
+        return apply_markup(self.get_markup_for_item(name), count, value)
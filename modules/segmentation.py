@@ -0,0 +1,80 @@
+"""
+Splits the loot rows of a run into kills.
+"""
+from collections import defaultdict, namedtuple
+from typing import Iterable, List
+
+from chat import LootInstance
+
+
+# Seconds allowed between the loot rows of one kill, chat.log times have whole second resolution
+KILL_GAP = 1
+
+# What a loot row is to the run
+IGNORE = 0  # Not loot, left out of the run entirely
+NOT_A_KILL = 1  # Loot, but it doesn't start or extend a kill
+SAME_KILL = 2
+NEW_KILL = 3
+
+# Rows of item that have one of amounts, or any amount if amounts is None, get verdict instead of being segmented
+ExclusionRule = namedtuple("ExclusionRule", ["name", "item", "amounts", "verdict"])
+
+DEFAULT_EXCLUSIONS = [
+    # Sharp conversion
+    ExclusionRule("universal_ammo", "Universal Ammo", None, IGNORE),
+    ExclusionRule("vibrant_sweat", "Vibrant Sweat", None, NOT_A_KILL),
+    # Shrapnel refunded by enhancer breaks, still counted as loot
+    ExclusionRule("enhancer_shrapnel", "Shrapnel", frozenset({4000, 6000, 8000}), NOT_A_KILL),
+]
+
+
+class KillSegmenter(object):
+
+    def __init__(self, gap: int = KILL_GAP, rules: List[ExclusionRule] = DEFAULT_EXCLUSIONS):
+        """
+        :param gap: Seconds allowed between the loot rows of one kill
+        :param rules: Exclusion rules, the first matching rule of an item wins
+        """
+        self.gap = gap
+        self.rules = defaultdict(list)
+        for rule in rules:
+            self.add_rule(rule)
+
+        # Log time of the last loot row counted towards a kill
+        self.last_ts: int = None
+        self.kills = 0
+
+    def add_rule(self, rule: ExclusionRule):
+        self.rules[rule.item].append(rule)
+
+    def classify(self, row: LootInstance) -> int:
+        """
+        :return: What the row is to the run, IGNORE, NOT_A_KILL, SAME_KILL or NEW_KILL
+        """
+        rules = self.rules.get(row.name)
+        if rules:
+            for rule in rules:
+                if rule.amounts is None or row.amount in rule.amounts:
+                    return rule.verdict
+
+        last_ts, self.last_ts = self.last_ts, row.ts
+        if last_ts is not None and row.ts - last_ts <= self.gap:
+            return SAME_KILL
+        self.kills += 1
+        return NEW_KILL
+
+
+def split_kills(rows: Iterable[LootInstance], segmenter: KillSegmenter = None) -> List[List[LootInstance]]:
+    """
+    Groups loot rows, e.g. of a recorded chat.log, into the kills they belong to
+    :return: The loot rows of each kill, rows which are not kills are left out
+    """
+    segmenter = segmenter or KillSegmenter()
+    kills = []
+    for row in rows:
+        verdict = segmenter.classify(row)
+        if verdict == NEW_KILL:
+            kills.append([row])
+        elif verdict == SAME_KILL:
+            kills[-1].append(row)
+    return kills
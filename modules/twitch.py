@@ -28,9 +28,12 @@ def format_commands(commands):
 
 def format_top_loots(combat_module: CombatModule):
     all_mulitis = []
-    for run in combat_module.runs:
-        for multi in run.multipliers[1]:
-            all_mulitis.append(multi)
+    # The aggregation worker adds to the runs' series and merges their buckets under the lock
+    with combat_module.lock:
+        for run in combat_module.runs:
+            # The largest loot of each bucket, all of them unless the run outgrew its graph buckets
+            for bucket in run.multipliers.buckets():
+                all_mulitis.append(bucket.max)
     top_5 = " --- ".join(map(lambda v: "%.2f" % v + " PED", sorted(all_mulitis, reverse=True)[:5]))
     return f"""
     Top Loots:                 
@@ -42,9 +45,10 @@ def format_all_returns(combat_module: CombatModule):
     all_spend = Decimal(0)
     all_return = Decimal(0)
 
-    for run in combat_module.runs:
-        all_return += run.tt_return
-        all_spend += run.total_cost
+    with combat_module.lock:
+        for run in combat_module.runs:
+            all_return += run.tt_return
+            all_spend += run.total_cost
 
     perc = all_return / all_spend * Decimal(100.0)
 
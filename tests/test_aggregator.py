@@ -0,0 +1,165 @@
+import contextlib
+import io
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from modules.aggregator import AggregationWorker, IDLE_WAIT, PUBLISH_INTERVAL
+from modules.combat import COMBAT_VIEW, SKILLS_VIEW, HuntingTrip
+from tests.test_combat import row, logging_module
+
+
+class ListSources(object):
+
+    def __init__(self):
+        self.lines = []
+
+    def getlines(self, max_lines=None):
+        lines, self.lines = self.lines[:max_lines], self.lines[max_lines:]
+        return lines
+
+    def depths(self):
+        return {"chat.log": len(self.lines)}
+
+    def wait(self, timeout):
+        pass
+
+    def wake(self):
+        pass
+
+
+class TestAggregationWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.module = logging_module()
+        self.sources = ListSources()
+        self.worker = AggregationWorker(self.module, self.sources,
+                                        SimpleNamespace(tick_budget_ms=SimpleNamespace(value=1000)))
+
+    def test_step_ingests_and_publishes(self):
+        self.assertFalse(self.worker.step())
+        self.assertEqual(self.module.snapshot.loot_fields["looted_text"], "0")
+        self.worker.last_publish = 0.0
+
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You inflicted 46.2 points of damage")] * 600
+        self.assertTrue(self.worker.step())
+        self.assertEqual(self.sources.lines, [])
+        snapshot = self.module.snapshot
+        self.assertEqual(snapshot.combat_fields["attacks"], "600")
+        self.assertEqual(len(snapshot.runs["Start"]), 1)
+
+    def test_run_is_created_before_any_rows(self):
+        self.module.is_logging = False
+        self.worker.step()
+        self.assertIsNone(self.module.active_run)
+
+        self.module.is_logging = True
+        self.worker.last_publish = 0.0
+        self.worker.step()
+        run = self.module.active_run
+        self.assertIsNotNone(run)
+        self.assertEqual(self.module.snapshot.loot_fields["total_return_text"], "0.00")
+
+        with mock.patch.object(HuntingTrip, "save_to_disk"):
+            self.module.end_run()
+        self.assertIsNotNone(run.time_end)
+        self.worker.last_publish = 0.0
+        self.worker.step()
+        self.assertIsNone(self.module.active_run)
+        self.assertIsNone(self.module.snapshot.loot_fields)
+
+    def test_a_failing_row_does_not_lose_the_rest_of_its_batch(self):
+        bad = row("2021-09-21 09:42:35 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED")
+        # Stands in for a row that makes the run raise
+        bad.units = None
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You missed"), bad,
+                              row("2021-09-21 09:42:36 [System] [] You received Shrapnel x (12) Value: 0.0012 PED")]
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()) as err:
+            self.assertTrue(self.worker.step())
+        self.assertIn("TypeError", err.getvalue())
+        self.assertEqual(self.module.failed_rows, 1)
+        run = self.module.active_run
+        self.assertEqual((run.total_attacks, str(run.tt_return)), (1, "0.0012"))
+
+    def test_snapshots_are_not_changed_by_later_rows(self):
+        self.sources.lines = [row("2021-09-21 09:42:36 [System] [] You received Shrapnel x (1524) "
+                                  "Value: 0.1524 PED")]
+        self.worker.step()
+        snapshot = self.module.snapshot
+
+        self.sources.lines = [row("2021-09-21 09:42:40 [System] [] You received Animal Oil Residue x (12) "
+                                  "Value: 0.1200 PED")]
+        self.worker.last_publish = 0.0
+        self.worker.step()
+        self.assertEqual(snapshot.loot_table["Item"], ["Shrapnel"])
+        self.assertEqual(snapshot.loot_fields["total_return_text"], "0.15")
+        self.assertEqual(self.module.snapshot.loot_fields["total_return_text"], "0.27")
+
+    def test_only_dirty_views_are_copied_out(self):
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You inflicted 46.2 points of damage")]
+        self.worker.step()
+        first = self.module.snapshot
+
+        self.sources.lines = [row("2021-09-21 09:42:36 [System] [] You have gained 0.1234 experience in your "
+                                  "Rifle skill")]
+        self.module.ingest(self.sources.getlines())
+        self.assertEqual(self.module.dirty, {SKILLS_VIEW})
+        self.module.publish()
+        second = self.module.snapshot
+        self.assertIsNot(second.skills, first.skills)
+        for part in ("loot_fields", "loot_table", "runs", "combat_fields", "enhancers", "returns", "streamer"):
+            self.assertIs(getattr(second, part), getattr(first, part), part)
+
+    def test_snapshot_carries_the_rows_added_since_the_last_one_rendered(self):
+        damage = row("2021-09-21 09:42:35 [System] [] You inflicted 46.2 points of damage")
+        other_global = row("2021-09-21 09:42:36 [Globals] [] Someone Else killed a creature (Atrox Young) "
+                           "with a value of 80 PED!")
+        self.sources.lines = [damage, other_global]
+        self.worker.step()
+        self.assertEqual(self.module.snapshot.rows, [damage])
+
+        # Skipped by the UI, its rows go with the next snapshot
+        miss = row("2021-09-21 09:42:37 [System] [] You missed")
+        self.module.ingest([miss])
+        self.module.publish()
+        self.assertEqual(self.module.snapshot.rows, [damage, miss])
+
+        self.module.rendered_snapshot = self.module.snapshot
+        self.module.mark_dirty()
+        self.module.publish()
+        self.assertEqual(self.module.snapshot.rows, [])
+
+    def test_idle_worker_sleeps_until_a_snapshot_is_due(self):
+        self.worker.step()
+        self.assertFalse(self.module.dirty)
+        self.assertEqual(self.worker.idle_wait(), IDLE_WAIT)
+
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You missed")]
+        self.worker.step()
+        self.assertTrue(self.module.dirty)
+        self.assertGreater(self.worker.idle_wait(), 0)
+        self.assertLessEqual(self.worker.idle_wait(), PUBLISH_INTERVAL)
+
+        self.worker.last_publish -= PUBLISH_INTERVAL
+        self.assertEqual(self.worker.idle_wait(), 0)
+
+    def test_publish_notifies_listeners(self):
+        published = []
+        self.worker.add_listener(lambda: published.append(self.module.snapshot))
+        self.worker.step()
+        self.assertEqual(published, [self.module.snapshot])
+        self.worker.step()
+        self.assertEqual(len(published), 1)
+
+    def test_publishing_is_rate_limited(self):
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You missed")]
+        self.worker.step()
+        snapshot = self.module.snapshot
+        self.sources.lines = [row("2021-09-21 09:42:35 [System] [] You missed")]
+        self.worker.step()
+        self.assertIs(self.module.snapshot, snapshot)
+        self.assertIn(COMBAT_VIEW, self.module.dirty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from chat import SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, GlobalInstance, parse_log_line
+from modules.backfill import split_chunks, parse_chunk, parse_log, backfill_runs, rows_from_records
+from modules.combat import HuntingTrip
+
+
+MESSAGES = [
+    "[System] [] You inflicted 46.2 points of damage",
+    "[System] [] Critical hit - Additional damage! You inflicted 119.1 points of damage",
+    "[System] [] You missed",
+    "[#calypso] [Trader Tom] WTB Shrapnel 101%",
+    "[System] [] You received Shrapnel x (1524) Value: 0.1524 PED",
+    "[System] [] You received Animal Oil Residue x (12) Value: 0.1200 PED",
+    "[System] [] You have gained 0.1234 experience in your Rifle skill",
+    "[System] [] Your enhancer Weapon Damage Enhancer 1 on your Sollomate Opalo broke.",
+    "[Globals] [] Hunter killed a creature (Atrox Young) with a value of 80 PED!",
+]
+
+
+def write_log(path, n_lines):
+    t = datetime(2021, 9, 21, 9, 0, 0)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_lines):
+            t += timedelta(seconds=i % 3)
+            f.write(f"{t:%Y-%m-%d %H:%M:%S} {MESSAGES[i % len(MESSAGES)]}\n")
+
+
+def live_run(path, start, end, cps):
+    """What live tracking produces: every row fed to the run in file order"""
+    run = HuntingTrip(start, cps)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            log_line = parse_log_line(line.rstrip("\n"))
+            dispatcher = SYSTEM_DISPATCHER if log_line.channel == "System" else GLOBAL_DISPATCHER
+            if log_line.channel not in ("System", "Globals"):
+                continue
+            row = dispatcher.build(log_line)
+            if row is None or row.time < start or row.time > end:
+                continue
+            if isinstance(row, GlobalInstance):
+                if row.name == "Hunter":
+                    run.add_global_row(row)
+            else:
+                run.add_chat_row(row)
+    run.time_end = end
+    return run
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        write_log(self.path, 3000)
+
+    def test_chunks_split_on_line_boundaries(self):
+        chunks = split_chunks(self.path, chunk_size=1000)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], os.path.getsize(self.path))
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b"\n")
+
+    def test_chunked_parse_matches_single_pass(self):
+        whole = list(rows_from_records(parse_chunk(self.path, 0, os.path.getsize(self.path))))
+        chunked = list(parse_log(self.path, workers=2, chunk_size=4096))
+        self.assertEqual([(r.time, r.offset, type(r)) for r in whole],
+                         [(r.time, r.offset, type(r)) for r in chunked])
+
+    def test_backfill_matches_live_tracking(self):
+        start, end = datetime(2021, 9, 21, 9, 10, 0), datetime(2021, 9, 21, 9, 40, 0)
+        cps = Decimal("0.0812")
+        expected = live_run(self.path, start, end, cps).serialize_run()
+
+        run, = backfill_runs(self.path, [(start, end)], cps, "Hunter", workers=2)
+        actual = run.serialize_run()
+        actual.pop("reader")
+        expected.pop("reader")
+        self.assertEqual(actual, expected)
+        self.assertGreater(run.loot_instances, 0)
+        self.assertGreater(run.globals, 0)
+
+    def test_backfill_splits_rows_between_runs(self):
+        ranges = [(datetime(2021, 9, 21, 9, 10, 0), datetime(2021, 9, 21, 9, 20, 0)),
+                  (datetime(2021, 9, 21, 9, 30, 0), datetime(2021, 9, 21, 9, 40, 0))]
+        runs = backfill_runs(self.path, ranges, Decimal("0.05"), workers=1)
+        for run, (start, end) in zip(runs, ranges):
+            expected = live_run(self.path, start, end, Decimal("0.05"))
+            self.assertEqual(run.total_attacks, expected.total_attacks)
+            self.assertEqual(run.tt_return, expected.tt_return)
+            self.assertLessEqual(run.log_time, end)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,20 @@
+import os
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
 
-from chat import LogLine, parse_log_line
+import chat
+
+from chat import LogLine, parse_log_line, REGEXES, GLOBAL_REGEXES, SYSTEM_RULES, \
+    GLOBAL_RULES, CombatRow, LootInstance, SkillRow, RuleDispatcher, ChatRule, ChatReader, \
+    LogTimeCache, parse_log_time, is_tracked_channel, ChatSources
+from utils.event_queue import EventQueue
+from utils.log_index import ChatLogIndex
+from utils.tail import file_fingerprint
 
 
 class TestChatParsing(unittest.TestCase):
@@ -53,5 +67,339 @@ class TestChatParsing(unittest.TestCase):
         self._internal(msg, expected)
 
 
+
+SYSTEM_SAMPLES = [
+    "Critical hit - Additional damage! You inflicted 519.1 points of damage",
+    "You inflicted 46.2 points of damage",
+    "You healed yourself 12.5 points",
+    "Damage deflected!",
+    "You Evaded the attack",
+    "You missed",
+    "The target Dodged your attack",
+    "The target Evaded your attack",
+    "The target Jammed your attack",
+    "You took 31.0 points of damage",
+    "You have gained 0.1234 experience in your Laser Weaponry Technology skill",
+    "You have gained 0.0021 Agility",
+    "Your Rifle has improved by 0.0150",
+    "Your enhancer Weapon Damage Enhancer 1 on your Sollomate Opalo broke.",
+    "You received Shrapnel x (1524) Value: 0.1524 PED",
+    "You received Animal Oil Residue x (12) Value: 0.1200 PED",
+    "Your hit points have been restored",
+    "Something happened. You missed",
+    "",
+]
+
+GLOBAL_SAMPLES = [
+    "Nanashana Nana Itsanai killed a creature (Desert Crawler Provider) with a value of 416 PED!",
+    "Nanashana Nana Itsanai killed a creature (Atrox Young) with a value of 80 PED! "
+    "A record has been added to the Hall of Fame!",
+    "Na'na'sha'na killed a creature (Disecter, Brood of Bram) with a value of 91 PED!",
+    "Someone constructed an item (Explosive Projectiles) worth 54 PED!",
+    "Someone constructed an item (Explosive Projectiles) worth 5400 PED! A record has been added to the Hall of Fame!",
+    "Someone found a deposit (Lysterium Stone) with a value of 60 PED!",
+    "Someone found a deposit (Lysterium Stone) with a value of 6000 PED! A record has been added to the Hall of Fame!",
+    "Someone killed a creature (Atrox Young) with a value of 80 PED at Nea's Place!",
+    "Welcome to Calypso",
+]
+
+
+class TestRuleDispatcher(unittest.TestCase):
+
+    def _legacy(self, table, msg):
+        for rx in table:
+            match = rx.search(msg)
+            if match:
+                return table[rx], match.groups()
+        return None
+
+    def _internal(self, dispatcher, table, msg):
+        expected = self._legacy(table, msg)
+        matched = dispatcher.match(msg)
+        if expected is None:
+            self.assertIsNone(matched)
+            return
+        rule, groups = matched
+        self.assertEqual((rule.chat_type, rule.cls, rule.kwargs), expected[0])
+        self.assertEqual(groups, expected[1])
+
+    def test_system_rules_match_rule_table(self):
+        dispatcher = RuleDispatcher(SYSTEM_RULES)
+        for msg in SYSTEM_SAMPLES:
+            with self.subTest(msg=msg):
+                self._internal(dispatcher, REGEXES, msg)
+
+    def test_global_rules_match_rule_table(self):
+        dispatcher = RuleDispatcher(GLOBAL_RULES)
+        for msg in GLOBAL_SAMPLES:
+            with self.subTest(msg=msg):
+                self._internal(dispatcher, GLOBAL_REGEXES, msg)
+
+    def test_critical_hit_wins_over_damage(self):
+        row = RuleDispatcher(SYSTEM_RULES).build(parse_log_line(
+            "2021-09-21 09:42:35 [System] [] Critical hit - Additional damage! You inflicted 519.1 points of damage"))
+        self.assertIsInstance(row, CombatRow)
+        self.assertTrue(row.critical)
+        self.assertEqual(row.amount, 519.1)
+
+    def test_build_rows(self):
+        dispatcher = RuleDispatcher(SYSTEM_RULES)
+        loot = dispatcher.build(parse_log_line(
+            "2021-09-21 09:42:35 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED"))
+        self.assertIsInstance(loot, LootInstance)
+        self.assertEqual(loot.amount, 1524)
+        self.assertEqual(str(loot.time), "2021-09-21 09:42:35")
+
+        skill = dispatcher.build(parse_log_line(
+            "2021-09-21 09:42:35 [System] [] Your Rifle has improved by 0.0150"))
+        self.assertIsInstance(skill, SkillRow)
+        self.assertEqual((skill.skill, skill.amount), ("Rifle", 0.015))
+
+    def test_reorder_by_hits(self):
+        dispatcher = RuleDispatcher(SYSTEM_RULES, reorder_interval=10)
+        for _ in range(10):
+            dispatcher.match("You missed")
+        order = [rule.name for rule in dispatcher.stats()]
+        self.assertEqual(order[0], "miss")
+        self.assertEqual(dispatcher.stats()[0].hits, 10)
+
+    def test_reorder_keeps_shadowed_rules_behind(self):
+        dispatcher = RuleDispatcher(SYSTEM_RULES, reorder_interval=10)
+        for _ in range(10):
+            dispatcher.match("You have gained 0.0021 Agility")
+        order = [rule.name for rule in dispatcher.stats()]
+        self.assertEqual(order[:2], ["skill_experience", "skill_gained"])
+        rule, groups = dispatcher.match("You have gained 0.1234 experience in your Rifle skill")
+        self.assertEqual(rule.name, "skill_experience")
+
+    def test_any_frequency_order_matches_rule_table(self):
+        for rules, table, samples in ((SYSTEM_RULES, REGEXES, SYSTEM_SAMPLES),
+                                      (GLOBAL_RULES, GLOBAL_REGEXES, GLOBAL_SAMPLES)):
+            dispatcher = RuleDispatcher(rules)
+            # Favour the rules at the bottom of the table as much as possible
+            dispatcher.hits = list(range(len(rules)))
+            dispatcher.reorder()
+            for msg in samples:
+                with self.subTest(msg=msg):
+                    self._internal(dispatcher, table, msg)
+
+    def test_matches_stay_right_while_another_thread_reorders(self):
+        dispatcher = RuleDispatcher(SYSTEM_RULES, reorder_interval=3)
+        expected = {msg: self._legacy(REGEXES, msg) for msg in SYSTEM_SAMPLES}
+        wrong = []
+
+        def match_samples(samples):
+            for _ in range(1000):
+                for msg in samples:
+                    matched = dispatcher.match(msg)
+                    if matched is not None and matched[1] != expected[msg][1]:
+                        wrong.append(msg)
+
+        # Switch threads as often as possible so matches interleave with reorders
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        threads = [threading.Thread(target=match_samples, args=(SYSTEM_SAMPLES[i::2],)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(wrong, [])
+
+    def test_readers_have_their_own_dispatchers(self):
+        readers = [ChatReader(SimpleNamespace()) for _ in range(2)]
+        self.assertIsNot(readers[0].system_dispatcher, readers[1].system_dispatcher)
+        self.assertIsNot(readers[0].global_dispatcher, readers[1].global_dispatcher)
+
+    def test_shadows_must_point_down_the_table(self):
+        rules = [ChatRule("plain", r"You missed", None, CombatRow, {}),
+                 ChatRule("shadowing", r"You missed", None, CombatRow, {}, ("plain",))]
+        with self.assertRaises(ValueError):
+            RuleDispatcher(rules)
+
+
+class TestLogTime(unittest.TestCase):
+
+    def test_matches_strptime_and_mktime(self):
+        cache = LogTimeCache()
+        t = datetime(2021, 1, 1)
+        while t.year == 2021:
+            for log_time in (f"{t:%Y-%m-%d %H:%M:%S}", f"{t:%Y-%m-%d %H:%M:%S}"):
+                expected = datetime.strptime(log_time, "%Y-%m-%d %H:%M:%S")
+                self.assertEqual(parse_log_time(log_time), expected)
+                self.assertEqual(cache.parse(log_time), (expected, int(time.mktime(expected.timetuple()))))
+            t += timedelta(hours=7, seconds=13)
+
+    def test_unpadded_and_invalid(self):
+        self.assertEqual(parse_log_time("2021-9-21 9:42:35"), datetime(2021, 9, 21, 9, 42, 35))
+        with self.assertRaises(ValueError):
+            parse_log_time("2021-13-21 09:42:35")
+
+    def test_rows_get_datetime_and_epoch(self):
+        row = RuleDispatcher(SYSTEM_RULES).build(parse_log_line("2021-09-21 09:42:36 [System] [] You missed"))
+        self.assertEqual(row.time, datetime(2021, 9, 21, 9, 42, 36))
+        self.assertEqual(row.ts, int(time.mktime(row.time.timetuple())))
+
+    def test_channel_prefilter(self):
+        self.assertTrue(is_tracked_channel("2021-09-21 09:42:36 [System] [] You missed"))
+        self.assertTrue(is_tracked_channel("2021-09-21 09:42:36 [Globals] [] Hunter killed a creature"))
+        self.assertFalse(is_tracked_channel("2021-09-21 09:42:36 [Trade] [Tom] [System] [Globals]"))
+        self.assertFalse(is_tracked_channel("2021-09-21 09:42:36 [#calypso] [Tom] hi"))
+        self.assertFalse(is_tracked_channel(""))
+
+
+LOG = (
+    b"2021-09-21 09:42:35 [System] [] You inflicted 46.2 points of damage\n"
+    b"2021-09-21 09:42:36 [System] [] You missed\n"
+    b"2021-09-21 09:42:36 [Trade] [Trader Tom] WTB [System] [Globals] 101%\n"
+    b"2021-09-21 09:42:37 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED\n"
+)
+
+
+class TestChatReaderResume(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        with open(self.path, "wb") as f:
+            f.write(LOG)
+        self.reader = ChatReader(SimpleNamespace(config=SimpleNamespace(location=SimpleNamespace(value=self.path))))
+        self.reader.index = ChatLogIndex(self.path, filename=self.path + ".index", interval=1)
+
+    def _read(self, count):
+        self.reader.delay_start_reader()
+        rows = []
+        deadline = time.time() + 5
+        while len(rows) < count and time.time() < deadline:
+            rows.extend(self.reader.getlines())
+            time.sleep(0.001)
+        self.reader.tail.stop()
+        return rows
+
+    def _checkpoint(self):
+        """Checkpoint taken right after the first line of LOG"""
+        with open(self.path, "rb") as f:
+            fingerprint = file_fingerprint(f)
+        return LOG.index(b"\n") + 1, datetime(2021, 9, 21, 9, 42, 35), fingerprint
+
+    def test_starts_at_end_without_checkpoint(self):
+        self.assertIsNone(self.reader.start_offset(self.path))
+
+    def test_resumes_after_checkpoint(self):
+        self.reader.resume(*self._checkpoint())
+        rows = self._read(2)
+        line_starts = [0] + [i + 1 for i, c in enumerate(LOG[:-1]) if c == ord("\n")]
+        self.assertEqual(self.reader.index.offsets, line_starts)
+        self.assertTrue(rows[0].miss)
+        self.assertIsInstance(rows[1], LootInstance)
+        self.assertEqual(rows[1].offset, len(LOG))
+        self.assertEqual(rows[1].fingerprint, self._checkpoint()[2])
+        self.assertEqual((self.reader.lines_parsed, self.reader.lines_skipped), (2, 1))
+
+    def test_queued_rows_wake_the_worker(self):
+        self.reader.arrived = threading.Event()
+        self.reader.resume(*self._checkpoint())
+        before = time.time()
+        rows = self._read(2)
+        self.assertTrue(self.reader.arrived.is_set())
+        self.assertTrue(all(before <= row.read_time <= time.time() for row in rows))
+
+    def test_full_queue_holds_the_reader_back_without_dropping_rows(self):
+        self.reader.queue = EventQueue(maxsize=1)
+        self.reader.resume(0, datetime(2021, 9, 21, 9, 42, 35), self._checkpoint()[2])
+        self.reader.delay_start_reader()
+        time.sleep(0.2)
+        # The reader waits on its second row, the rest of the log is left unread
+        self.assertEqual(len(self.reader.queue), 1)
+        self.assertEqual(self.reader.last_offset, LOG.index(b"\n") + 1)
+
+        rows = []
+        deadline = time.time() + 5
+        while len(rows) < 3 and time.time() < deadline:
+            rows.extend(self.reader.getlines())
+            time.sleep(0.05)
+        self.reader.tail.stop()
+        self.assertEqual([type(row) for row in rows], [CombatRow, CombatRow, LootInstance])
+        self.assertEqual(self.reader.queue.stats().drops, 0)
+
+    def test_removed_reader_stops_while_its_queue_is_full(self):
+        self.reader.queue = EventQueue(maxsize=1)
+        self.reader.resume(0, datetime(2021, 9, 21, 9, 42, 35), self._checkpoint()[2])
+        self.reader.delay_start_reader()
+        deadline = time.time() + 5
+        while not self.reader.queue.stats().waits and time.time() < deadline:
+            time.sleep(0.01)
+
+        config = SimpleNamespace(location=SimpleNamespace(value=""), extra_chat_logs=SimpleNamespace(value=[]))
+        sources = ChatSources(SimpleNamespace(config=config), ChatReader(SimpleNamespace(config=config)))
+        sources.extra[("Alt", self.path)] = self.reader
+        sources.sync()
+        self.reader.reader.join(5)
+        self.assertFalse(self.reader.reader.is_alive())
+        self.assertEqual(sources.readers, [sources.primary])
+
+    def test_replays_replaced_log_without_recounting(self):
+        checkpoint = self._checkpoint()
+        with open(self.path, "wb") as f:
+            f.write(b"2021-09-21 09:40:00 [System] [] You missed\n" + LOG)
+        self.reader.resume(*checkpoint)
+        self.assertEqual(self.reader.start_offset(self.path), 0)
+        rows = self._read(2)
+        self.assertEqual([str(row.time) for row in rows], ["2021-09-21 09:42:36", "2021-09-21 09:42:37"])
+
+    def test_bad_bytes_are_replaced(self):
+        with open(self.path, "ab") as f:
+            f.write(b"2021-09-21 09:42:38 [System] [] You received Shrapnel\xff x (10) Value: 0.0010 PED\n")
+            f.write(b"2021-09-21 09:42:39 [System] [] You missed\n")
+        self.reader.resume(*self._checkpoint())
+        rows = self._read(4)
+        self.assertEqual(rows[2].name, "Shrapnel\ufffd")
+        self.assertTrue(rows[3].miss)
+        self.assertEqual(self.reader.health().decode_errors, 1)
+
+    def test_restarts_from_last_good_offset(self):
+        class FailingIndex(ChatLogIndex):
+            failures = 1
+
+            def observe(self, offset, line):
+                if line.endswith("PED") and self.failures:
+                    self.failures -= 1
+                    raise OSError("chat.log went away")
+                super().observe(offset, line)
+
+        self.reader.index = FailingIndex(self.path, filename=self.path + ".index")
+        self.reader.resume(*self._checkpoint())
+        restart_delay, chat.READER_RESTART_DELAY = chat.READER_RESTART_DELAY, 0.01
+        try:
+            rows = self._read(2)
+        finally:
+            chat.READER_RESTART_DELAY = restart_delay
+        self.assertTrue(rows[0].miss)
+        self.assertIsInstance(rows[1], LootInstance)
+        self.assertEqual(len(rows), 2)
+        health = self.reader.health()
+        self.assertEqual(health.restarts, 1)
+        self.assertIn("chat.log went away", health.last_error)
+
+
+class TestChatSources(unittest.TestCase):
+
+    def test_batches_are_shared_fairly(self):
+        config = SimpleNamespace(location=SimpleNamespace(value=""), extra_chat_logs=SimpleNamespace(value=[]))
+        app = SimpleNamespace(config=config)
+        sources = ChatSources(app, ChatReader(app))
+        busy, quiet = ChatReader(app, source="Busy", maxsize=100), ChatReader(app, source="Quiet", maxsize=100)
+        sources.readers = [sources.primary, busy, quiet]
+        for i in range(100):
+            busy.queue.put(("busy", i), block=False)
+        for i in range(5):
+            quiet.queue.put(("quiet", i), block=False)
+        self.assertFalse(busy.queue.put(("busy", 100), block=False))
+
+        first = sources.getlines(30)
+        self.assertEqual(len(first), 15)
+        self.assertEqual([item for item in first if item[0] == "quiet"], [("quiet", i) for i in range(5)])
+        self.assertEqual(sources.backlog(), 90)
+
+
 if __name__ == '__main__':
     unittest.main()
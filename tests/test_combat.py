@@ -0,0 +1,173 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from chat import SYSTEM_DISPATCHER, GLOBAL_DISPATCHER, parse_log_line
+from modules.combat import CombatModule, HuntingTrip, MarkupSingleton, RUNS_VIEW
+from utils.money import units_to_ped
+
+
+def row(line, source=None, offset=None):
+    log_line = parse_log_line(line)
+    dispatcher = SYSTEM_DISPATCHER if log_line.channel == "System" else GLOBAL_DISPATCHER
+    chat_instance = dispatcher.build(log_line)
+    chat_instance.source = source
+    chat_instance.offset = offset
+    return chat_instance
+
+
+def logging_module():
+    config = SimpleNamespace(name=SimpleNamespace(value="Main Hunter"),
+                             screenshot_enabled=SimpleNamespace(value=False))
+    module = CombatModule(SimpleNamespace(config=config, streamer_window=None))
+    module.is_logging = True
+    return module
+
+
+class TestCombatModule(unittest.TestCase):
+
+    def setUp(self):
+        self.module = logging_module()
+
+    def test_rows_go_to_the_run_of_their_character(self):
+        self.module.ingest([
+            row("2021-09-21 09:42:35 [System] [] You inflicted 46.2 points of damage", offset=100),
+            row("2021-09-21 09:42:35 [System] [] You missed", source="Alt", offset=50),
+            row("2021-09-21 09:42:36 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED", source="Alt",
+                offset=120),
+            row("2021-09-21 09:42:37 [Globals] [] Alt killed a creature (Atrox Young) with a value of 80 PED!",
+                source="Alt", offset=200),
+        ])
+        main, alt = self.module.active_run, self.module.character_runs["Alt"]
+        self.assertEqual(self.module.runs, [main, alt])
+        self.assertEqual((main.total_attacks, alt.total_attacks), (1, 1))
+        self.assertEqual((main.tt_return, alt.tt_return), (0, Decimal("0.1524")))
+        self.assertEqual((main.globals, alt.globals), (0, 1))
+        self.assertEqual((main.log_offset, alt.log_offset), (100, 200))
+        self.assertEqual(alt.character, "Alt")
+        self.assertNotEqual(main.filename, alt.filename)
+
+    def test_character_runs_end_with_the_main_run(self):
+        self.module.ingest([row("2021-09-21 09:42:35 [System] [] You missed", source="Alt")])
+        run = self.module.character_runs["Alt"]
+        saved = []
+        run.save_to_disk = lambda: saved.append(run)
+        self.module.end_character_runs()
+        self.assertEqual(saved, [run])
+        self.assertIsNotNone(run.time_end)
+        self.assertEqual(self.module.character_runs, {})
+
+    def test_run_starts_and_ends_without_chat_rows(self):
+        module = logging_module()
+        module.is_logging = False
+        module.start_run()
+        run = module.active_run
+        self.assertEqual(module.runs, [run])
+
+        with mock.patch.object(HuntingTrip, "save_to_disk") as save_to_disk:
+            module.end_run()
+            module.end_run()
+        self.assertIsNone(module.active_run)
+        self.assertIsNotNone(run.time_end)
+        self.assertFalse(module.is_logging)
+        self.assertEqual(save_to_disk.call_count, 2)
+
+    def test_unfinished_runs_are_resumed_with_their_loot(self):
+        directory = tempfile.mkdtemp()
+        for name, value in (("RUNS_DIRECTORY", directory),
+                            ("format_filename", lambda fn: os.path.join(directory, fn))):
+            patcher = mock.patch(f"modules.combat.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.module.ingest([
+            row("2021-09-21 09:42:36 [System] [] You received Animal Oil Residue x (12) Value: 0.1200 PED"),
+            row("2021-09-21 09:42:36 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED", source="Bob"),
+        ])
+        self.module.save_active_run(force=True)
+        finished = HuntingTrip(self.module.active_run.time_start - timedelta(days=1), Decimal("0.1"))
+        finished.time_end = finished.time_start + timedelta(hours=1)
+        finished.save_to_disk()
+
+        module = logging_module()
+        module.kill_gap = 7
+        module.load_runs()
+        main, bob = module.active_run, module.character_runs["Bob"]
+        self.assertEqual(len(module.runs), 3)
+        self.assertEqual([run.segmenter.gap for run in module.runs], [7, 7, 7])
+        self.assertIsNotNone(module.runs[0].time_end)
+        self.assertEqual(dict(main.looted_items), {"Animal Oil Residue": {"c": 12, "v": 1200, "p": 4}})
+        self.assertEqual(dict(bob.looted_items), {"Shrapnel": {"c": 1524, "v": 1524, "p": 4}})
+
+        module.save_active_run(force=True)
+        module = logging_module()
+        module.load_runs()
+        self.assertEqual(str(module.character_runs["Bob"].tt_return), "0.1524")
+        self.assertIn("Shrapnel", module.character_runs["Bob"].looted_items)
+
+
+def total_return_mu(run):
+    """The markup adjusted return worked out from scratch"""
+    return sum((MarkupSingleton.apply_markup_to_item(name, item["c"], units_to_ped(item["v"]))
+                for name, item in run.looted_items.items()), Decimal("0.0"))
+
+
+class TestReturnWithMarkup(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("modules.markup.MARKUP_FILENAME", os.path.join(tempfile.mkdtemp(), "markup.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: [MarkupSingleton._data.pop(name, None) for name in ("Test Oil", "Test Hide")])
+        MarkupSingleton.add_markup_for_item("Test Oil", "120%")
+        MarkupSingleton.add_markup_for_item("Test Hide", "+0.5")
+
+        self.module = logging_module()
+        MarkupSingleton.add_listener(self.module.on_markup_changed)
+        self.addCleanup(MarkupSingleton.remove_listener, self.module.on_markup_changed)
+        self.module.ingest([
+            row("2021-09-21 09:42:35 [System] [] You received Test Oil x (12) Value: 0.1200 PED"),
+            row("2021-09-21 09:42:35 [System] [] You received Test Hide x (2) Value: 0.0400 PED"),
+            row("2021-09-21 09:42:38 [System] [] You received Test Oil x (30) Value: 0.3000 PED"),
+            row("2021-09-21 09:42:38 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED"),
+        ])
+        self.run = self.module.active_run
+
+    def test_kept_up_to_date_with_loot(self):
+        self.assertEqual(self.run.total_return_mu, total_return_mu(self.run))
+        self.assertEqual(self.run.total_return_mu, Decimal("0.42") * Decimal("1.2") + Decimal("1.04")
+                         + Decimal("0.1524") * MarkupSingleton.get_markup_for_item("Shrapnel").value)
+
+    def test_markup_changes_adjust_the_runs_that_looted_the_item(self):
+        other = HuntingTrip(None, Decimal("0.1"))
+        self.module.runs.append(other)
+        self.module.dirty.clear()
+
+        MarkupSingleton.add_markup_for_item("Test Oil", "150%")
+        self.assertEqual(self.run.total_return_mu, total_return_mu(self.run))
+        self.assertEqual(other.total_return_mu, 0)
+        self.assertIn(RUNS_VIEW, self.module.dirty)
+
+        MarkupSingleton.add_markup_for_item("Test Hide", "130%")
+        self.assertEqual(self.run.total_return_mu, total_return_mu(self.run))
+
+    def test_modules_only_listen_when_registered(self):
+        listeners = list(MarkupSingleton.listeners)
+        logging_module()
+        self.assertEqual(MarkupSingleton.listeners, listeners)
+
+    def test_loaded_runs_use_the_current_markup(self):
+        saved = self.run.serialize_run()
+        MarkupSingleton.add_markup_for_item("Test Hide", "+1.5")
+        loaded = HuntingTrip.from_seralized(saved, include_loot=True)
+        self.assertEqual(loaded.total_return_mu, total_return_mu(loaded))
+        summary = HuntingTrip.from_seralized(saved)
+        self.assertEqual(summary.total_return_mu, Decimal(saved["summary"]["cached_mu_return"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from modules.engine import EngineConfig, TrackingEngine
+from tests.test_backfill import write_log, live_run
+
+
+class TestTrackingEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        write_log(self.path, 3000)
+
+    def test_runs_without_qt(self):
+        # A fresh interpreter, the test runner may have imported PyQt already. Without PyQt installed a Qt import
+        # fails the import instead
+        code = "import sys, modules.engine; print([name for name in sys.modules if name.startswith('PyQt')])"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(out.returncode, 0, out.stderr)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+    def test_replay_matches_live_tracking(self):
+        engine = TrackingEngine(EngineConfig(self.path, "Hunter"), Decimal("0.05"), self.path + ".index")
+        run = engine.replay(self.path, workers=1)
+        expected = live_run(self.path, datetime.min, datetime.max, Decimal("0.05"))
+        self.assertEqual(run.total_attacks, expected.total_attacks)
+        self.assertEqual(run.tt_return, expected.tt_return)
+        self.assertEqual(run.globals, expected.globals)
+        self.assertEqual(run.time_start, datetime(2021, 9, 21, 9, 0, 0))
+
+        out = os.path.join(os.path.dirname(self.path), "run.json")
+        engine.write_run(out)
+        self.assertTrue(os.path.getsize(out))
+        self.assertIn(f"{expected.total_attacks} attacks", engine.stats())
+
+    def test_follows_new_lines(self):
+        engine = TrackingEngine(EngineConfig(self.path, "Hunter"), Decimal("0.05"), self.path + ".index")
+        engine.start()
+        try:
+            deadline = time.time() + 5
+            with open(self.path, "a") as f:
+                for i in range(10):
+                    f.write("2021-09-21 12:00:00 [System] [] You inflicted 46.2 points of damage\n")
+            while time.time() < deadline:
+                run = engine.combat_module.active_run
+                if run and run.total_attacks == 10:
+                    break
+                time.sleep(0.01)
+        finally:
+            engine.stop()
+        self.assertEqual(engine.combat_module.active_run.total_attacks, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
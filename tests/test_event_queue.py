@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from utils.event_queue import EventQueue
+
+
+class TestEventQueue(unittest.TestCase):
+
+    def test_fifo_and_drain(self):
+        queue = EventQueue(maxsize=10)
+        for i in range(5):
+            queue.put(i)
+        self.assertEqual(queue.get(), 0)
+        self.assertEqual(queue.drain(2), [1, 2])
+        self.assertEqual(queue.drain(), [3, 4])
+        self.assertIsNone(queue.get())
+        self.assertEqual(queue.drain(), [])
+
+    def test_drops_when_full_without_blocking(self):
+        queue = EventQueue(maxsize=3)
+        results = [queue.put(i, block=False) for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        stats = queue.stats()
+        self.assertEqual(stats.drops, 2)
+        self.assertEqual(stats.depth, 3)
+        self.assertEqual(stats.high_water, 3)
+
+    def test_drops_after_timeout(self):
+        queue = EventQueue(maxsize=1)
+        queue.put("a")
+        self.assertFalse(queue.put("b", timeout=0.01))
+        self.assertEqual(queue.stats().drops, 1)
+        self.assertEqual(queue.stats().waits, 1)
+
+    def test_close_releases_a_waiting_put(self):
+        queue = EventQueue(maxsize=1)
+        queue.put("a")
+        results = []
+        producer = threading.Thread(target=lambda: results.append(queue.put("b")), daemon=True)
+        producer.start()
+        time.sleep(0.05)
+        queue.close()
+        producer.join(1)
+        self.assertEqual(results, [False])
+        self.assertFalse(queue.put("c"))
+        self.assertEqual(queue.drain(), [])
+
+    def test_blocking_put_waits_for_consumer(self):
+        queue = EventQueue(maxsize=2)
+        total = 200
+
+        def produce():
+            for i in range(total):
+                queue.put(i)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        received = []
+        deadline = time.time() + 5
+        while len(received) < total and time.time() < deadline:
+            received.extend(queue.drain(7))
+            time.sleep(0.001)
+        producer.join(1)
+
+        self.assertEqual(received, list(range(total)))
+        stats = queue.stats()
+        self.assertEqual(stats.drops, 0)
+        self.assertLessEqual(stats.high_water, 2)
+        self.assertEqual((stats.total_in, stats.total_out), (total, total))
+
+
+if __name__ == '__main__':
+    unittest.main()
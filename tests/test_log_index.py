@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from modules.backfill import backfill_runs
+from utils.log_index import ChatLogIndex
+from tests.test_backfill import write_log
+
+
+class TestChatLogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "chat.log")
+        write_log(self.path, 3000)
+        with open(self.path, "rb") as f:
+            self.data = f.read()
+
+    def _index(self, **kwargs):
+        return ChatLogIndex(self.path, filename=self.path + ".index", interval=4096, **kwargs)
+
+    def _first_line_at(self, when):
+        """Byte offset of the first line logged at or after when, found the slow way"""
+        offset = 0
+        for line in self.data.splitlines(keepends=True):
+            if line[:19].decode() >= f"{when:%Y-%m-%d %H:%M:%S}":
+                return offset
+            offset += len(line)
+        return len(self.data)
+
+    def test_entries_are_line_starts(self):
+        index = self._index()
+        index.build()
+        self.assertGreater(len(index.offsets), 10)
+        for offset, logged in zip(index.offsets, index.times):
+            self.assertTrue(offset == 0 or self.data[offset - 1:offset] == b"\n")
+            self.assertEqual(self.data[offset:offset + 19].decode(), logged)
+        self.assertEqual(index.times, sorted(index.times))
+
+    def test_seek_never_skips_a_line(self):
+        index = self._index()
+        index.build()
+        start = datetime(2021, 9, 21, 9, 0, 0)
+        for minute in range(0, 60, 3):
+            when = start + timedelta(minutes=minute, seconds=17)
+            first = self._first_line_at(when)
+            offset = index.seek(when)
+            self.assertLessEqual(offset, first)
+            self.assertLess(first - offset, 2 * 4096)
+
+    def test_observe_matches_build(self):
+        built = self._index()
+        built.build()
+        observed = self._index()
+        offset = 0
+        for line in self.data.splitlines(keepends=True):
+            observed.observe(offset, line.decode())
+            offset += len(line)
+        self.assertEqual(observed.offsets[:len(built.offsets)], built.offsets)
+
+    def test_saved_index_is_extended(self):
+        index = self._index()
+        index.build()
+        entries = len(index.offsets)
+        write_log(self.path + ".more", 3000)
+        with open(self.path, "ab") as f, open(self.path + ".more", "rb") as more:
+            f.write(more.read())
+
+        index = self._index()
+        index.load()
+        self.assertEqual(len(index.offsets), entries)
+        index.build()
+        self.assertGreater(len(index.offsets), entries)
+
+    def test_replaced_log_is_reindexed(self):
+        index = self._index()
+        index.build()
+        write_log(self.path, 100)
+        index = self._index()
+        index.load()
+        index.build()
+        self.assertEqual(index.offsets[0], 0)
+        self.assertLess(index.offsets[-1], os.path.getsize(self.path))
+
+    def test_backfill_with_index(self):
+        start, end = datetime(2021, 9, 21, 9, 10, 0), datetime(2021, 9, 21, 9, 20, 0)
+        index = self._index()
+        index.build()
+        byte_start, byte_end = index.byte_range(start, end)
+        self.assertGreater(byte_start, 0)
+        self.assertLess(byte_end, len(self.data))
+
+        expected, = backfill_runs(self.path, [(start, end)], Decimal("0.05"), "Hunter", workers=1)
+        actual, = backfill_runs(self.path, [(start, end)], Decimal("0.05"), "Hunter", workers=1, index=index)
+        self.assertEqual(actual.serialize_run(), expected.serialize_run())
+
+
+if __name__ == '__main__':
+    unittest.main()
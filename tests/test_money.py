@@ -0,0 +1,71 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from chat import LootInstance
+from modules.combat import HuntingTrip
+from tests.test_combat import row
+from utils.money import ped_places, ped_to_units, units_to_ped
+
+
+class TestMoney(unittest.TestCase):
+
+    def test_units_round_trip(self):
+        for text in ("0.1524", "0.0000", "1234.5000", "-0.5000"):
+            self.assertEqual(str(units_to_ped(ped_to_units(text))), text)
+        self.assertEqual(ped_to_units("12"), 120000)
+        self.assertEqual(ped_to_units("1.5"), 15000)
+        # Values more precise than chat's four places are rounded to them
+        self.assertEqual((ped_to_units("0.12346"), ped_to_units("0.12344")), (1235, 1234))
+
+    def test_places(self):
+        self.assertEqual([ped_places(text) for text in ("0.1524", "12.30", "12", "0.12345")], [4, 2, 0, 4])
+        self.assertEqual(str(units_to_ped(123000, 2)), "12.30")
+        self.assertEqual(str(units_to_ped(0, 0)), "0")
+
+    def test_loot_values(self):
+        self.assertEqual(LootInstance("Animal Oil Residue", "12", "0.1200").units, 1200)
+        shrapnel = LootInstance("Shrapnel", "1524", "0.1524")
+        self.assertEqual((shrapnel.units, str(shrapnel.value)), (1524, "0.1524"))
+
+    def test_run_totals_match_decimal_sums(self):
+        cps = Decimal("0.0812")
+        run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), cps)
+        self.assertEqual((str(run.total_cost), str(run.tt_return)), ("0", "0"))
+
+        for _ in range(3):
+            run.add_chat_row(row("2021-09-21 09:42:35 [System] [] You missed"))
+        run.add_chat_row(row("2021-09-21 09:42:35 [System] [] You received Animal Oil Residue x (12) "
+                             "Value: 0.1200 PED"))
+        run.cost_per_shot = Decimal("0.1")
+        run.add_chat_row(row("2021-09-21 09:42:39 [System] [] You missed"))
+        run.add_chat_row(row("2021-09-21 09:42:39 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED"))
+
+        self.assertEqual(str(run.total_cost), str(cps + cps + cps + Decimal("0.1")))
+        self.assertEqual(str(run.tt_return), "0.2724")
+        self.assertEqual([(b.x, b.max) for b in run.multipliers.buckets()], [(float(cps * 3), 0.12)])
+        self.assertEqual(run.serialize_run()["loot"]["Shrapnel"], {"c": "1524", "v": "0.1524"})
+
+        loaded = HuntingTrip.from_seralized(run.serialize_run(), include_loot=True)
+        self.assertEqual(loaded.serialize_run(), run.serialize_run())
+
+    def test_saved_values_keep_their_places(self):
+        run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.1"))
+        run.add_chat_row(row("2021-09-21 09:42:35 [System] [] You received Animal Hide x (5) Value: 0.50 PED"))
+        self.assertEqual(str(run.tt_return), "0.50")
+
+        saved = run.serialize_run()
+        saved["loot"]["Animal Oil Residue"] = {"c": "1230", "v": "12.30"}
+        saved["summary"]["tt_return"] = "12.80"
+        loaded = HuntingTrip.from_seralized(saved, include_loot=True)
+        self.assertEqual(loaded.serialize_run()["loot"],
+                         {"Animal Hide": {"c": "5", "v": "0.50"}, "Animal Oil Residue": {"c": "1230", "v": "12.30"}})
+
+        # A more precise loot line is rounded to four places instead of being thrown away
+        loaded.add_chat_row(row("2021-09-21 09:42:39 [System] [] You received Animal Hide x (1) Value: 0.12345 PED"))
+        self.assertEqual(loaded.serialize_run()["loot"]["Animal Hide"]["v"], "0.6234")
+        self.assertEqual(str(loaded.tt_return), "12.9234")
+
+
+if __name__ == '__main__':
+    unittest.main()
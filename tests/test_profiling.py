@@ -0,0 +1,86 @@
+import json
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+
+from chat import BaseChatRow
+from utils.profiling import Profiler, RollingHistogram, LOG_TO_READ, READ_TO_RENDER, LOG_TO_RENDER
+
+
+def busy_loop():
+    return sum(range(1000))
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_percentiles_cover_the_last_window(self):
+        histogram = RollingHistogram(window=100)
+        for value in range(1000):
+            histogram.add(value)
+        stats = histogram.stats("stage")
+        self.assertEqual(stats.count, 1000)
+        self.assertEqual(stats.last, 999)
+        self.assertEqual(stats.p50, 950)
+        self.assertEqual(stats.p99, 999)
+        self.assertEqual(stats.max, 999)
+
+    def test_stages_are_timed(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.stage("worker.ingest"):
+                busy_loop()
+        profiler.record_depth("chat.log", 12)
+
+        stage, = profiler.stage_stats()
+        self.assertEqual((stage.name, stage.count), ("worker.ingest", 3))
+        self.assertGreater(stage.p50, 0)
+        depth, = profiler.depth_stats()
+        self.assertEqual((depth.name, depth.max), ("chat.log", 12))
+
+        profiler.reset()
+        self.assertEqual(profiler.stage_stats(), [])
+
+    def test_row_latency(self):
+        profiler = Profiler()
+        rows = [BaseChatRow() for _ in range(3)]
+        for i, row in enumerate(rows):
+            row.ts = 1000
+            row.read_time = 1000.5 + i
+        rows.append(BaseChatRow())
+        profiler.record_latency(rows, now=1004.0)
+
+        stats = {stats.name: stats for stats in profiler.latency_stats()}
+        self.assertEqual(list(stats), [LOG_TO_READ, READ_TO_RENDER, LOG_TO_RENDER])
+        self.assertEqual(stats[LOG_TO_READ].count, 3)
+        self.assertEqual((stats[LOG_TO_READ].p50, stats[LOG_TO_READ].max), (1.5, 2.5))
+        self.assertEqual((stats[READ_TO_RENDER].p50, stats[READ_TO_RENDER].max), (2.5, 3.5))
+        self.assertEqual(stats[LOG_TO_RENDER].max, 4.0)
+
+        filename = os.path.join(tempfile.mkdtemp(), "metrics.json")
+        profiler.dump(filename)
+        with open(filename) as f:
+            self.assertEqual(json.load(f)["latency"][1]["p50"], 2.5)
+
+    def test_cprofile_of_ticks_includes_other_threads(self):
+        filename = os.path.join(tempfile.mkdtemp(), "ticks.prof")
+        profiler = Profiler()
+        profiler.start_cprofile(2, filename)
+
+        worker = threading.Thread(target=profiler.profiled, args=(busy_loop,))
+        worker.start()
+        worker.join()
+        profiler.profiled(busy_loop, tick=True)
+        self.assertFalse(os.path.exists(filename))
+        profiler.profiled(busy_loop, tick=True)
+
+        stats = pstats.Stats(filename)
+        calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+        self.assertEqual(calls["busy_loop"], 3)
+        # Later calls run unprofiled
+        self.assertEqual(profiler.profiled(busy_loop, tick=True), busy_loop())
+
+
+if __name__ == '__main__':
+    unittest.main()
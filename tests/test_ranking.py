@@ -0,0 +1,90 @@
+import random
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from modules.combat import HuntingTrip
+from tests.test_combat import row
+from utils.ranking import RankedIndex
+
+
+class TestRankedIndex(unittest.TestCase):
+
+    def test_order_matches_sorting(self):
+        rand = random.Random(4)
+        index = RankedIndex()
+        values = {}
+        for _ in range(5000):
+            key = f"item {rand.randrange(200)}"
+            values[key] = values.get(key, 0) + rand.randrange(1, 1000)
+            index.update(key, values[key])
+        self.assertEqual([values[k] for k in index], sorted(values.values(), reverse=True))
+        self.assertEqual(index.total, sum(values.values()))
+        self.assertEqual(index.top(3), list(index)[:3])
+        self.assertEqual(len(index.top()), 200)
+
+        loaded = RankedIndex.from_dict(values)
+        self.assertEqual([values[k] for k in loaded], [values[k] for k in index])
+        loaded.update("item 0", 10 ** 9)
+        self.assertEqual(loaded.top(1), ["item 0"])
+
+    def test_values_can_shrink(self):
+        index = RankedIndex()
+        for key, value in (("a", 3), ("b", 2), ("c", 1)):
+            index.update(key, value)
+        index.update("a", 0)
+        self.assertEqual(list(index), ["b", "c", "a"])
+        self.assertEqual(index.rank, {"b": 0, "c": 1, "a": 2})
+
+
+class TestTopRows(unittest.TestCase):
+
+    def setUp(self):
+        self.run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.1"))
+        for line in ("You received Animal Oil Residue x (12) Value: 0.1200 PED",
+                     "You received Shrapnel x (1524) Value: 0.1524 PED",
+                     "You received Animal Hide x (4) Value: 0.0400 PED",
+                     "You received Animal Oil Residue x (30) Value: 0.3000 PED",
+                     "You have gained 0.1234 experience in your Anatomy skill",
+                     "You have gained 0.5 experience in your Rifle skill",
+                     "You have gained 0.01 experience in your Anatomy skill",
+                     "You have gained 0.2 experience in your Courage skill",
+                     "Your enhancer Weapon Damage Enhancer 1 on your Opalo broke.",
+                     "Your enhancer Weapon Damage Enhancer 1 on your Opalo broke.",
+                     "Your enhancer Weapon Accuracy Enhancer 1 on your Opalo broke."):
+            self.run.add_chat_row(row(f"2021-09-21 09:42:35 [System] [] {line}"))
+
+    def test_every_row_sorted(self):
+        loot = self.run.get_item_loot_table_data()
+        self.assertEqual(loot["Item"], ["Animal Oil Residue", "Shrapnel", "Animal Hide"])
+        self.assertEqual(loot["Value"], ["0.4200", "0.1524", "0.0400"])
+        skills = self.run.get_skill_table_data()
+        self.assertEqual(skills["Skill"], ["Rifle", "Courage", "Anatomy"])
+        # Procs are those of the skill on the same row
+        self.assertEqual((skills["Procs"], skills["Proc %"]), ([1, 1, 2], ["25%", "25%", "50%"]))
+        self.assertEqual(self.run.get_enhancer_table_data()["Breaks"], ["2", "1"])
+
+    def test_others_row(self):
+        loot = self.run.get_item_loot_table_data(top=1)
+        self.assertEqual(loot["Item"], ["Animal Oil Residue", "Others (2)"])
+        total_value = sum(Decimal(v) for v in self.run.get_item_loot_table_data()["Total Value"][1:])
+        self.assertEqual((loot["Value"][1], loot["Count"][1], loot["Markup"][1], loot["Total Value"][1]),
+                         ("0.1924", "1528", "", "{:.4f}".format(total_value)))
+
+        skills = self.run.get_skill_table_data(top=2)
+        self.assertEqual(skills["Skill"], ["Rifle", "Courage", "Others (1)"])
+        self.assertEqual((skills["Value"][2], skills["Procs"][2]), ("0.1334", 2))
+
+        enhancers = self.run.get_enhancer_table_data(top=1)
+        self.assertEqual(enhancers, {"Enhancer": ["Weapon Damage Enhancer 1", "Others (1)"], "Breaks": ["2", "1"]})
+        # No others row when everything fits
+        self.assertEqual(len(self.run.get_enhancer_table_data(top=2)["Enhancer"]), 2)
+
+    def test_loaded_runs_keep_their_order(self):
+        loaded = HuntingTrip.from_seralized(self.run.serialize_run(), include_loot=True)
+        for method in ("get_item_loot_table_data", "get_skill_table_data", "get_enhancer_table_data"):
+            self.assertEqual(getattr(loaded, method)(), getattr(self.run, method)())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from chat import LootInstance
+from modules.combat import HuntingTrip
+from modules.segmentation import KillSegmenter, ExclusionRule, split_kills, IGNORE, NOT_A_KILL, SAME_KILL, \
+    NEW_KILL
+from tests.test_combat import row
+
+
+# Recorded chat.log excerpt, three kills, the second one's loot crosses an even second
+RECORDED_LOG = """2021-09-21 09:42:30 [System] [] You inflicted 46.2 points of damage
+2021-09-21 09:42:31 [System] [] You inflicted 52.0 points of damage
+2021-09-21 09:42:32 [System] [] You received Animal Oil Residue x (12) Value: 0.1200 PED
+2021-09-21 09:42:32 [System] [] You received Shrapnel x (1524) Value: 0.1524 PED
+2021-09-21 09:42:33 [System] [] You received Universal Ammo x (1000) Value: 0.1000 PED
+2021-09-21 09:42:34 [System] [] You missed
+2021-09-21 09:42:35 [System] [] You inflicted 61.9 points of damage
+2021-09-21 09:42:36 [System] [] You inflicted 40.3 points of damage
+2021-09-21 09:42:37 [System] [] You received Animal Hide x (4) Value: 0.0400 PED
+2021-09-21 09:42:38 [System] [] You received Shrapnel x (812) Value: 0.0812 PED
+2021-09-21 09:42:38 [System] [] You received Vibrant Sweat x (5) Value: 0.0005 PED
+2021-09-21 09:42:38 [System] [] Your enhancer Weapon Damage Enhancer 1 on your Opalo broke.
+2021-09-21 09:42:38 [System] [] You received Shrapnel x (8000) Value: 0.8000 PED
+2021-09-21 09:42:44 [System] [] You inflicted 70.1 points of damage
+2021-09-21 09:42:45 [System] [] You received Animal Oil Residue x (30) Value: 0.3000 PED"""
+
+
+def recorded_rows():
+    return [row(line) for line in RECORDED_LOG.splitlines()]
+
+
+def loot(ts, name="Shrapnel", amount="100"):
+    loot_row = LootInstance(name, amount, "0.0100")
+    loot_row.ts = ts
+    return loot_row
+
+
+class TestKillSegmenter(unittest.TestCase):
+
+    def test_gap_window_slides(self):
+        segmenter = KillSegmenter(gap=1)
+        verdicts = [segmenter.classify(loot(ts)) for ts in (100, 101, 102, 103, 105, 107, 108)]
+        self.assertEqual(verdicts, [NEW_KILL, SAME_KILL, SAME_KILL, SAME_KILL, NEW_KILL, NEW_KILL, SAME_KILL])
+        self.assertEqual(segmenter.kills, 3)
+
+    def test_exclusions(self):
+        segmenter = KillSegmenter()
+        self.assertEqual(segmenter.classify(loot(100, "Universal Ammo")), IGNORE)
+        self.assertEqual(segmenter.classify(loot(100, "Vibrant Sweat")), NOT_A_KILL)
+        self.assertEqual(segmenter.classify(loot(100, "Shrapnel", "8000")), NOT_A_KILL)
+        self.assertEqual(segmenter.classify(loot(100, "Shrapnel", "8001")), NEW_KILL)
+
+        segmenter.add_rule(ExclusionRule("tokens", "Token", None, NOT_A_KILL))
+        self.assertEqual(segmenter.classify(loot(101, "Token")), NOT_A_KILL)
+        # Excluded rows don't keep the kill open
+        self.assertEqual(segmenter.classify(loot(103)), NEW_KILL)
+
+    def test_recorded_log(self):
+        loot_rows = [r for r in recorded_rows() if isinstance(r, LootInstance)]
+        kills = split_kills(loot_rows)
+        self.assertEqual([[r.name for r in kill] for kill in kills],
+                         [["Animal Oil Residue", "Shrapnel"], ["Animal Hide", "Shrapnel"], ["Animal Oil Residue"]])
+        # A wider gap merges the first two kills
+        self.assertEqual(len(split_kills(loot_rows, KillSegmenter(gap=5))), 2)
+
+    def test_kills_carry_the_cost_since_the_last_kill(self):
+        run = HuntingTrip(datetime(2021, 9, 21, 9, 0, 0), Decimal("0.1"))
+        for chat_row in recorded_rows():
+            run.add_chat_row(chat_row)
+
+        self.assertEqual(run.loot_instances, 3)
+        self.assertEqual(str(run.tt_return), "1.4941")
+        # Loot that isn't a kill still counts towards the return of the kill it arrives in
+        self.assertEqual([(b.x, b.max) for b in run.multipliers.buckets()], [(0.2, 0.2724), (0.3, 0.9217)])
+        self.assertEqual(str(run.kill_cost), "0.1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from utils.series import DownsampledSeries
+
+
+class TestDownsampledSeries(unittest.TestCase):
+
+    def test_short_series_keep_every_point(self):
+        series = DownsampledSeries(capacity=8, paired=True)
+        for i in range(5):
+            series.append(i * 1.5, x=i)
+        self.assertEqual(len(series), 5)
+        self.assertEqual([(b.start, b.count, b.max, b.x) for b in series.buckets()],
+                         [(i, 1, i * 1.5, i) for i in range(5)])
+
+    def test_buckets_merge_when_full(self):
+        series = DownsampledSeries(capacity=4, paired=True)
+        for y in [3, 1, 4, 1, 5, 9, 2, 6, 5]:
+            series.append(y, x=y * 10)
+        # 9 points in buckets of 4
+        self.assertEqual((series.size, len(series.sums)), (4, 3))
+        self.assertEqual([(b.start, b.count, b.min, b.max, b.mean, b.x) for b in series.buckets()],
+                         [(0, 4, 1, 4, 2.25, 40), (4, 4, 2, 9, 5.5, 90), (8, 1, 5, 5, 5, 50)])
+
+    def test_memory_stays_bounded(self):
+        series = DownsampledSeries(capacity=64)
+        for i in range(20000):
+            series.append(i % 100)
+        self.assertLessEqual(len(series.sums), 64)
+        self.assertEqual(len(series), 20000)
+        buckets = series.buckets()
+        self.assertEqual(sum(b.count for b in buckets), 20000)
+        self.assertEqual((min(b.min for b in buckets), max(b.max for b in buckets)), (0, 99))
+
+    def test_views_have_a_fixed_size(self):
+        series = DownsampledSeries(capacity=64)
+        for i in range(1000):
+            series.append(i)
+        self.assertEqual(len(series.view(points=10)), 9)
+        zoomed = series.view(100, 200, points=1000)
+        self.assertEqual((zoomed[0].start, zoomed[-1].start + zoomed[-1].count), (96, 208))
+        self.assertEqual(series.view(2000, 3000), [])
+
+        whole, = series.view(points=1)
+        self.assertEqual((whole.count, whole.min, whole.max, whole.mean), (1000, 0, 999, 499.5))
+
+    def test_serialization_round_trip(self):
+        for count in (5, 300):
+            series = DownsampledSeries(capacity=16, paired=True)
+            for i in range(count):
+                series.append(i / 3, x=i)
+            data = json.loads(json.dumps(series.serialize()))
+            loaded = DownsampledSeries.from_serialized(data, paired=True, capacity=16)
+            self.assertEqual(loaded.buckets(), series.buckets())
+            loaded.append(1.0, x=1)
+            self.assertEqual(len(loaded), count + 1)
+
+        self.assertEqual(DownsampledSeries.from_values([1, 2], [3, 4]).buckets(),
+                         DownsampledSeries.from_serialized({"y": [1, 2], "x": [3, 4]}, paired=True).buckets())
+
+
+if __name__ == '__main__':
+    unittest.main()
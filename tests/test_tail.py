@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from utils.tail import PollingTail, InotifyTail, inotify_available, fingerprint_matches
+
+
+class TestFileTail(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "chat.log")
+
+    def _write(self, data: bytes):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_starts_at_end_of_file(self):
+        self._write(b"old line\n")
+        tail = PollingTail(self.path)
+        tail.open()
+        self._write(b"new line\n")
+        self.assertEqual(tail.read_lines(), ["new line"])
+        tail.close()
+
+    def test_holds_back_partial_lines(self):
+        self._write(b"")
+        tail = PollingTail(self.path, offset=0)
+        tail.open()
+        self._write(b"first\r\nsec")
+        self.assertEqual(tail.read_lines(), ["first"])
+        self.assertEqual(tail.read_lines(), [])
+        self._write(b"ond\r\n")
+        self.assertEqual(tail.read_lines(), ["second"])
+        self.assertEqual(tail.offset, os.path.getsize(self.path))
+        tail.close()
+
+    def test_skips_byte_order_mark(self):
+        self._write(b"\xef\xbb\xbf2021-09-21 09:42:35 [System] [] You missed\n")
+        tail = PollingTail(self.path, offset=0)
+        tail.open()
+        self.assertEqual(tail.read_lines(), ["2021-09-21 09:42:35 [System] [] You missed"])
+        self.assertEqual(tail.offset, os.path.getsize(self.path))
+        tail.close()
+
+    def test_entries_carry_resume_offsets(self):
+        self._write(b"")
+        tail = PollingTail(self.path, offset=0)
+        tail.open()
+        self._write(b"one\ntwo\n")
+        entries = tail.read_entries()
+        tail.close()
+        self.assertEqual(entries, [(4, "one"), (8, "two")])
+
+        tail = PollingTail(self.path, offset=entries[0][0])
+        tail.open()
+        self.assertEqual(tail.read_lines(), ["two"])
+        tail.close()
+
+    def test_detects_truncation_and_rotation(self):
+        self._write(b"one\ntwo\n")
+        tail = PollingTail(self.path)
+        tail.open()
+        self.assertFalse(tail.replaced())
+
+        with open(self.path, "wb") as f:
+            f.write(b"x\n")
+        self.assertTrue(tail.replaced())
+        tail.reopen()
+        self.assertEqual(tail.read_lines(), ["x"])
+
+        rotated = self.path + ".new"
+        with open(rotated, "wb") as f:
+            f.write(b"fresh\n")
+        os.replace(rotated, self.path)
+        self.assertTrue(tail.replaced())
+        tail.reopen()
+        self.assertEqual(tail.read_lines(), ["fresh"])
+        self.assertEqual(tail.reopens, 2)
+        tail.close()
+
+    def test_fingerprint(self):
+        self._write(b"2021-09-21 09:42:35 [System] [] You missed\n")
+        tail = PollingTail(self.path)
+        tail.open()
+        tail.close()
+        self.assertTrue(fingerprint_matches(self.path, tail.fingerprint))
+        # Appending doesn't change which file this is
+        self._write(b"2021-09-21 09:42:36 [System] [] You missed\n")
+        self.assertTrue(fingerprint_matches(self.path, tail.fingerprint))
+        with open(self.path, "wb") as f:
+            f.write(b"2021-09-22 10:00:00 [System] [] You missed\n")
+        self.assertFalse(fingerprint_matches(self.path, tail.fingerprint))
+
+    def test_polling_backs_off_and_resets(self):
+        tail = PollingTail(self.path, min_delay=0.001, max_delay=0.004)
+        for _ in range(4):
+            tail.wait()
+        self.assertEqual(tail.delay, 0.004)
+        tail.on_data()
+        self.assertEqual(tail.delay, 0.001)
+
+    @unittest.skipUnless(inotify_available(), "inotify is only available on Linux")
+    def test_inotify_follow(self):
+        self._write(b"")
+        tail = InotifyTail(self.path, max_wait=0.1)
+        received = []
+        done = threading.Event()
+
+        def read():
+            for line in tail.follow():
+                received.append(line)
+                if len(received) == 2:
+                    done.set()
+
+        thread = threading.Thread(target=read, daemon=True)
+        thread.start()
+        while tail.file is None:
+            time.sleep(0.001)
+        self._write(b"one\ntwo\n")
+        self.assertTrue(done.wait(2))
+        tail.stop()
+        thread.join(1)
+        self.assertEqual(received, ["one", "two"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from utils.unmatched import UnmatchedLines, message_shape
+
+
+class TestUnmatchedLines(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(tempfile.mkdtemp(), "unmatched_lines.log")
+
+    def test_numbers_are_normalized(self):
+        self.assertEqual(message_shape("You healed yourself 12.5 points"), "You healed yourself # points")
+        self.assertEqual(message_shape("Value: 1,234.5678 PED (x 3)"), "Value: # PED (x #)")
+
+    def test_counts_by_shape(self):
+        unmatched = UnmatchedLines(self.filename)
+        for i in range(10):
+            unmatched.add("2021-09-21 09:42:35", f"You healed yourself {i}.5 points")
+        unmatched.add("2021-09-21 09:42:35", "Something new")
+        self.assertEqual(unmatched.top(), [("You healed yourself # points", 10), ("Something new", 1)])
+        self.assertIn("11 unmatched lines, 2 shapes", unmatched.report())
+
+    def test_shapes_are_bounded(self):
+        unmatched = UnmatchedLines(self.filename, max_shapes=2)
+        for msg in ("a", "b", "c", "a"):
+            unmatched.add("2021-09-21 09:42:35", msg)
+        self.assertEqual(dict(unmatched.top()), {"a": 2, "b": 1})
+        self.assertEqual(unmatched.overflow, 1)
+
+    def test_samples_are_limited_and_rotated(self):
+        unmatched = UnmatchedLines(self.filename, samples_per_shape=2, max_file_size=100)
+        for i in range(50):
+            unmatched.add("2021-09-21 09:42:35", f"Shape {chr(65 + i % 10)} with a fairly long message {i}")
+        unmatched.samples.join()
+        with open(self.filename) as f:
+            current = f.readlines()
+        with open(self.filename + ".1") as f:
+            rotated = f.readlines()
+        self.assertLessEqual(len(current) + len(rotated), 20)
+        self.assertLessEqual(os.path.getsize(self.filename), 100 + len(current[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+from collections import deque, namedtuple
+import threading
+from typing import Any, List, Optional
+
+
+# Enough for several minutes of heavy damage spam while the UI is stalled
+DEFAULT_MAXSIZE = 100000
+
+QueueStats = namedtuple("QueueStats", ["depth", "maxsize", "high_water", "total_in", "total_out", "drops", "waits"])
+
+
+class EventQueue(object):
+    """
+    Bounded FIFO handing parsed chat rows from a reader thread to the aggregation worker.
+
+    When the queue is full a blocking put waits for the consumer to make room, which stalls the tail reader and
+    leaves the backlog in chat.log instead of in memory. Puts that give up waiting, or don't block at all,
+    drop the event and count it.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        # Counters
+        self.high_water = 0
+        self.total_in = 0
+        self.total_out = 0
+        self.drops = 0
+        self.waits = 0
+        self.closed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Adds an event to the back of the queue
+        :param item: The event
+        :param block: Wait for room if the queue is full
+        :param timeout: Seconds to wait for room before dropping the event, None waits forever
+        :return: True if the event was queued, False if it was dropped
+        """
+        with self._not_full:
+            if len(self._items) >= self.maxsize and not self.closed:
+                if not block:
+                    self.drops += 1
+                    return False
+                self.waits += 1
+                if not self._not_full.wait_for(lambda: len(self._items) < self.maxsize or self.closed, timeout):
+                    self.drops += 1
+                    return False
+            if self.closed:
+                self.drops += 1
+                return False
+            self._items.append(item)
+            self.total_in += 1
+            if len(self._items) > self.high_water:
+                self.high_water = len(self._items)
+        return True
+
+    def get(self) -> Optional[Any]:
+        """
+        :return: The oldest event, or None if the queue is empty
+        """
+        with self._not_full:
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self.total_out += 1
+            self._not_full.notify()
+        return item
+
+    def drain(self, max_items: Optional[int] = None) -> List[Any]:
+        """
+        Removes a batch of events under a single lock
+        :param max_items: Most events to return, None takes everything queued
+        :return: List of events, oldest first
+        """
+        with self._not_full:
+            n = len(self._items) if max_items is None else min(max_items, len(self._items))
+            popleft = self._items.popleft
+            items = [popleft() for _ in range(n)]
+            self.total_out += n
+            if n:
+                self._not_full.notify_all()
+        return items
+
+    def close(self):
+        """
+        Drops every queued event and every event put from now on, puts waiting for room return straight away
+        """
+        with self._not_full:
+            self.closed = True
+            self._items.clear()
+            self._not_full.notify_all()
+
+    def stats(self) -> QueueStats:
+        return QueueStats(len(self._items), self.maxsize, self.high_water, self.total_in, self.total_out,
+                          self.drops, self.waits)
@@ -0,0 +1,165 @@
+"""
+Sparse index from chat.log timestamps to byte offsets, so a time window can be read without the rest of the log.
+"""
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from helpers import format_filename
+from utils.tail import file_fingerprint
+
+
+# Bytes of chat.log between two index entries
+INDEX_INTERVAL = 256 * 1024
+
+# New entries gathered while tailing before the index is written back to disk
+SAVE_EVERY = 16
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIMESTAMP_REGEX = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+
+
+def index_filename(log_path: str) -> str:
+    key = hashlib.sha1(os.path.abspath(log_path).encode("utf-8")).hexdigest()[:12]
+    return format_filename(f"ChatLogIndex_{key}.json")
+
+
+class ChatLogIndex(object):
+
+    def __init__(self, log_path: str, filename: Optional[str] = None, interval: int = INDEX_INTERVAL):
+        self.log_path = log_path
+        self.filename = filename or index_filename(log_path)
+        self.interval = interval
+
+        self.fingerprint: str = None
+        self.times: List[str] = []
+        self.offsets: List[int] = []
+        self._unsaved = 0
+
+    @classmethod
+    def for_log(cls, log_path: str, **kwargs) -> "ChatLogIndex":
+        """
+        Loads the index of a chat.log and brings it up to date with the end of the file
+        """
+        index = cls(log_path, **kwargs)
+        index.load()
+        index.build()
+        return index
+
+    def reset(self, fingerprint: str = None):
+        self.fingerprint = fingerprint
+        self.times = []
+        self.offsets = []
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "r") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return
+        if data.get("interval") != self.interval:
+            return
+        self.fingerprint = data["fingerprint"]
+        self.times = [t for t, _ in data["entries"]]
+        self.offsets = [o for _, o in data["entries"]]
+
+    def save(self):
+        self._unsaved = 0
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, "w") as f:
+            f.write(json.dumps({
+                "log": os.path.abspath(self.log_path),
+                "fingerprint": self.fingerprint,
+                "interval": self.interval,
+                "entries": list(zip(self.times, self.offsets))
+            }))
+        os.replace(temp_filename, self.filename)
+
+    def observe(self, offset: int, line: str):
+        """
+        Called by the chat reader for every line it tails
+        :param offset: Byte offset the line starts at
+        :param line: The raw log line
+        """
+        if self.offsets and offset < self.offsets[-1] + self.interval:
+            return
+        if not TIMESTAMP_REGEX.match(line):
+            return
+        self.times.append(line[:19])
+        self.offsets.append(offset)
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def build(self):
+        """
+        Indexes everything past the last entry by seeking from one interval boundary to the next, this reads a
+        single line per entry rather than the whole file
+        """
+        with open(self.log_path, "rb") as f:
+            fingerprint = file_fingerprint(f)
+            if fingerprint != self.fingerprint:
+                # A different chat.log, or one that has grown past the fingerprint size since
+                if self.fingerprint and self.offsets and self._same_file(f):
+                    self.fingerprint = fingerprint
+                else:
+                    self.reset(fingerprint)
+
+            size = f.seek(0, os.SEEK_END)
+            if self.offsets and self.offsets[-1] >= size:
+                # Truncated in place
+                self.reset(fingerprint)
+            position = self.offsets[-1] + self.interval if self.offsets else 0
+            added = 0
+            while position < size:
+                if position:
+                    # Skip to the first line starting at or after the boundary
+                    f.seek(position - 1)
+                    f.readline()
+                else:
+                    f.seek(0)
+                offset = f.tell()
+                line = f.readline().decode("utf-8", errors="replace").lstrip("\ufeff")
+                if not line.endswith("\n"):
+                    break
+                if TIMESTAMP_REGEX.match(line):
+                    self.times.append(line[:19])
+                    self.offsets.append(offset)
+                    added += 1
+                    position = offset + self.interval
+                else:
+                    position = offset + len(line.encode("utf-8"))
+
+        if added:
+            self.save()
+
+    def _same_file(self, f) -> bool:
+        """A file first fingerprinted while shorter than the fingerprint size must still start the same way"""
+        size = int(self.fingerprint.split(":", 1)[0])
+        return file_fingerprint(f, size) == self.fingerprint
+
+    def seek(self, when: datetime) -> int:
+        """
+        :return: A byte offset at or before the first line logged at or after when
+        """
+        i = bisect_left(self.times, when.strftime(TIMESTAMP_FORMAT))
+        return self.offsets[i - 1] if i else 0
+
+    def byte_range(self, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, Optional[int]]:
+        """
+        :return: (start, end) byte offsets that contain every line logged between start and end, end is None
+                 when the range runs to the end of the file
+        """
+        start_offset = self.seek(start) if start else 0
+        end_offset = None
+        if end:
+            i = bisect_right(self.times, end.strftime(TIMESTAMP_FORMAT))
+            if i < len(self.offsets):
+                end_offset = self.offsets[i]
+        return start_offset, end_offset
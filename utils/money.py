@@ -0,0 +1,42 @@
+"""
+Exact integer amounts of PED, in units of 0.0001 PED.
+"""
+from decimal import Decimal
+
+
+# Units per PED, chat values have four decimal places
+PED_UNITS = 10000
+PED_DECIMALS = 4
+PED_UNIT = Decimal(1).scaleb(-PED_DECIMALS)
+
+
+def ped_to_units(text: str) -> int:
+    """
+    :param text: Amount of PED as chat or a saved run writes it, e.g. "0.1524"
+    :return: The amount in units of 1 / PED_UNITS PED
+    """
+    if text[-PED_DECIMALS - 1:-PED_DECIMALS] == ".":
+        # What chat writes, dropping the point gives the units
+        return int(text[:-PED_DECIMALS - 1] + text[-PED_DECIMALS:])
+
+    # Anything more precise than PED_DECIMALS places is rounded to them
+    return int(Decimal(text).quantize(PED_UNIT).scaleb(PED_DECIMALS))
+
+
+def ped_places(text: str) -> int:
+    """
+    :return: Decimal places text is written with, at most PED_DECIMALS
+    """
+    if text[-PED_DECIMALS - 1:-PED_DECIMALS] == ".":
+        return PED_DECIMALS
+    return max(0, min(-Decimal(text).as_tuple().exponent, PED_DECIMALS))
+
+
+def units_to_ped(units: int, places: int = PED_DECIMALS) -> Decimal:
+    """
+    :param places: Decimal places to show, the most any of the summed values had
+    :return: The amount as a Decimal, as summing the values as Decimals would have given
+    """
+    if places < PED_DECIMALS:
+        return (Decimal(units) * PED_UNIT).quantize(Decimal(1).scaleb(-places))
+    return Decimal(units) * PED_UNIT
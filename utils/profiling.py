@@ -0,0 +1,192 @@
+"""
+Stage timings, queue depths and chat row latency of the tracking pipeline, shown on the Performance tab.
+"""
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+
+# Samples kept per stage
+SAMPLE_WINDOW = 1000
+
+StageStats = namedtuple("StageStats", ["name", "count", "last", "p50", "p95", "p99", "max"])
+
+LOG_TO_READ = "log to read"
+READ_TO_RENDER = "read to render"
+LOG_TO_RENDER = "log to render"
+
+
+class RollingHistogram(object):
+    """
+    The last SAMPLE_WINDOW values of a measurement
+    """
+
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, value: float):
+        with self._lock:
+            self.samples.append(value)
+            self.count += 1
+
+    def extend(self, values: List[float]):
+        with self._lock:
+            self.samples.extend(values)
+            self.count += len(values)
+
+    def percentile(self, sorted_samples: List[float], p: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p / 100))]
+
+    def stats(self, name: str) -> StageStats:
+        with self._lock:
+            samples = sorted(self.samples)
+            last = self.samples[-1] if self.samples else 0.0
+            count = self.count
+        return StageStats(name, count, last, self.percentile(samples, 50), self.percentile(samples, 95),
+                          self.percentile(samples, 99), samples[-1] if samples else 0.0)
+
+
+class Profiler(object):
+
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self.window = window
+        self.stages = {}
+        self.depths = {}
+        self.latencies = {}
+        # Set by start_cprofile
+        self.tick_profile: Optional[TickProfile] = None
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms: dict, name: str) -> RollingHistogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(name, RollingHistogram(self.window))
+        return histogram
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times the body of the with block as a stage, in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._histogram(self.stages, name).add(time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self._histogram(self.stages, name).add(seconds)
+
+    def record_depth(self, name: str, depth: int):
+        self._histogram(self.depths, name).add(depth)
+
+    def record_latency(self, rows: list, now: Optional[float] = None):
+        """
+        Records how long chat rows took to reach the UI
+        :param rows: Chat rows that were just rendered, rows without a read_time are ignored
+        :param now: time.time() they were rendered at
+        """
+        now = now or time.time()
+        rows = [row for row in rows if row.read_time is not None]
+        if not rows:
+            return
+        # Log times are whole seconds, so the latencies measured from them read up to a second high
+        self._histogram(self.latencies, LOG_TO_READ).extend([row.read_time - row.ts for row in rows])
+        self._histogram(self.latencies, READ_TO_RENDER).extend([now - row.read_time for row in rows])
+        self._histogram(self.latencies, LOG_TO_RENDER).extend([now - row.ts for row in rows])
+
+    def stage_stats(self) -> List[StageStats]:
+        return [histogram.stats(name) for name, histogram in sorted(self.stages.items())]
+
+    def depth_stats(self) -> List[StageStats]:
+        return [histogram.stats(name) for name, histogram in sorted(self.depths.items())]
+
+    def latency_stats(self) -> List[StageStats]:
+        return [self.latencies[name].stats(name) for name in (LOG_TO_READ, READ_TO_RENDER, LOG_TO_RENDER)
+                if name in self.latencies]
+
+    def metrics(self) -> dict:
+        """
+        :return: Every stage, queue depth and latency as plain data, times in seconds
+        """
+        return {
+            "stages": [stats._asdict() for stats in self.stage_stats()],
+            "queue_depths": [stats._asdict() for stats in self.depth_stats()],
+            "latency": [stats._asdict() for stats in self.latency_stats()],
+        }
+
+    def dump(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.metrics(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.depths = {}
+            self.latencies = {}
+
+    def start_cprofile(self, ticks: int, filename: str):
+        self.tick_profile = TickProfile(ticks, filename)
+
+    def profiled(self, func: Callable, *args, tick: bool = False):
+        """
+        Calls func, under cProfile while a TickProfile is running
+        :param tick: This call is a UI tick, counts towards the ticks profiled
+        """
+        tick_profile = self.tick_profile
+        if tick_profile is None or tick_profile.done:
+            return func(*args)
+        return tick_profile.call(func, *args, tick=tick)
+
+
+class TickProfile(object):
+    """
+    cProfile of the next N UI ticks, plus whatever other threads run through Profiler.profiled meanwhile.
+
+    Profiled calls are serialized so the stats of every thread can be merged safely once the last tick is done.
+    """
+
+    def __init__(self, ticks: int, filename: str):
+        self.ticks = ticks
+        self.filename = filename
+        self.done = False
+        self.profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable, *args, tick: bool = False):
+        with self._lock:
+            if self.done:
+                return func(*args)
+            profile = getattr(self._local, "profile", None)
+            if profile is None:
+                profile = self._local.profile = cProfile.Profile()
+                self.profiles.append(profile)
+            try:
+                return profile.runcall(func, *args)
+            finally:
+                if tick:
+                    self.ticks -= 1
+                    if self.ticks <= 0:
+                        self.dump()
+
+    def dump(self):
+        self.done = True
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(self.filename)
+        print(f"Profile of the UI ticks written to {self.filename}")
+
+
+PROFILER = Profiler()
@@ -0,0 +1,71 @@
+"""
+Keys kept in order of their values as the values change.
+"""
+from typing import Any, Hashable, List
+
+
+class RankedIndex(object):
+    """
+    Keys ordered by value, largest first.
+
+    An update moves its key past the keys it overtook, one swap each. Run totals only grow and rarely overtake
+    more than a few neighbours, so keeping the order costs far less than sorting every key again.
+    """
+
+    def __init__(self):
+        # Keys, largest value first, ties in the order the keys were added
+        self.order: List[Hashable] = []
+        self.rank = {}
+        self.values = {}
+        self.total = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def update(self, key: Hashable, value: Any):
+        """
+        Sets the value of a key, adding the key if it is new
+        """
+        order, rank, values = self.order, self.rank, self.values
+        i = rank.get(key)
+        if i is None:
+            i = len(order)
+            order.append(key)
+            self.total += value
+        else:
+            self.total += value - values[key]
+        values[key] = value
+
+        while i and values[order[i - 1]] < value:
+            order[i] = order[i - 1]
+            rank[order[i]] = i
+            i -= 1
+        while i + 1 < len(order) and values[order[i + 1]] > value:
+            order[i] = order[i + 1]
+            rank[order[i]] = i
+            i += 1
+        order[i] = key
+        rank[key] = i
+
+    def top(self, n: int = 0) -> List[Hashable]:
+        """
+        :param n: Keys to return, 0 for all of them
+        :return: The n keys with the largest values, largest first
+        """
+        return self.order[:n] if n else list(self.order)
+
+    @classmethod
+    def from_dict(cls, d: dict, value=None):
+        """
+        :param value: Function of a dict value giving the value to rank by, the dict value itself if None
+        """
+        inst = cls()
+        for k, v in sorted(d.items(), key=lambda t: value(t[1]) if value else t[1], reverse=True):
+            inst.rank[k] = len(inst.order)
+            inst.order.append(k)
+            inst.values[k] = value(v) if value else v
+            inst.total += inst.values[k]
+        return inst
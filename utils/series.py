@@ -0,0 +1,151 @@
+"""
+Bounded, downsampled storage for the per loot instance graphs of a run.
+"""
+from array import array
+from collections import namedtuple
+from typing import List
+
+
+# Buckets kept per series, must be even. 20k kill runs keep buckets of 16 points
+DEFAULT_CAPACITY = 2048
+
+# Points a graph draws at most
+VIEW_POINTS = 1000
+
+# Points start to start + count - 1 of a series, x is the x of the point with the largest y
+Bucket = namedtuple("Bucket", ["start", "count", "min", "max", "mean", "x"])
+
+
+class DownsampledSeries(object):
+    """
+    Series of y values, or of (x, y) points when paired, in bounded memory
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, paired: bool = False):
+        self.capacity = capacity
+        self.paired = paired
+
+        # Points per bucket, every bucket but the last is full
+        self.size = 1
+        self.count = 0
+        self.mins = array("d")
+        self.maxs = array("d")
+        self.sums = array("d")
+        self.xs = array("d") if paired else None
+
+    def __len__(self):
+        return self.count
+
+    def append(self, y: float, x: float = 0.0):
+        if self.count % self.size == 0:
+            if len(self.sums) == self.capacity:
+                self._merge_pairs()
+            self.mins.append(y)
+            self.maxs.append(y)
+            self.sums.append(y)
+            if self.paired:
+                self.xs.append(x)
+        else:
+            if y < self.mins[-1]:
+                self.mins[-1] = y
+            if y > self.maxs[-1]:
+                self.maxs[-1] = y
+                if self.paired:
+                    self.xs[-1] = x
+            self.sums[-1] += y
+        self.count += 1
+
+    def _merge_pairs(self):
+        """
+        Halves the number of buckets, the buckets are all full when it is called
+        """
+        mins, maxs, sums = self.mins, self.maxs, self.sums
+        self.mins = array("d", map(min, mins[::2], mins[1::2]))
+        self.maxs = array("d", map(max, maxs[::2], maxs[1::2]))
+        self.sums = array("d", map(float.__add__, sums[::2], sums[1::2]))
+        if self.paired:
+            xs = self.xs
+            self.xs = array("d", (xs[i + 1] if maxs[i + 1] > maxs[i] else xs[i] for i in range(0, len(xs), 2)))
+        self.size *= 2
+
+    def copy(self) -> "DownsampledSeries":
+        inst = DownsampledSeries(self.capacity, self.paired)
+        inst.size = self.size
+        inst.count = self.count
+        inst.mins = array("d", self.mins)
+        inst.maxs = array("d", self.maxs)
+        inst.sums = array("d", self.sums)
+        if self.paired:
+            inst.xs = array("d", self.xs)
+        return inst
+
+    def view(self, start: int = 0, end: int = None, points: int = VIEW_POINTS) -> List[Bucket]:
+        """
+        :param start: First point to include
+        :param end: Point to stop before, None for the end of the series
+        :param points: Buckets to return at most
+        :return: Buckets covering the points start to end, merged from the stored buckets until there are at most
+        points of them
+        """
+        end = self.count if end is None else min(end, self.count)
+        first = max(start, 0) // self.size
+        last = (end + self.size - 1) // self.size
+        if first >= last:
+            return []
+
+        group = -(-(last - first) // points)
+        buckets = []
+        for i in range(first, last, group):
+            j = min(i + group, last)
+            bucket_start = i * self.size
+            count = min(j * self.size, self.count) - bucket_start
+            maxs = self.maxs[i:j]
+            y_max = max(maxs)
+            x = self.xs[i + maxs.index(y_max)] if self.paired else 0.0
+            buckets.append(Bucket(bucket_start, count, min(self.mins[i:j]), y_max, sum(self.sums[i:j]) / count, x))
+        return buckets
+
+    def buckets(self) -> List[Bucket]:
+        """
+        :return: Every stored bucket, single points until the series outgrows its capacity
+        """
+        return self.view(points=self.capacity)
+
+    def serialize(self) -> dict:
+        if self.size == 1:
+            data = {"y": list(self.sums)}
+        else:
+            data = {"size": self.size, "count": self.count, "min": list(self.mins), "max": list(self.maxs),
+                    "sum": list(self.sums)}
+        if self.paired:
+            data["x"] = list(self.xs)
+        return data
+
+    @classmethod
+    def from_serialized(cls, data: dict, paired: bool = False, capacity: int = DEFAULT_CAPACITY):
+        inst = cls(capacity, paired)
+        if "y" in data:
+            inst.count = len(data["y"])
+            inst.mins = array("d", data["y"])
+            inst.maxs = array("d", data["y"])
+            inst.sums = array("d", data["y"])
+        else:
+            inst.size = data["size"]
+            inst.count = data["count"]
+            inst.mins = array("d", data["min"])
+            inst.maxs = array("d", data["max"])
+            inst.sums = array("d", data["sum"])
+        if paired:
+            inst.xs = array("d", data["x"])
+        return inst
+
+    @classmethod
+    def from_values(cls, ys, xs=None, capacity: int = DEFAULT_CAPACITY):
+        """
+        :param ys: y values in order
+        :param xs: x values of a paired series, the same length as ys
+        """
+        inst = cls(capacity, xs is not None)
+        for i, y in enumerate(ys):
+            inst.append(float(y), float(xs[i]) if xs is not None else 0.0)
+        return inst
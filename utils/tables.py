@@ -27,6 +27,22 @@ class BaseTableView(QTableWidget):
                     self.setItem(m, n, newitem)
         self.setHorizontalHeaderLabels(horHeaders)
 
+    def updateData(self, data):
+        """
+        Like setData, but only replaces cells whose text changed, and empties the rows after the last one of data
+        """
+        self.data = data
+        for n, key in enumerate(self.COLUMNS):
+            column = data.get(key, [])
+            for m, item in enumerate(column):
+                cell = self.item(m, n)
+                if cell is None or cell.text() != str(item):
+                    self.setItem(m, n, QTableWidgetItem(str(item)))
+            for m in range(len(column), self.rowCount()):
+                if self.item(m, n) is None:
+                    break
+                self.takeItem(m, n)
+
     def keyPressEvent(self, event):
         super().keyPressEvent(event)
         # If table cells are copied via CTRL+C, we should copy them to the clipboard
@@ -67,7 +83,7 @@ class BaseTableView(QTableWidget):
 
 
 class RunsView(BaseTableView):
-    COLUMNS = ("Notes", "Start", "End", "Spend", "Enhancers", "Extra Spend", "Return", "%", "mu%")
+    COLUMNS = ("Notes", "Start", "End", "Spend", "Enhancers", "Extra Spend", "Return", "%", "mu%", "Character")
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -82,6 +98,7 @@ class RunsView(BaseTableView):
         header.setSectionResizeMode(6, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(7, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(8, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(9, QHeaderView.ResizeToContents)
 
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
 
@@ -162,3 +179,68 @@ class CraftingTableView(BaseTableView):
         header.setSectionResizeMode(5, QHeaderView.Stretch)
 
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+
+class ParserStatsTableView(BaseTableView):
+    COLUMNS = ("Channel", "Rule", "Hits", "%", "Position")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+
+class UnmatchedShapesTableView(BaseTableView):
+    COLUMNS = ("Count", "Message")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+
+class ChatLogsTableView(BaseTableView):
+    COLUMNS = ("Character", "Chat Location")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+
+class CharacterTotalsTableView(BaseTableView):
+    COLUMNS = ("Character", "Loots", "Spend", "Return", "%", "Globals", "Hofs")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for i in range(1, len(self.COLUMNS)):
+            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+
+class PerformanceTableView(BaseTableView):
+    COLUMNS = ("Stage", "Count", "Last", "p50", "p95", "p99", "Max")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for i in range(1, len(self.COLUMNS)):
+            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -0,0 +1,264 @@
+"""
+Follows a growing log file and yields complete lines with their byte offsets.
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+# Bytes read from the log per call, bounds the work done between two yields when catching up
+READ_SIZE = 64 * 1024
+
+# Polling delays in seconds, the delay doubles every time a poll finds nothing new
+MIN_POLL_DELAY = 0.005
+MAX_POLL_DELAY = 0.25
+
+# Longest an inotify wait blocks without an event, so stop() is noticed
+MAX_WAIT = 1.0
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# Bytes at the start of a file hashed to tell one log file from another
+FINGERPRINT_SIZE = 256
+
+
+def file_fingerprint(f, size: int = FINGERPRINT_SIZE) -> str:
+    """
+    Identifies a log file by the first bytes it contains, these never change while the file is appended to
+    :param f: File opened in binary mode, its position is left untouched
+    :return: "<bytes hashed>:<sha1>"
+    """
+    position = f.tell()
+    f.seek(0)
+    head = f.read(size)
+    f.seek(position)
+    return f"{len(head)}:{hashlib.sha1(head).hexdigest()}"
+
+
+def fingerprint_matches(path: str, fingerprint: str) -> bool:
+    """
+    :return: True if the file at path starts with the same bytes the fingerprint was taken from
+    """
+    size = int(fingerprint.split(":", 1)[0])
+    with open(path, "rb") as f:
+        return file_fingerprint(f, size) == fingerprint
+
+
+class FileTail(object):
+    """
+    Reads complete lines from the end of a file as it grows. Subclasses decide how to wait for more data.
+    """
+
+    def __init__(self, path: str, offset: Optional[int] = None, encoding: str = "utf-8"):
+        """
+        :param path: File to follow
+        :param offset: Byte offset to start reading from, None starts at the current end of the file
+        :param encoding: Encoding of the lines, a UTF-8 byte order mark at the start of the file is skipped
+        """
+        self.path = path
+        self.encoding = encoding
+        self.offset = offset
+        self.file = None
+        self.fingerprint = None
+        self.reopens = 0
+        # Lines that were not valid in the encoding, bad bytes are replaced with U+FFFD
+        self.decode_errors = 0
+        self._inode = None
+        self._partial = b""
+        self._stopped = False
+
+    def open(self):
+        self.file = open(self.path, "rb")
+        self._inode = os.fstat(self.file.fileno()).st_ino
+        if self.offset is None:
+            self.offset = self.file.seek(0, os.SEEK_END)
+        else:
+            self.file.seek(self.offset)
+        self._partial = b""
+        self.fingerprint = file_fingerprint(self.file)
+
+    def reopen(self):
+        """
+        Starts over at the beginning of whatever file is now at path
+        """
+        self.close()
+        self.offset = 0
+        self.reopens += 1
+        self.open()
+
+    def replaced(self) -> bool:
+        """
+        :return: True if the file was truncated, or another file was moved into its place
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            # Mid rotation, keep reading the old file until the new one shows up
+            return False
+        return stat.st_ino != self._inode or stat.st_size < self.offset
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def stop(self):
+        self._stopped = True
+
+    def read_entries(self) -> List[Tuple[int, str]]:
+        """
+        :return: (offset, line) for every complete line written since the last call, offset is the byte offset
+                 just past the line, where reading would resume after it
+        """
+        chunk = self.file.read(READ_SIZE)
+        if not chunk:
+            return []
+        data = self._partial + chunk
+        *raw_lines, self._partial = data.split(b"\n")
+
+        if not self.fingerprint.startswith(f"{FINGERPRINT_SIZE}:"):
+            # The file was still shorter than the fingerprint when it was taken
+            self.fingerprint = file_fingerprint(self.file)
+
+        entries = []
+        for raw in raw_lines:
+            if self.offset == 0 and raw.startswith(UTF8_BOM):
+                raw = raw[len(UTF8_BOM):]
+                self.offset += len(UTF8_BOM)
+            self.offset += len(raw) + 1
+            raw = raw.rstrip(b"\r")
+            try:
+                line = raw.decode(self.encoding)
+            except UnicodeDecodeError:
+                line = raw.decode(self.encoding, errors="replace")
+                self.decode_errors += 1
+            entries.append((self.offset, line))
+        return entries
+
+    def read_lines(self) -> List[str]:
+        """
+        :return: The complete lines written since the last call, without line terminators
+        """
+        return [line for _, line in self.read_entries()]
+
+    def on_data(self):
+        pass
+
+    def wait(self):
+        raise NotImplementedError
+
+    def follow_entries(self) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (offset, line) as lines are written, following the log across truncation and rotation
+        """
+        if self.file is None:
+            self.open()
+        try:
+            while not self._stopped:
+                entries = self.read_entries()
+                if entries:
+                    self.on_data()
+                    yield from entries
+                elif self.replaced():
+                    self.reopen()
+                else:
+                    self.wait()
+        finally:
+            self.close()
+
+    def follow(self) -> Iterator[str]:
+        for _, line in self.follow_entries():
+            yield line
+
+
+class PollingTail(FileTail):
+    """
+    Polls the file, backing off exponentially from MIN_POLL_DELAY to MAX_POLL_DELAY while nothing is written.
+    """
+
+    def __init__(self, *args, min_delay: float = MIN_POLL_DELAY, max_delay: float = MAX_POLL_DELAY, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+
+    def on_data(self):
+        self.delay = self.min_delay
+
+    def wait(self):
+        time.sleep(self.delay)
+        self.delay = min(self.delay * 2, self.max_delay)
+
+
+class InotifyTail(FileTail):
+    """
+    Blocks on inotify until the kernel reports the file changed.
+    """
+
+    def __init__(self, *args, max_wait: float = MAX_WAIT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_wait = max_wait
+        self._inotify_fd = None
+
+    def open(self):
+        libc = _libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+        # Watch before the first read so nothing written in between is missed
+        if libc.inotify_add_watch(fd, os.fsencode(self.path), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.path}")
+        self._inotify_fd = fd
+        super().open()
+
+    def close(self):
+        super().close()
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def wait(self):
+        readable, _, _ = select.select([self._inotify_fd], [], [], self.max_wait)
+        if readable:
+            # Only the wakeup matters, throw the queued events away
+            try:
+                while os.read(self._inotify_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+
+def _libc():
+    return ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+def open_tail(path: str, **kwargs) -> FileTail:
+    """
+    Creates the best tail backend available on this platform
+    """
+    if inotify_available():
+        return InotifyTail(path, **kwargs)
+    return PollingTail(path, **kwargs)
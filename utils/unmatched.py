@@ -0,0 +1,93 @@
+"""
+Counts the [System] lines no chat rule matched, by shape, and keeps samples of them.
+"""
+import os
+import queue
+import re
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from helpers import format_filename
+
+
+NUMBER_REGEX = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Distinct shapes tracked, anything past this is only counted as overflow
+MAX_SHAPES = 1000
+# Raw messages of each shape written to the sample file
+SAMPLES_PER_SHAPE = 3
+# Sample file size before it is rotated to <filename>.1
+MAX_SAMPLE_FILE_SIZE = 256 * 1024
+
+
+def message_shape(msg: str) -> str:
+    return NUMBER_REGEX.sub("#", msg)
+
+
+class UnmatchedLines(object):
+
+    def __init__(self, filename: Optional[str] = None, max_shapes: int = MAX_SHAPES,
+                 samples_per_shape: int = SAMPLES_PER_SHAPE, max_file_size: int = MAX_SAMPLE_FILE_SIZE):
+        self.filename = filename
+        self.max_shapes = max_shapes
+        self.samples_per_shape = samples_per_shape
+        self.max_file_size = max_file_size
+
+        self.counts = Counter()
+        self.total = 0
+        # Lines whose shape was new after max_shapes shapes had been seen
+        self.overflow = 0
+
+        self.lock = threading.Lock()
+        self.samples = queue.Queue()
+        self.writer = None
+
+    def add(self, log_time: str, msg: str):
+        """
+        Counts an unmatched message, called from the chat reader thread so it must never block on IO
+        """
+        shape = message_shape(msg)
+        with self.lock:
+            self.total += 1
+            count = self.counts.get(shape)
+            if count is None and len(self.counts) >= self.max_shapes:
+                self.overflow += 1
+                return
+            count = (count or 0) + 1
+            self.counts[shape] = count
+        if count <= self.samples_per_shape:
+            self.write_sample(f"{log_time} {msg}\n")
+
+    def write_sample(self, text: str):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_samples, daemon=True)
+            self.writer.start()
+        self.samples.put(text)
+
+    def write_samples(self):
+        filename = self.filename or format_filename("unmatched_lines.log")
+        while True:
+            text = self.samples.get()
+            try:
+                if os.path.exists(filename) and os.path.getsize(filename) >= self.max_file_size:
+                    os.replace(filename, filename + ".1")
+                with open(filename, "a", encoding="utf-8") as f:
+                    f.write(text)
+            except OSError:
+                pass
+            self.samples.task_done()
+
+    def top(self, n: int = 20) -> List[Tuple[str, int]]:
+        """
+        :return: The n most common unmatched shapes as (shape, count)
+        """
+        with self.lock:
+            return self.counts.most_common(n)
+
+    def report(self, n: int = 20) -> str:
+        lines = [f"{self.total} unmatched lines, {len(self.counts)} shapes"
+                 + (f", {self.overflow} lines with untracked shapes" if self.overflow else "")]
+        for shape, count in self.top(n):
+            lines.append(f"{count:>8} {shape}")
+        return "\n".join(lines)
@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from PyQt5.QtWidgets import QFileDialog, QFormLayout, QHBoxLayout, QLineEdit, QWidget, QPushButton, QVBoxLayout
+
+from utils.tables import ChatLogsTableView, CharacterTotalsTableView
+
+
+# Rows in the tables, one per client is plenty
+MAX_CHARACTERS = 20
+
+
+class CharactersTab(QWidget):
+    """
+    Chat logs of additional clients, and the runs of every character side by side with their combined totals
+    """
+
+    def __init__(self, app: "LootNanny", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.app = app
+
+        self.create_layout()
+
+    def create_layout(self):
+        layout = QVBoxLayout()
+
+        self.logs_table = ChatLogsTableView({"Character": [], "Chat Location": []}, MAX_CHARACTERS, 2)
+        self.logs_table.itemSelectionChanged.connect(self.on_log_selected)
+        layout.addWidget(self.logs_table)
+
+        form_inputs = QFormLayout()
+        layout.addLayout(form_inputs)
+
+        self.character_name = QLineEdit()
+        form_inputs.addRow("Character Name:", self.character_name)
+
+        self.chat_location_text = QLineEdit()
+        form_inputs.addRow("Chat Location:", self.chat_location_text)
+
+        btns = QHBoxLayout()
+        self.file_dialog_btn = QPushButton("Find File")
+        self.file_dialog_btn.released.connect(self.open_files)
+        btns.addWidget(self.file_dialog_btn)
+
+        self.add_log_btn = QPushButton("Add Chat Log")
+        self.add_log_btn.released.connect(self.add_log)
+        btns.addWidget(self.add_log_btn)
+
+        self.remove_log_btn = QPushButton("Remove Chat Log", enabled=False)
+        self.remove_log_btn.released.connect(self.remove_log)
+        btns.addWidget(self.remove_log_btn)
+        layout.addLayout(btns)
+
+        self.totals_table = CharacterTotalsTableView({"Character": [], "Loots": [], "Spend": [], "Return": [],
+                                                      "%": [], "Globals": [], "Hofs": []}, MAX_CHARACTERS + 2, 7)
+        layout.addWidget(self.totals_table)
+
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.released.connect(self.refresh)
+        layout.addWidget(self.refresh_btn)
+
+        self.setLayout(layout)
+
+    def open_files(self):
+        path = QFileDialog.getOpenFileName(self, 'Open a file', '', 'All Files (*.*)')
+        self.chat_location_text.setText(path[0])
+
+    def add_log(self):
+        name = self.character_name.text().strip()
+        location = self.chat_location_text.text().strip()
+        if not name or not location:
+            return
+        logs = [log for log in self.app.config.extra_chat_logs.value if log["name"] != name]
+        logs.append({"name": name, "location": location})
+        self.app.config.extra_chat_logs = logs
+        self.character_name.setText("")
+        self.chat_location_text.setText("")
+        self.refresh()
+
+    def on_log_selected(self):
+        self.remove_log_btn.setEnabled(bool(self.logs_table.selectionModel().selectedRows()))
+
+    def remove_log(self):
+        rows = {index.row() for index in self.logs_table.selectionModel().selectedRows()}
+        self.app.config.extra_chat_logs = [log for i, log in enumerate(self.app.config.extra_chat_logs.value)
+                                           if i not in rows]
+        self.logs_table.clearSelection()
+        self.refresh()
+
+    def get_logs_data(self):
+        d = {"Character": [], "Chat Location": []}
+        for log in self.app.config.extra_chat_logs.value:
+            d["Character"].append(log["name"])
+            d["Chat Location"].append(log["location"])
+        return d
+
+    def get_totals_data(self):
+        d = {"Character": [], "Loots": [], "Spend": [], "Return": [], "%": [], "Globals": [], "Hofs": []}
+        runs = []
+        # The aggregation worker adds to the runs under the lock, their totals are read in one go under it too
+        with self.app.combat_module.lock:
+            if self.app.combat_module.active_run:
+                runs.append((self.app.config.name.value or "Main", self.app.combat_module.active_run))
+            runs.extend(sorted(self.app.combat_module.character_runs.items()))
+            totals = [(name, run.loot_instances, run.total_cost + run.extra_spend, run.tt_return, run.globals,
+                       run.hofs) for name, run in runs]
+
+        def add_row(name, loots, spend, tt_return, globals, hofs):
+            d["Character"].append(name)
+            d["Loots"].append(loots)
+            d["Spend"].append("%.2f" % spend)
+            d["Return"].append("%.2f" % tt_return)
+            d["%"].append("%.2f" % (tt_return / spend * 100) if spend else "")
+            d["Globals"].append(globals)
+            d["Hofs"].append(hofs)
+
+        for row in totals:
+            add_row(*row)
+        if len(totals) > 1:
+            add_row("All",
+                    sum(row[1] for row in totals),
+                    sum((row[2] for row in totals), Decimal(0)),
+                    sum((row[3] for row in totals), Decimal(0)),
+                    sum(row[4] for row in totals),
+                    sum(row[5] for row in totals))
+        return d
+
+    def refresh(self):
+        self.logs_table.clear()
+        self.logs_table.setData(self.get_logs_data())
+        self.totals_table.clear()
+        self.totals_table.setData(self.get_totals_data())
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
@@ -97,6 +97,20 @@ class ConfigTab(QWidget):
         form_inputs.addRow("Screenshot Threshold (PED):", self.screenshot_threshold)
         self.screenshot_threshold.textChanged.connect(self.update_screenshot_fields)
 
+        self.kill_gap = QLineEdit(text=self.app.config.kill_gap.ui_value)
+        form_inputs.addRow("Kill Gap (s):", self.kill_gap)
+        self.kill_gap.editingFinished.connect(self.onKillGapChanged)
+        self.app.combat_module.kill_gap = self.app.config.kill_gap.value
+
+        self.tick_budget = QLineEdit(text=self.app.config.tick_budget_ms.ui_value)
+        form_inputs.addRow("Tick Budget (ms):", self.tick_budget)
+        self.tick_budget.editingFinished.connect(self.onTickBudgetChanged)
+
+        self.table_top_rows = QLineEdit(text=self.app.config.table_top_rows.ui_value)
+        form_inputs.addRow("Top Table Rows (0 = all):", self.table_top_rows)
+        self.table_top_rows.editingFinished.connect(self.onTableTopRowsChanged)
+        self.app.combat_module.top_rows = self.app.config.table_top_rows.value
+
         self.streamer_window_layout_text = QTextEdit()
         self.streamer_window_layout_text.setText(self.app.config.streamer_layout.ui_value)
         self.streamer_window_layout_text.textChanged.connect(self.set_new_streamer_layout)
@@ -299,6 +313,33 @@ class ConfigTab(QWidget):
         self.app.config.name = self.character_name.text()
         self.app.save_config()
 
+    def onKillGapChanged(self):
+        try:
+            kill_gap = max(0, int(self.kill_gap.text()))
+        except ValueError:
+            kill_gap = self.app.config.kill_gap.value
+        self.kill_gap.setText(str(kill_gap))
+        self.app.config.kill_gap = kill_gap
+        self.app.combat_module.update_kill_gap(kill_gap)
+
+    def onTickBudgetChanged(self):
+        try:
+            budget = max(1, int(self.tick_budget.text()))
+        except ValueError:
+            budget = self.app.config.tick_budget_ms.value
+        self.tick_budget.setText(str(budget))
+        self.app.config.tick_budget_ms = budget
+
+    def onTableTopRowsChanged(self):
+        try:
+            top_rows = max(0, int(self.table_top_rows.text()))
+        except ValueError:
+            top_rows = self.app.config.table_top_rows.value
+        self.table_top_rows.setText(str(top_rows))
+        self.app.config.table_top_rows = top_rows
+        self.app.combat_module.top_rows = top_rows
+        self.app.combat_module.update_tables()
+
     def onChatLocationChanged(self):
         if "*" in self.chat_location_text.text():
             print("Probably an error trying to resave this value, don't update")
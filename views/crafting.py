@@ -8,7 +8,7 @@ from PyQt5.QtWidgets import QFileDialog, QTextEdit, QHBoxLayout, QFormLayout, QH
 
 from data.crafting import ALL_RESOURCES, ALL_BLUEPRINTS
 from utils.tables import CraftingTableView
-from modules.combat import MarkupSingleton
+from modules.combat import MarkupSingleton, LOOT_VIEW, RUNS_VIEW
 
 
 class CraftingTab(QWidget):
@@ -154,16 +154,17 @@ class CraftingTab(QWidget):
         self.calculate_crafting_totals()
 
     def add_crafting_run(self):
-        if not self.app.combat_module.active_run:
-            return
-        note = f"+({self.total_clicks}) clicks of {self.selected_blueprint}; "
-        self.app.combat_module.active_run.notes += note
-        self.app.combat_module.active_run.total_cost += self.total_tt_cost
-        self.app.combat_module.active_run.extra_spend += self.total_cost - self.total_tt_cost
+        with self.app.combat_module.lock:
+            if not self.app.combat_module.active_run:
+                return
+            note = f"+({self.total_clicks}) clicks of {self.selected_blueprint}; "
+            self.app.combat_module.active_run.notes += note
+            self.app.combat_module.active_run.total_cost += self.total_tt_cost
+            self.app.combat_module.active_run.extra_spend += self.total_cost - self.total_tt_cost
         self.selected_blueprint = None
         self.total_clicks = 1
         self.blueprint_table.clear()
-        self.app.combat_module.should_redraw_runs = True
+        self.app.combat_module.mark_dirty(LOOT_VIEW, RUNS_VIEW)
 
     def on_updated_total_clicks(self):
         try:
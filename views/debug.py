@@ -0,0 +1,116 @@
+from PyQt5.QtWidgets import QFormLayout, QLineEdit, QWidget, QPushButton, QVBoxLayout
+
+from chat import SYSTEM_RULES, GLOBAL_RULES
+from utils.tables import ParserStatsTableView, UnmatchedShapesTableView
+
+
+# Most common unmatched message shapes listed
+UNMATCHED_SHAPES_SHOWN = 20
+
+
+class ParserTab(QWidget):
+
+    def __init__(self, app: "LootNanny", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.app = app
+
+        self.create_layout()
+
+    def create_layout(self):
+        layout = QVBoxLayout()
+
+        form_inputs = QFormLayout()
+        layout.addLayout(form_inputs)
+
+        self.reader_status_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Reader:", self.reader_status_text)
+
+        self.reader_rate_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Lines/sec:", self.reader_rate_text)
+
+        self.reader_errors_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Reader Errors:", self.reader_errors_text)
+
+        self.parsed_text = QLineEdit(enabled=False)
+        form_inputs.addRow("System/Globals Lines:", self.parsed_text)
+
+        self.skipped_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Other Channel Lines:", self.skipped_text)
+
+        self.matched_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Matched Lines:", self.matched_text)
+
+        self.unmatched_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Unmatched System Lines:", self.unmatched_text)
+
+        self.queue_depth_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Queue Depth:", self.queue_depth_text)
+
+        self.queue_high_water_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Queue High Water:", self.queue_high_water_text)
+
+        self.queue_drops_text = QLineEdit(enabled=False)
+        form_inputs.addRow("Queue Drops:", self.queue_drops_text)
+
+        self.rules_table = ParserStatsTableView({"Channel": [], "Rule": [], "Hits": [], "%": [], "Position": []},
+                                                len(SYSTEM_RULES) + len(GLOBAL_RULES), 5)
+        layout.addWidget(self.rules_table)
+
+        self.unmatched_table = UnmatchedShapesTableView({"Count": [], "Message": []}, UNMATCHED_SHAPES_SHOWN, 2)
+        layout.addWidget(self.unmatched_table)
+
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.released.connect(self.refresh)
+        layout.addWidget(self.refresh_btn)
+
+        self.setLayout(layout)
+
+    def get_rules_data(self):
+        d = {"Channel": [], "Rule": [], "Hits": [], "%": [], "Position": []}
+        reader = self.app.chat_reader
+        for channel, dispatcher in (("System", reader.system_dispatcher), ("Globals", reader.global_dispatcher)):
+            stats = dispatcher.stats()
+            total = sum(rule.hits for rule in stats)
+            for rule in stats:
+                d["Channel"].append(channel)
+                d["Rule"].append(rule.name)
+                d["Hits"].append(rule.hits)
+                d["%"].append("%.2f" % (rule.hits / total * 100) if total else "0.00")
+                d["Position"].append(rule.position + 1)
+        return d
+
+    def get_unmatched_data(self):
+        d = {"Count": [], "Message": []}
+        for shape, count in self.app.chat_reader.unmatched.top(UNMATCHED_SHAPES_SHOWN):
+            d["Count"].append(count)
+            d["Message"].append(shape)
+        return d
+
+    def refresh(self):
+        health = self.app.chat_reader.health()
+        status = "Running" if health.running else ("Restarting" if health.restarts else "Stopped")
+        self.reader_status_text.setText(f"{status}, up {int(health.uptime)}s, {health.restarts} restarts")
+        self.reader_rate_text.setText("%.1f" % health.lines_per_sec)
+        self.reader_errors_text.setText(f"{health.decode_errors} undecodable, {health.line_errors} skipped, "
+                                        f"{self.app.combat_module.failed_rows} not added to runs"
+                                        + (f" ({health.last_error})" if health.last_error else ""))
+        self.parsed_text.setText(str(self.app.chat_reader.lines_parsed))
+        self.skipped_text.setText(str(self.app.chat_reader.lines_skipped))
+        reader = self.app.chat_reader
+        self.matched_text.setText(str(sum(reader.system_dispatcher.hits) + sum(reader.global_dispatcher.hits)))
+        self.unmatched_text.setText(str(reader.system_dispatcher.unmatched))
+
+        queue_stats = self.app.chat_reader.queue.stats()
+        self.queue_depth_text.setText(f"{queue_stats.depth} / {queue_stats.maxsize}")
+        self.queue_high_water_text.setText(str(queue_stats.high_water))
+        self.queue_drops_text.setText(str(queue_stats.drops))
+
+        self.rules_table.clear()
+        self.rules_table.setData(self.get_rules_data())
+        self.unmatched_table.clear()
+        self.unmatched_table.setData(self.get_unmatched_data())
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
@@ -0,0 +1,97 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QFileDialog, QHBoxLayout, QLabel, QWidget, QPushButton, QVBoxLayout
+
+from utils.profiling import PROFILER
+from utils.tables import PerformanceTableView
+
+
+# Milliseconds between redraws while the tab is showing
+PERFORMANCE_REFRESH_MS = 1000
+
+# Rows in the tables, there are fewer stages and chat logs than this
+MAX_STAGES = 30
+
+
+class PerformanceTab(QWidget):
+    """
+    Rolling p50/p95/p99 of every timed stage of the tracking pipeline, of the reader queue depths and of how long
+    chat rows take to reach the UI
+    """
+
+    def __init__(self, app: "LootNanny", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.app = app
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.refresh)
+
+        self.create_layout()
+
+    def create_layout(self):
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Stage times, ms"))
+        self.stages_table = PerformanceTableView({column: [] for column in PerformanceTableView.COLUMNS},
+                                                 MAX_STAGES, len(PerformanceTableView.COLUMNS))
+        layout.addWidget(self.stages_table)
+
+        layout.addWidget(QLabel("Chat row latency, ms"))
+        self.latency_table = PerformanceTableView({column: [] for column in PerformanceTableView.COLUMNS},
+                                                  3, len(PerformanceTableView.COLUMNS))
+        layout.addWidget(self.latency_table)
+
+        layout.addWidget(QLabel("Queued chat rows"))
+        self.depths_table = PerformanceTableView({column: [] for column in PerformanceTableView.COLUMNS},
+                                                 MAX_STAGES, len(PerformanceTableView.COLUMNS))
+        layout.addWidget(self.depths_table)
+
+        btns = QHBoxLayout()
+        self.save_btn = QPushButton("Save Metrics")
+        self.save_btn.released.connect(self.save_metrics)
+        btns.addWidget(self.save_btn)
+
+        self.reset_btn = QPushButton("Reset")
+        self.reset_btn.released.connect(self.reset)
+        btns.addWidget(self.reset_btn)
+        layout.addLayout(btns)
+
+        self.setLayout(layout)
+
+    def get_table_data(self, stats, fmt, scale=1):
+        d = {column: [] for column in PerformanceTableView.COLUMNS}
+        for stage in stats:
+            d["Stage"].append(stage.name)
+            d["Count"].append(stage.count)
+            d["Last"].append(fmt % (stage.last * scale))
+            d["p50"].append(fmt % (stage.p50 * scale))
+            d["p95"].append(fmt % (stage.p95 * scale))
+            d["p99"].append(fmt % (stage.p99 * scale))
+            d["Max"].append(fmt % (stage.max * scale))
+        return d
+
+    def refresh(self):
+        self.stages_table.clear()
+        self.stages_table.setData(self.get_table_data(PROFILER.stage_stats(), "%.3f", 1000))
+        self.latency_table.clear()
+        self.latency_table.setData(self.get_table_data(PROFILER.latency_stats(), "%.1f", 1000))
+        self.depths_table.clear()
+        self.depths_table.setData(self.get_table_data(PROFILER.depth_stats(), "%d"))
+
+    def save_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save metrics", "metrics.json", "JSON Files (*.json)")
+        if path:
+            PROFILER.dump(path)
+
+    def reset(self):
+        PROFILER.reset()
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(PERFORMANCE_REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)